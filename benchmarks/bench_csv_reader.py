@@ -0,0 +1,89 @@
+"""Load-time benchmark for MovieFileCSVReader against the previous two-pass reader.
+
+Usage: python -m benchmarks.bench_csv_reader [--rows 1000 100000 1000000] [--legacy-max-rows 10000]
+
+The previous reader scans every interned actor, director and genre for every row, so its cost grows with the square
+of the catalogue size. It is skipped above --legacy-max-rows, where a single run takes hours.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_catalogue_path
+from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
+from website.domainmodel.model import Movie, Actor, Genre, Director
+
+
+class LegacyMovieFileCSVReader:
+    """ The reader as it was before the single-pass rewrite, kept only as a baseline. """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.dataset_of_movies = set()
+        self.dataset_of_actors = set()
+        self.dataset_of_directors = set()
+        self.dataset_of_genres = set()
+
+    def read_csv_file(self):
+        with open(self.file_name, mode='r', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                for actor in row['Actors'].split(","):
+                    self.dataset_of_actors.add(Actor(actor))
+                self.dataset_of_directors.add(Director(row["Director"]))
+                for genre in row["Genre"].split(","):
+                    self.dataset_of_genres.add(Genre(genre))
+        with open(self.file_name, mode='r', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                movie = Movie(row['Title'], int(row['Year']))
+                if movie not in self.dataset_of_movies:
+                    self.dataset_of_movies.add(movie)
+                for actor in row['Actors'].split(","):
+                    a_actor = Actor(actor)
+                    for s_actor in self.dataset_of_actors:
+                        if a_actor == s_actor:
+                            movie.add_actor(s_actor)
+                director = Director(row["Director"])
+                for s_director in self.dataset_of_directors:
+                    if director == s_director:
+                        movie.director = s_director
+                movie.metascore = str(row['Metascore'])
+                movie.num_of_ratings = float(row['Votes'])
+                movie.description = row["Description"]
+                movie.runtime_minutes = int(row["Runtime (Minutes)"])
+                movie.rating = float(row["Rating"])
+                for genre in row["Genre"].split(","):
+                    a_genre = Genre(genre)
+                    for s_genre in self.dataset_of_genres:
+                        if s_genre == a_genre:
+                            movie.add_genre(s_genre)
+
+
+def time_reader(reader_class, file_name):
+    start = time.perf_counter()
+    reader_class(file_name).read_csv_file()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10000)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'cs235-benchmarks'))
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    print(f"{'rows':>10} {'single-pass (s)':>16} {'legacy (s)':>12}")
+    for rows in args.rows:
+        file_name = synthetic_catalogue_path(args.data_dir, rows)
+        current = time_reader(MovieFileCSVReader, file_name)
+        if rows <= args.legacy_max_rows:
+            legacy = f"{time_reader(LegacyMovieFileCSVReader, file_name):12.3f}"
+        else:
+            legacy = f"{'skipped':>12}"
+        print(f"{rows:>10} {current:16.3f} {legacy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Throughput benchmark for database-mode engine configurations under concurrent requests.
+
+Usage: python -m benchmarks.bench_engine_pool [--threads 8] [--requests 500]
+
+Each simulated request checks a connection out of the engine, runs the top-10 query and returns the connection,
+which is the per-request pattern SqlAlchemyRepository follows. NullPool opens and closes a new SQLite connection
+(and re-applies its pragmas) every time; QueuePool reuses them.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from website.directory import database_repository
+from website.directory.orm import metadata, map_model_to_tables
+
+CONFIGURATIONS = {
+    'NullPool, rollback journal': {'SQLALCHEMY_POOL_CLASS': 'NullPool', 'SQLITE_JOURNAL_MODE': 'DELETE',
+                                   'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_MMAP_SIZE': 0},
+    'NullPool, WAL': {'SQLALCHEMY_POOL_CLASS': 'NullPool'},
+    'QueuePool, WAL': {'SQLALCHEMY_POOL_CLASS': 'QueuePool'},
+}
+
+TOP_10_QUERY = 'SELECT id, title, rating FROM movies ORDER BY rating DESC LIMIT 10'
+
+
+def build_database(database_uri, data_path):
+    engine = database_repository.create_database_engine({'SQLALCHEMY_DATABASE_URI': database_uri})
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    database_repository.populate(sessionmaker(bind=engine), data_path, 'Data1000Movies.csv')
+    engine.dispose()
+    clear_mappers()
+
+
+def run_requests(engine, threads, requests):
+    def request(_):
+        with engine.connect() as connection:
+            connection.execute(TOP_10_QUERY).fetchall()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(request, range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--data-path', default=os.path.join('tests', 'data'))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_uri = 'sqlite:///' + os.path.join(directory, 'benchmark.db')
+        build_database(database_uri, args.data_path)
+
+        print(f"{'configuration':<28} {'requests/s':>12}")
+        for name, settings in CONFIGURATIONS.items():
+            engine = database_repository.create_database_engine(dict(settings, SQLALCHEMY_DATABASE_URI=database_uri))
+            run_requests(engine, args.threads, args.threads)  # Warm up.
+            print(f"{name:<28} {run_requests(engine, args.threads, args.requests):12.0f}")
+            engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
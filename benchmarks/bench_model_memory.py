@@ -0,0 +1,63 @@
+"""Memory benchmark for the domain model: bytes held per movie once a catalogue is parsed.
+
+Usage: python -m benchmarks.bench_model_memory [--rows 1000000] [--movie-file tests/data/Data1000Movies.csv]
+
+Each catalogue is parsed with tracemalloc running, and the memory still allocated afterwards is divided by the
+number of movies. That covers the movies, their interned actors, directors and genres, and the per-movie lists.
+
+The same catalogue is then measured with every Movie swapped for a SlottedMovie, which holds the same attributes in
+__slots__ and is never mapped, against the dict-backed Movie the repositories use.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import synthetic_catalogue_path
+from website.datafilereaders.movie_file_csv_reader import read_catalogue
+
+
+class SlottedMovie:
+    """ The attributes the CSV reader sets on a Movie, stored in __slots__ rather than an instance dict. """
+    __slots__ = ('_title', 'release', '_description', '_director', '_actors', '_genres', '_runtime_minutes',
+                 '_rating', '_metascore', '_num_of_ratings', '_reviews', '_image')
+
+    def __init__(self, movie):
+        for name, value in vars(movie).items():
+            setattr(self, name, value)
+
+
+def measure(file_name, slotted: bool):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    catalogue = read_catalogue(file_name)
+    if slotted:
+        catalogue.movies = [SlottedMovie(movie) for movie in catalogue.movies]
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return len(catalogue.movies), held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--movie-file', default=os.path.join('tests', 'data', 'Data1000Movies.csv'))
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'cs235-benchmarks'))
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    file_names = [args.movie_file] + [synthetic_catalogue_path(args.data_dir, rows) for rows in args.rows]
+    print(f"{'file':>28} {'movies':>10} {'Movie (B/movie)':>16} {'slotted (B/movie)':>18} {'saving':>7}")
+    for file_name in file_names:
+        movie_count, held = measure(file_name, slotted=False)
+        _, slotted_held = measure(file_name, slotted=True)
+        print(f"{os.path.basename(file_name):>28} {movie_count:>10} {held / movie_count:16.0f} "
+              f"{slotted_held / movie_count:18.0f} {1 - slotted_held / held:7.1%}")
+
+
+if __name__ == '__main__':
+    main()
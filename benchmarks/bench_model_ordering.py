@@ -0,0 +1,73 @@
+"""Micro-benchmarks for sorting, hashing and comparing domain objects.
+
+Usage: python -m benchmarks.bench_model_ordering [--movies 1000000] [--repeat 3]
+
+The movies are built in memory with shuffled titles and years. Sorting is timed with Movie's own comparisons and
+against the previous ones, which formatted both reprs on every comparison. The set and dict timings cover
+building a set of the movies, dict lookups by movie and membership tests for movies that are not in the set.
+"""
+import argparse
+import random
+import time
+
+from website.domainmodel.model import Movie, User
+
+
+class LegacyOrder:
+    """ Orders a wrapped object the way Movie and User did before, by comparing reprs. """
+    __slots__ = ('item',)
+
+    def __init__(self, item):
+        self.item = item
+
+    def __lt__(self, other):
+        return self.item.__repr__() < other.item.__repr__()
+
+
+def make_movies(count: int, seed: int = 235):
+    rng = random.Random(seed)
+    movies = [Movie(f"Synthetic Movie {rng.randrange(count)}", rng.randint(1990, 2016)) for _ in range(count)]
+    rng.shuffle(movies)
+    return movies
+
+
+def best_time(function, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--movies', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    movies = make_movies(args.movies)
+    users = [User(f"user{n}", "password") for n in range(args.movies)]
+    random.Random(235).shuffle(users)
+    movie_set = set(movies)
+    movie_dict = dict.fromkeys(movies, 0)
+    absent = [Movie(f"Absent Movie {n}", 2000) for n in range(args.movies)]
+
+    timings = [
+        ("sorted(movies)", lambda: sorted(movies)),
+        ("sorted(movies, key=sort_key)", lambda: sorted(movies, key=Movie.sort_key)),
+        ("sorted(movies), repr order", lambda: sorted(movies, key=LegacyOrder)),
+        ("sorted(users)", lambda: sorted(users)),
+        ("sorted(users), repr order", lambda: sorted(users, key=LegacyOrder)),
+        ("set(movies)", lambda: set(movies)),
+        ("dict lookups by movie", lambda: [movie_dict[movie] for movie in movies]),
+        ("absent movie in set", lambda: [movie in movie_set for movie in absent]),
+    ]
+    print(f"{'operation':>30} {'seconds':>10}   ({args.movies} objects, best of {args.repeat})")
+    for name, function in timings:
+        print(f"{name:>30} {best_time(function, args.repeat):10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Load-time benchmark for database_repository.populate against the previous ORM unit-of-work loader.
+
+Usage: python -m benchmarks.bench_populate [--rows 1000 100000 1000000] [--legacy-max-rows 10000]
+
+Each run parses a synthetic catalogue once and then times only the load into a fresh SQLite file, search table
+included. The previous loader adds every director, movie and user to a session and lets the relationship cascades
+insert actors, genres and the association rows one at a time; it is skipped above --legacy-max-rows.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from benchmarks.synthetic import synthetic_catalogue_path
+from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader, read_catalogue
+from website.directory import database_repository
+from website.directory.orm import metadata, map_model_to_tables
+
+
+def legacy_populate(session_factory, data_path, catalogue):
+    session = session_factory()
+    for director in catalogue.directors:
+        session.add(director)
+    for movie in catalogue.movies:
+        session.add(movie)
+    users_file_reader = MovieFileCSVReader(os.path.join(data_path, "users.csv"))
+    users_file_reader.read_csv_file_users()
+    for user in users_file_reader.dataset_of_users:
+        session.add(user)
+    session.commit()
+
+
+def time_load(populate, file_name, data_path, directory):
+    database_file = os.path.join(directory, 'benchmark.db')
+    if os.path.exists(database_file):
+        os.remove(database_file)
+    engine = database_repository.create_database_engine({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_file})
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    # Each loader gets its own freshly parsed catalogue, since the ORM one attaches it to a session.
+    catalogue = read_catalogue(file_name)
+    session_factory = sessionmaker(bind=engine)
+
+    start = time.perf_counter()
+    if populate is legacy_populate:
+        legacy_populate(session_factory, data_path, catalogue)
+    else:
+        populate(session_factory, data_path, os.path.basename(file_name), catalogue)
+    elapsed = time.perf_counter() - start
+
+    engine.dispose()
+    clear_mappers()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10000)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'cs235-benchmarks'))
+    args = parser.parse_args()
+    os.makedirs(args.data_dir, exist_ok=True)
+    shutil.copy(os.path.join('tests', 'data', 'users.csv'), os.path.join(args.data_dir, 'users.csv'))
+
+    print(f"{'rows':>10} {'bulk (s)':>10} {'legacy (s)':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            file_name = synthetic_catalogue_path(args.data_dir, rows)
+            bulk = time_load(database_repository.populate, file_name, args.data_dir, directory)
+            if rows <= args.legacy_max_rows:
+                legacy = f"{time_load(legacy_populate, file_name, args.data_dir, directory):12.3f}"
+            else:
+                legacy = f"{'skipped':>12}"
+            print(f"{rows:>10} {bulk:10.3f} {legacy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import csv
+import os
+import random
+
+HEADER = ['Rank', 'Title', 'Genre', 'Description', 'Director', 'Actors', 'Year', 'Runtime (Minutes)', 'Rating',
+          'Votes', 'Revenue (Millions)', 'Metascore']
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Biography', 'Comedy', 'Crime', 'Drama', 'Family', 'Fantasy',
+          'History', 'Horror', 'Music', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Sport', 'Thriller', 'War',
+          'Western']
+
+
+def write_synthetic_catalogue(file_name: str, rows: int, seed: int = 235):
+    """ Writes a Data1000Movies.csv shaped file with the given number of rows.
+
+    The actor and director pools grow with the row count, roughly in the proportions of the real file, so that
+    entity lookups get more expensive as the catalogue grows.
+    """
+    rng = random.Random(seed)
+    actor_pool = max(rows * 2, 10)
+    director_pool = max(rows * 2 // 3, 5)
+    with open(file_name, mode='w', encoding='utf-8', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(HEADER)
+        for rank in range(1, rows + 1):
+            writer.writerow([
+                rank,
+                f"Synthetic Movie {rank}",
+                ",".join(rng.sample(GENRES, rng.randint(1, 3))),
+                f"Description of synthetic movie number {rank}.",
+                f"Director {rng.randrange(director_pool)}",
+                ", ".join(f"Actor {rng.randrange(actor_pool)}" for _ in range(4)),
+                rng.randint(2006, 2016),
+                rng.randint(66, 191),
+                round(rng.uniform(1.9, 9.0), 1),
+                rng.randint(61, 1791916),
+                round(rng.uniform(0, 936.63), 2),
+                rng.randint(11, 100),
+            ])
+    return file_name
+
+
+def synthetic_catalogue_path(directory: str, rows: int):
+    file_name = os.path.join(directory, f"synthetic_{rows}.csv")
+    if not os.path.exists(file_name):
+        write_synthetic_catalogue(file_name, rows)
+    return file_name
@@ -16,8 +16,29 @@ class Config:
     SECRET_KEY = environ.get('SECRET_KEY')
     # Database configuration
     SQLALCHEMY_DATABASE_URI = environ.get('SQLALCHEMY_DATABASE_URI')
-    SQLALCHEMY_ECHO = True
+    SQLALCHEMY_ECHO = environ.get('SQLALCHEMY_ECHO', 'False') == 'True'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool: QueuePool, NullPool, StaticPool or SingletonThreadPool (from sqlalchemy.pool).
+    SQLALCHEMY_POOL_CLASS = environ.get('SQLALCHEMY_POOL_CLASS', 'QueuePool')
+    SQLALCHEMY_POOL_SIZE = int(environ.get('SQLALCHEMY_POOL_SIZE', 5))
+    SQLALCHEMY_MAX_OVERFLOW = int(environ.get('SQLALCHEMY_MAX_OVERFLOW', 10))
+    SQLALCHEMY_POOL_PRE_PING = environ.get('SQLALCHEMY_POOL_PRE_PING', 'True') == 'True'
+    # Pragmas applied to every new SQLite connection.
+    SQLITE_JOURNAL_MODE = environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
 
     REPOSITORY = environ.get('REPOSITORY')
-
+    # Pickled MemoryRepository used to skip re-parsing the CSV on restart (memory repository only).
+    MEMORY_SNAPSHOT_PATH = environ.get('MEMORY_SNAPSHOT_PATH')
+    # Cache for rendered page fragments: 'memory' (per process), 'disk' (files in FRAGMENT_CACHE_DIR) or 'none'.
+    FRAGMENT_CACHE = environ.get('FRAGMENT_CACHE', 'memory')
+    FRAGMENT_CACHE_DIR = environ.get('FRAGMENT_CACHE_DIR', path.join('instance', 'fragment-cache'))
+    FRAGMENT_CACHE_SIZE = int(environ.get('FRAGMENT_CACHE_SIZE', 64))
+    FRAGMENT_CACHE_TTL = float(environ.get('FRAGMENT_CACHE_TTL', 300))
+    # Poster URLs by title and year, filled by `flask posters backfill`. A movie found to have no poster is looked
+    # up again after POSTER_NEGATIVE_TTL seconds.
+    POSTER_CACHE_PATH = environ.get('POSTER_CACHE_PATH', path.join('instance', 'posters.json'))
+    POSTER_NEGATIVE_TTL = float(environ.get('POSTER_NEGATIVE_TTL', 7 * 24 * 3600))
+    TMDB_API_KEY = environ.get('TMDB_API_KEY')
+    POSTER_API_URL = environ.get('POSTER_API_URL', 'https://api.themoviedb.org/3')
@@ -1,6 +1,6 @@
 import os
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import clear_mappers, sessionmaker
 
 from website import create_app
@@ -92,6 +92,51 @@ def client():
     return my_app.test_client()
 
 
+@pytest.fixture
+def memory_client(tmp_path):
+    my_app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': TEST_DATA_PATH_DATABASE,
+        'MEMORY_SNAPSHOT_PATH': None,
+        'POSTER_CACHE_PATH': str(tmp_path / 'posters.json'),
+        'WTF_CSRF_ENABLED': False
+    })
+
+    return my_app.test_client()
+
+
+class QueryCounter:
+    """ Records the SQL statements an engine executes while the counter is active. """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self.statements = []
+        self.parameters = []
+
+    def __enter__(self):
+        event.listen(self._engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self._engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(session_factory):
+    def make_counter():
+        return QueryCounter(session_factory.kw['bind'])
+    return make_counter
+
+
 class AuthenticationManager:
     def __init__(self, client):
         self._client = client
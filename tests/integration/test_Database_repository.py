@@ -2,9 +2,11 @@ from datetime import date, datetime
 
 import pytest
 
-from website.directory.database_repository import SqlAlchemyRepository
+from sqlalchemy import pool
+
+from website.directory.database_repository import SqlAlchemyRepository, create_database_engine
 from website.domainmodel.model import User, Genre, Movie, Director, Actor, Review, make_review
-from website.directory.repository import RepositoryException
+from website.directory.repository import RepositoryException, MovieQuery
 
 """
 Testing all adding functions will fail due a threading error
@@ -94,6 +96,13 @@ Again I can't add anything without  threading error so I can't test properly
 
 
 
+def test_repository_retrieves_a_movie_by_title_in_any_case(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    assert repo.get_movie_by_title("interstellar") == Movie("Interstellar", 2014)
+    assert repo.get_movie_by_title("Inter%") is None
+
+
 def test_repository_does_not_retrieve_a_non_existent_movie(session_factory):
     repo = SqlAlchemyRepository(session_factory)
 
@@ -115,14 +124,14 @@ def test_repository_can_retrieve_movies_by_actor(session_factory):
     assert len(movies) == 13
 
 
-# def test_repository_can_retrieve_movies_by_director(session_factory):
-#     repo = SqlAlchemyRepository(session_factory)
-#
-#     movies = repo.get_movies_by_director("michael bay")
-#
-#     assert len(movies) == 6
-#     movies = repo.get_movies_by_actor("Brad Pitt")
-#     assert len(movies) == 13
+def test_repository_can_retrieve_movies_by_director(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movies = repo.get_movies_by_director("michael bay")
+
+    assert len(movies) == 6
+    for movie in movies:
+        assert movie.director == Director("Michael Bay")
 
 def test_repository_can_retrieve_review_for_movie(session_factory):
     repo = SqlAlchemyRepository(session_factory)
@@ -221,3 +230,230 @@ def test_repository_does_not_add_a_comment_without_a_user(session_factory):
     with pytest.raises(RepositoryException):
         repo.add_review(comment)
 
+
+
+def test_repository_retrieves_both_movies_sharing_a_title(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    first = repo.get_movie(Movie("The Host", 2013))
+    second = repo.get_movie(Movie("The Host", 2006))
+
+    assert first.release == 2013
+    assert second.release == 2006
+
+
+@pytest.mark.parametrize(('method', 'argument'), (
+        ('get_all_movies_genre', Genre("Drama")),
+        ('get_10_movies_genre', Genre("Action")),
+        ('get_movies_by_actor', "Matt"),
+        ('get_movies_by_director', "Ridley Scott"),
+))
+def test_repository_movie_listings_use_a_fixed_number_of_queries(session_factory, count_queries, method, argument):
+    repo = SqlAlchemyRepository(session_factory)
+
+    with count_queries() as counter:
+        movies = getattr(repo, method)(argument)
+        for movie in movies:
+            # Touch the relationships a listing page renders; they must already be loaded.
+            movie.director, list(movie.actors), list(movie.genres)
+
+    # One query for the movies, plus one per relationship for every batch of 500 movies selectinload fetches.
+    assert len(movies) > 1
+    assert counter.count <= 1 + 2 * (len(movies) // 500 + 1), counter.statements
+
+
+def test_repository_home_page_movies_match_the_per_genre_listings(session_factory, count_queries):
+    repo = SqlAlchemyRepository(session_factory)
+
+    with count_queries() as counter:
+        ten_movies, movies_genres = repo.get_home_page_movies()
+
+    assert counter.count <= 4, counter.statements
+    assert ten_movies == repo.get_10_movies()
+    assert len(movies_genres) == 20
+    for genre, movies in movies_genres.items():
+        assert movies == repo.get_10_movies_genre(genre)
+    assert len(movies_genres[Genre("Western")]) == 5
+
+
+def test_database_engine_applies_pool_and_sqlite_settings(tmp_path):
+    engine = create_database_engine({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'movies.db'),
+        'SQLALCHEMY_POOL_CLASS': 'QueuePool',
+        'SQLALCHEMY_POOL_SIZE': 3,
+        'SQLITE_SYNCHRONOUS': 'OFF',
+    })
+
+    assert isinstance(engine.pool, pool.QueuePool)
+    assert engine.pool.size() == 3
+    with engine.connect() as connection:
+        assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+        assert connection.execute('PRAGMA synchronous').scalar() == 0
+    engine.dispose()
+
+
+def test_in_memory_database_engine_shares_one_connection():
+    engine = create_database_engine({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SQLALCHEMY_POOL_CLASS': 'NullPool'})
+
+    assert isinstance(engine.pool, pool.StaticPool)
+    engine.execute('CREATE TABLE example (id INTEGER)')
+    with engine.connect() as connection:
+        assert connection.execute('SELECT count(*) FROM example').scalar() == 0
+
+
+def test_repository_searches_titles_by_substring(session_factory, in_memory_repo):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movies = repo.get_movies_by_title("guardians of the gal")
+
+    assert movies[0].title == "Guardians of the Galaxy"
+    assert repo.get_movies_by_title("xyzzy") == []
+    # Like the memory repository, the search matches inside words.
+    assert sorted(movie.title for movie in repo.get_movies_by_title("ark")) == sorted(
+        movie.title for movie in in_memory_repo.get_movies_by_title("ark"))
+    assert len(repo.get_movies_by_title("ark")) > 0
+
+
+def test_repository_ranks_movies_by_actor_and_director_search(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # Every actor and director named like the search counts, not just the first one found.
+    assert len(repo.get_movies_by_actor("matt damon")) == 10
+    # A match can't run from one actor's name into the next.
+    assert repo.get_movies_by_actor("damon jessica") == []
+    assert {movie.director for movie in repo.get_movies_by_director("Scott")} >= {
+        Director("Ridley Scott"), Director("Tony Scott")
+    }
+
+
+def test_repository_search_ignores_query_syntax(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # Quotes and operators are searched for like any other characters.
+    assert repo.get_movies_by_title('"Prometheus*') == []
+    assert repo.get_movies_by_title('Prometheus" OR "Alien') == []
+    assert [movie.title for movie in repo.get_movies_by_title("Prometheus")] == ["Prometheus"]
+    assert len(repo.get_movies_by_title("")) == repo.get_number_of_movies()
+
+
+def test_repository_keyword_search_covers_descriptions(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    movies = repo.search_movies("extraterrestrial")
+
+    assert len(movies) > 0
+    assert all("extraterrestrial" in movie.description.lower() for movie in movies)
+
+
+def test_repository_searches_the_same_fields_as_the_memory_repository(session_factory, in_memory_repo):
+    repo = SqlAlchemyRepository(session_factory)
+
+    # "ri" is too short for the search table and is answered with LIKE instead.
+    for search in ("ri", "extraterrestrial"):
+        for method in ('search_movies', 'get_movies_by_title', 'get_movies_by_actor', 'get_movies_by_director'):
+            found = sorted(movie.title for movie in getattr(repo, method)(search))
+            assert found == sorted(movie.title for movie in getattr(in_memory_repo, method)(search)), (search, method)
+    assert len(repo.search_movies("ri")) > len(repo.get_movies_by_title("ri")) > 0
+
+
+def test_repository_search_index_follows_added_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    movie = Movie("Zyzzyva Nights", 2021)
+    movie.description = "A test movie."
+    movie.director = Director("Quentin Zyzzyva")
+    movie.add_actor(Actor("Mabel Zyzzyva"))
+    movie.runtime_minutes = 100
+    movie.rating = 5.0
+    repo.add_movie(movie)
+
+    assert repo.get_movies_by_title("zyzz") == [movie]
+    assert repo.get_movies_by_actor("mabel zyz") == [movie]
+    assert repo.get_movies_by_director("quentin zyz") == [movie]
+
+
+def test_repository_filters_and_sorts_movies_in_one_query(session_factory, count_queries):
+    repo = SqlAlchemyRepository(session_factory)
+    query = MovieQuery(genres=["Sci-Fi"], year=(2014, 2014))
+
+    with count_queries() as counter:
+        movies = repo.get_movies_matching(query, limit=3)
+    assert [movie.title for movie in movies] == ["Interstellar", "Guardians of the Galaxy",
+                                                 "X-Men: Days of Future Past"]
+    assert counter.count <= 3
+    assert repo.count_movies_matching(query) == 17
+
+
+def test_repository_filters_movies_by_actor_runtime_and_search(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+
+    query = MovieQuery(actor="Chris Pratt", runtime=(110, 130), sort='year', descending=False)
+    assert [movie.title for movie in repo.get_movies_matching(query)] == [
+        "Guardians of the Galaxy", "Jurassic World", "Passengers"]
+    query = MovieQuery(text="guardians", text_field='title', sort='title')
+    assert [movie.title for movie in repo.get_movies_matching(query)] == ["Guardians of the Galaxy"]
+    assert repo.get_movies_matching(MovieQuery(sort='title'), offset=999)[0].title == "Zootopia"
+
+
+def test_repository_pages_movies_with_cursors(session_factory, count_queries):
+    repo = SqlAlchemyRepository(session_factory)
+    query = MovieQuery(genres=["Drama"])
+    movies, cursor = repo.get_movies_after(query, 2)
+    assert [movie.title for movie in movies] == ["The Dark Knight", "Dangal"]
+
+    listed = movies
+    while cursor is not None:
+        with count_queries() as counter:
+            movies, cursor = repo.get_movies_after(query, 60, cursor)
+        assert counter.count <= 4
+        listed += movies
+    assert listed == repo.get_movies_matching(query)
+
+    query = MovieQuery(text="guardians", text_field='title', sort='added')
+    assert [movie.title for movie in repo.get_movies_after(query, 60)[0]] == ["Guardians of the Galaxy"]
+
+
+def test_repository_pages_searches_in_rank_order(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    # "ar" is too short for the search table, so its matches have no rank and come in the order they were added.
+    for search in ("ark", "ar"):
+        query = MovieQuery(text=search, text_field='title', sort='relevance')
+        listed, cursor = repo.get_movies_after(query, 3)
+        while cursor is not None:
+            movies, cursor = repo.get_movies_after(query, 3, cursor)
+            listed += movies
+        assert listed == repo.get_movies_by_title(search) == repo.get_movies_matching(query)
+    assert repo.get_movies_matching(MovieQuery(text="mars", sort='relevance')) == repo.search_movies("mars")
+
+
+def test_repository_versions_move_on_with_the_changes_they_cover(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    interstellar = repo.get_movie(Movie("Interstellar", 2014))
+    prometheus = repo.get_movie(Movie("Prometheus", 2012))
+    before = (repo.get_version(), repo.get_version(interstellar), repo.get_version(prometheus),
+              repo.get_version(genre=Genre("Sci-Fi")))
+
+    repo.add_review(make_review("mean movie!", repo.get_user('thorke'), interstellar, 10))
+    assert repo.get_version() > before[0]
+    assert repo.get_version(interstellar) > before[1]
+    assert (repo.get_version(prometheus), repo.get_version(genre=Genre("Sci-Fi"))) == before[2:]
+
+    movie = Movie("A Brand New Movie", 2021)
+    movie.description = "A test movie."
+    movie.director = Director("Ridley Scott")
+    movie.runtime_minutes = 100
+    movie.rating = 5.0
+    movie.add_genre(repo.get_genres()[0])
+    repo.add_movie(movie)
+    assert repo.get_version(genre=repo.get_genres()[0]) > before[0]
+    assert repo.get_version(prometheus) == before[2]
+
+
+def test_repository_stores_posters_and_moves_versions_on(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    before = repo.get_version()
+    posters = {("Prometheus", 2012): "https://image.tmdb.org/t/p/w500/prometheus.jpg"}
+
+    assert repo.set_posters(lambda title, year: posters.get((title, year))) == 1
+    assert repo.get_movie(Movie("Prometheus", 2012)).image == "https://image.tmdb.org/t/p/w500/prometheus.jpg"
+    assert repo.get_version() > before
+    assert repo.set_posters(lambda title, year: posters.get((title, year))) == 0
@@ -3,6 +3,9 @@ import datetime
 import pytest
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import clear_mappers, configure_mappers
+
+from website.directory.orm import map_model_to_tables
 
 from website.domainmodel.model import User, Movie, Review, Genre, Actor, Director, make_review
 
@@ -298,4 +301,29 @@ def test_save_commented_movie(empty_session):
     # Check that the comments table has a new record that links to the articles and users
     # tables.
     rows = list(empty_session.execute('SELECT user_id, movie_id, comment FROM reviews'))
-    assert rows == [(user_key, movie_key, comment_text)]
\ No newline at end of file
+    assert rows == [(user_key, movie_key, comment_text)]
+
+
+def test_objects_created_before_mapping_stay_readable():
+    clear_mappers()
+    movie = Movie("Prometheus", 2012)
+    movie.director = Director("Ridley Scott")
+    movie.add_actor(Actor("Noomi Rapace"))
+    movie.add_genre(Genre("Sci-Fi"))
+    movie.rating = 7.0
+    user = User("Dave", "123456789")
+    review = make_review("Seen it twice", user, movie, 8)
+
+    def read_back():
+        return (movie.title, movie.release, movie.rating, movie.director.director_full_name,
+                [actor.actor_full_name for actor in movie.actors], [genre.genre_name for genre in movie.genres],
+                user.user_name, review.review_text, review.rating, review.movie is movie)
+
+    before = read_back()
+    map_model_to_tables()
+    configure_mappers()
+    try:
+        assert read_back() == before
+    finally:
+        clear_mappers()
+    assert read_back() == before
@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from website.directory.database_repository import SqlAlchemyRepository
+from sqlalchemy import create_engine, inspect
+
+from website.directory.orm import metadata, create_missing_indexes
+from website.domainmodel.model import Genre, Movie
+
+TABLES = {table.name for table in metadata.sorted_tables}
+
+
+def query_plans(session_factory, counter):
+    engine = session_factory.kw['bind']
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            rows = connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            plans.append((statement, [row[-1] for row in rows]))
+    return plans
+
+
+def full_table_scans(plan):
+    # "SCAN movies" reads every row; "SCAN movies USING INDEX ..." walks an index in order and may stop early.
+    scans = []
+    for step in plan:
+        match = re.fullmatch(r'SCAN (TABLE )?(\w+)( AS \w+)?', step)
+        # SQLAlchemy aliases tables as movies_1, movie_genres_1, ...
+        if match and re.sub(r'_\d+$', '', match.group(2)) in TABLES:
+            scans.append(step)
+    return scans
+
+
+@pytest.mark.parametrize(('method', 'argument'), (
+        ('get_user', 'thorke'),
+        ('get_movie', Movie("Interstellar", 2014)),
+        ('get_movie_by_title', "Interstellar"),
+        ('get_10_movies', None),
+        ('get_10_movies_genre', Genre("Action")),
+        ('get_all_movies_genre', Genre("Drama")),
+))
+def test_hot_queries_do_not_scan_tables(session_factory, count_queries, method, argument):
+    repo = SqlAlchemyRepository(session_factory)
+
+    with count_queries() as counter:
+        if argument is None:
+            getattr(repo, method)()
+        else:
+            getattr(repo, method)(argument)
+
+    for statement, plan in query_plans(session_factory, counter):
+        assert full_table_scans(plan) == [], (statement, plan)
+
+
+def test_reviews_for_movie_do_not_scan_tables(session_factory, count_queries):
+    repo = SqlAlchemyRepository(session_factory)
+    movie = repo.get_movie(Movie("Interstellar", 2014))
+
+    with count_queries() as counter:
+        repo.get_review_for_movie(movie)
+
+    for statement, plan in query_plans(session_factory, counter):
+        assert full_table_scans(plan) == [], (statement, plan)
+
+
+def test_missing_indexes_are_added_to_an_existing_database():
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            engine.execute('DROP INDEX ' + index.name)
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)
+
+    names = {name for name, in engine.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for table in metadata.sorted_tables:
+        assert {index.name for index in table.indexes} <= names
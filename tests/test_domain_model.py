@@ -61,6 +61,24 @@ def test_movie_less_than_operator():
     assert movie_1 < movie_2
 
 
+def test_movie_ordering_is_by_title_then_release():
+    up_2009 = Movie("Up", 2009)
+    up_2016 = Movie("Up", 2016)
+    up_2 = Movie("Up 2", 2000)
+
+    assert sorted([up_2, up_2016, up_2009]) == [up_2009, up_2016, up_2]
+    assert up_2016 >= up_2009 and up_2009 <= Movie("Up", 2009)
+    assert up_2009 != "Up" and up_2009 != None
+    assert sorted([up_2, up_2016, up_2009], key=Movie.sort_key) == [up_2009, up_2016, up_2]
+    with pytest.raises(TypeError):
+        up_2009 < "Up"
+
+
+def test_user_ordering_is_by_user_name():
+    assert User("alice", "zzzzzzzz") < User("bob", "aaaaaaaa")
+    assert User("bob", "aaaaaaaa") >= User("Bob", "bbbbbbbb")
+
+
 def test_review_construction(review):
 
     assert review.movie.__str__() == '<Movie Guardians of the Galaxy, 2014>'
@@ -87,6 +105,15 @@ def test_make_review_establishes_relationships(movie, user):
     assert review in user.reviews
 
 
+def test_review_stays_attached_after_it_changes(movie, user):
+    review = make_review('Best movie ever!', user, movie, 10)
+    review.timestamp = datetime(2020, 9, 13, 12, 0)
+    review.rating = 9
+
+    assert review in user.reviews
+    assert review in movie.reviews
+
+
 def test_make_review_multiple(movie, user):
     review_text = 'Best movie ever!'
     review = make_review(review_text, user, movie, 10)
@@ -4,8 +4,8 @@ from typing import List
 
 import pytest
 
-from website.directory import memory_repository
-from website.directory.repository import AbstractRepository, RepositoryException
+from website.directory import memory_repository, repository
+from website.directory.repository import AbstractRepository, RepositoryException, MovieQuery
 from website.domainmodel.model import Movie, User, Review, Actor, Director, Genre, make_review, ReviewException
 
 from website.datafilereaders import movie_file_csv_reader
@@ -128,9 +128,15 @@ def test_repository_can_retrieve_movies_by_actor():
     for movie in movies:
         assert actor in movie.actors
 
-def test_repository_can_retrieve_movie_url():
-    url = memory_repository.imdb_from_title("The Dark Knight", 2008)
-    assert url == "https://image.tmdb.org/t/p/w500/qJ2tW6WMUDux911r6m7haRef0WH.jpg"
+def test_repository_sets_movie_posters(in_memory_repo):
+    url = "https://image.tmdb.org/t/p/w500/qJ2tW6WMUDux911r6m7haRef0WH.jpg"
+    dark_knight = in_memory_repo.get_movie(Movie("The Dark Knight", 2008))
+    before = in_memory_repo.get_version(dark_knight)
+
+    posters = {("The Dark Knight", 2008): url}
+    assert in_memory_repo.set_posters(lambda title, year: posters.get((title, year))) == 1
+    assert dark_knight.image == url
+    assert in_memory_repo.get_version(dark_knight) > before
 
 
 def test_repository_can_retrieve_movies_by_director():
@@ -206,3 +212,224 @@ def test_repository_can_retrieve_reviews(in_memory_repo):
     in_memory_repo.add_review(another_review)
 
     assert len(in_memory_repo.get_reviews()) == 2
+
+def test_populate_parses_movie_file_once(monkeypatch):
+    calls = []
+    read_csv_file = movie_file_csv_reader.MovieFileCSVReader.read_csv_file
+
+    def counting_read_csv_file(reader):
+        calls.append(reader)
+        return read_csv_file(reader)
+
+    monkeypatch.setattr(movie_file_csv_reader.MovieFileCSVReader, 'read_csv_file', counting_read_csv_file)
+    repo = memory_repository.MemoryRepository()
+    memory_repository.populate(data_path, repo)
+
+    assert len(calls) == 1
+    assert repo.get_number_of_movies() == 1000
+    assert len(repo.get_genres()) == 20
+    assert len(repo.get_actors()) == 1985
+    assert len(repo.get_director()) == 644
+
+def test_repository_can_warm_start_from_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / 'movies.snapshot')
+    repo = memory_repository.load_repository(data_path, snapshot_path)
+    assert os.path.exists(snapshot_path)
+
+    snapshot = memory_repository.MemoryRepository.load_snapshot(snapshot_path, data_path)
+    assert snapshot is not repo
+    assert snapshot.get_number_of_movies() == repo.get_number_of_movies()
+    movie = snapshot.get_movie(Movie("Guardians of the Galaxy", 2014))
+    assert movie.rating == 8.1
+    assert movie.director == Director("James Gunn")
+
+
+def test_snapshot_is_invalidated_when_source_changes(tmp_path):
+    source_path = str(tmp_path / 'Data1000Movies.csv')
+    with open(data_path, encoding='utf-8-sig') as source, open(source_path, 'w', encoding='utf-8') as copy:
+        copy.write(source.read())
+    snapshot_path = str(tmp_path / 'movies.snapshot')
+    memory_repository.load_repository(source_path, snapshot_path)
+
+    # Touching the file without changing it keeps the snapshot valid.
+    os.utime(source_path, ns=(0, 0))
+    assert memory_repository.MemoryRepository.load_snapshot(snapshot_path, source_path) is not None
+
+    with open(source_path, 'a', encoding='utf-8') as copy:
+        copy.write('1001,New Movie,Drama,A new movie.,Some Director,Some Actor,2016,100,5.0,10,,50\n')
+    assert memory_repository.MemoryRepository.load_snapshot(snapshot_path, source_path) is None
+
+    repo = memory_repository.load_repository(source_path, snapshot_path)
+    assert repo.get_number_of_movies() == 1001
+
+def test_repository_does_not_add_a_duplicate_movie():
+    repo = memory_repository.MemoryRepository()
+    movie = Movie("Prometheus", 2012)
+    repo.add_movie(movie)
+    repo.add_movie(Movie("Prometheus", 2012))
+
+    assert repo.get_number_of_movies() == 1
+    assert repo.get_movie(Movie("Prometheus", 2012)) is movie
+    assert repo.get_movie_by_title("Prometheus") is movie
+
+
+def test_repository_distinguishes_movies_with_the_same_title(in_memory_repo):
+    first = in_memory_repo.get_movie(Movie("The Host", 2013))
+    second = in_memory_repo.get_movie(Movie("The Host", 2006))
+
+    assert first is not None and second is not None
+    assert first is not second
+    assert in_memory_repo.get_movie_by_title("The Host") in (first, second)
+
+def test_repository_top_movies_come_in_rating_order(in_memory_repo):
+    movies = in_memory_repo.get_10_movies()
+    ratings = [movie.rating for movie in movies]
+
+    assert ratings == sorted(ratings, reverse=True)
+    assert ratings[0] == max(movie.rating for movie in in_memory_repo._movies)
+
+
+def test_repository_top_movies_in_genre_are_its_highest_rated(in_memory_repo):
+    genre = Genre("Horror")
+    movies = in_memory_repo.get_10_movies_genre(genre)
+    expected = sorted(in_memory_repo.get_all_movies_genre(genre), key=lambda movie: movie.rating, reverse=True)
+
+    assert [movie.rating for movie in movies] == [movie.rating for movie in expected[:10]]
+    assert len(in_memory_repo.get_10_movies_genre(Genre("Western"))) == 5
+
+
+def test_repository_top_movies_include_movies_added_later(in_memory_repo):
+    movie = Movie("Best Movie Ever", 2020)
+    movie.rating = 9.9
+    movie.add_genre(Genre("Western"))
+    in_memory_repo.add_movie(movie)
+
+    assert in_memory_repo.get_10_movies()[0] is movie
+    assert in_memory_repo.get_10_movies_genre(Genre("Western"))[0] is movie
+    assert in_memory_repo.get_all_movies_genre(Genre("Western"))[-1] is movie
+
+def test_repository_returns_reviews_for_movie_in_timestamp_order(in_memory_repo):
+    user = User('dave', '123456789')
+    in_memory_repo.add_user(user)
+    movie = in_memory_repo.get_movie(Movie("Prometheus", 2012))
+    other_movie = in_memory_repo.get_movie(Movie("Split", 2016))
+
+    later = make_review("Seen it twice", user, movie, 8)
+    later.timestamp = datetime(2020, 10, 2)
+    earlier = make_review("Not bad", user, movie, 6)
+    earlier.timestamp = datetime(2020, 10, 1)
+    other = make_review("Scary", user, other_movie, 7)
+    other.timestamp = datetime(2020, 10, 3)
+    for review in (later, earlier, other):
+        in_memory_repo.add_review(review)
+
+    assert in_memory_repo.get_review_for_movie(movie) == [earlier, later]
+    assert in_memory_repo.get_review_for_movie(other_movie) == [other]
+    assert in_memory_repo.get_reviews_for_user(user) == [earlier, later, other]
+    assert in_memory_repo.get_review_for_movie(Movie("Split", 2006)) == []
+
+
+def test_repository_keyword_search_covers_titles_actors_and_directors(in_memory_repo):
+    movies = in_memory_repo.search_movies("ridley")
+
+    assert set(in_memory_repo.get_movies_by_director("ridley")) <= set(movies)
+    assert in_memory_repo.get_movie_by_title("Prometheus") in in_memory_repo.search_movies("prometh")
+    assert in_memory_repo.search_movies("xyzzy") == []
+
+
+def test_repository_columnar_analytics_agree_with_the_rating_index(in_memory_repo):
+    pytest.importorskip("numpy")
+    action = Genre("Action")
+
+    assert in_memory_repo.get_top_rated_movies(10) == in_memory_repo.get_10_movies()
+    assert in_memory_repo.get_top_rated_movies(10, action) == in_memory_repo.get_10_movies_genre(action)
+    assert sum(in_memory_repo.get_release_year_histogram().values()) == in_memory_repo.get_number_of_movies()
+
+    movie = Movie("A Columnar Movie", 2016)
+    movie.rating = 10.0
+    movie.runtime_minutes = 100
+    in_memory_repo.add_movie(movie)
+    assert in_memory_repo.get_top_rated_movies(1) == [movie]
+    assert movie in in_memory_repo.get_movies_in_ranges(rating=(9.5, None), release=(2016, 2016))
+
+
+def test_repository_filters_and_sorts_movies(in_memory_repo):
+    query = MovieQuery(genres=["Sci-Fi"], year=(2014, 2014))
+    assert [movie.title for movie in in_memory_repo.get_movies_matching(query, limit=3)] == [
+        "Interstellar", "Guardians of the Galaxy", "X-Men: Days of Future Past"]
+    assert in_memory_repo.count_movies_matching(query) == 17
+
+    query = MovieQuery(actor="Chris Pratt", runtime=(110, 130), sort='year', descending=False)
+    assert [movie.title for movie in in_memory_repo.get_movies_matching(query)] == [
+        "Guardians of the Galaxy", "Jurassic World", "Passengers"]
+    query = MovieQuery(text="guardians", text_field='title', sort='title')
+    assert [movie.title for movie in in_memory_repo.get_movies_matching(query)] == ["Guardians of the Galaxy"]
+
+
+def test_repository_pages_movies_with_cursors(in_memory_repo):
+    query = MovieQuery(genres=["Drama"])
+    movies, cursor = in_memory_repo.get_movies_after(query, 2)
+    assert [movie.title for movie in movies] == ["The Dark Knight", "Dangal"]
+
+    listed = movies
+    while cursor is not None:
+        movies, cursor = in_memory_repo.get_movies_after(query, 60, cursor)
+        listed += movies
+    assert listed == in_memory_repo.get_movies_matching(query)
+
+    with pytest.raises(ValueError):
+        in_memory_repo.get_movies_after(MovieQuery(genres=["Drama"], sort='title'), 60, "garbage")
+
+    query = MovieQuery(text="ark", text_field='title', sort='relevance')
+    listed, cursor = in_memory_repo.get_movies_after(query, 3)
+    while cursor is not None:
+        movies, cursor = in_memory_repo.get_movies_after(query, 3, cursor)
+        listed += movies
+    assert listed == in_memory_repo.get_movies_by_title("ark")
+
+
+def test_repository_streams_movies_in_batches(in_memory_repo):
+    query = MovieQuery(genres=["Drama"])
+    expected, expected_cursor = in_memory_repo.get_movies_after(query, 7)
+
+    stream = in_memory_repo.iter_movies_after(query, 7, batch_size=3)
+    assert list(stream) == expected
+    assert stream.next_cursor == expected_cursor
+
+    stream = in_memory_repo.iter_movies_after(query, 1000, expected_cursor, batch_size=3)
+    assert list(stream) == in_memory_repo.get_movies_matching(query)[7:]
+    assert stream.next_cursor is None
+
+    with pytest.raises(ValueError):
+        in_memory_repo.iter_movies_after(query, 7, "garbage")
+
+
+def test_repository_notifies_change_listeners(in_memory_repo, monkeypatch):
+    changes = []
+    monkeypatch.setattr(repository, 'change_listeners', [lambda: changes.append(1)])
+    movie = Movie("Zyzzyva", 2021)
+    in_memory_repo.add_movie(movie)
+    in_memory_repo.add_movie(Movie("Zyzzyva", 2021))
+    assert len(changes) == 1
+
+    review = make_review("Not good", User('dave', '123456789'), movie, 4, datetime.today())
+    in_memory_repo.add_review(review)
+    assert len(changes) == 2
+
+
+def test_repository_versions_move_on_with_the_changes_they_cover(in_memory_repo):
+    interstellar = in_memory_repo.get_movie(Movie("Interstellar", 2014))
+    prometheus = in_memory_repo.get_movie(Movie("Prometheus", 2012))
+    before = (in_memory_repo.get_version(), in_memory_repo.get_version(interstellar),
+              in_memory_repo.get_version(prometheus), in_memory_repo.get_version(genre=Genre("Sci-Fi")))
+
+    in_memory_repo.add_review(make_review("mean movie!", User('dave', '123456789'), interstellar, 10))
+    assert in_memory_repo.get_version() > before[0]
+    assert in_memory_repo.get_version(interstellar) > before[1]
+    assert (in_memory_repo.get_version(prometheus), in_memory_repo.get_version(genre=Genre("Sci-Fi"))) == before[2:]
+
+    movie = Movie("A Brand New Movie", 2021)
+    movie.add_genre(Genre("Western"))
+    in_memory_repo.add_movie(movie)
+    assert in_memory_repo.get_version(genre=Genre("Western")) > before[0]
+    assert in_memory_repo.get_version(prometheus) == before[2]
@@ -158,4 +158,12 @@ def test_get_all_movies_genre(in_memory_repo):
 
 def test_get_all_movies_non_existant_genre(in_memory_repo):
     with pytest.raises(genre_services.NonExistentGenreException):
-        genre_services.get_all_movies_genre(in_memory_repo, None)
\ No newline at end of file
+        genre_services.get_all_movies_genre(in_memory_repo, None)
+
+def test_get_home_page_movies(in_memory_repo):
+    ten_movies, movies_genres = home_services.get_home_page_movies(in_memory_repo)
+
+    assert ten_movies == home_services.get_ten_movies(in_memory_repo)
+    assert list(movies_genres) == home_services.get_genres(in_memory_repo)
+    for genre, movies in movies_genres.items():
+        assert movies == home_services.get_10_movies_genre(in_memory_repo, genre)
@@ -1,7 +1,11 @@
+import re
+
 import pytest
 
 from flask import session
+import website.directory.repository as repo
 from website.directory.database_repository import SqlAlchemyRepository
+from website.domainmodel.model import Movie, Genre
 
 """
 Unfortunately I could not run these types of tests where the 
@@ -52,4 +56,42 @@ I am not sure how you would go about fixing this either
 #     # Check that a session has been created for the logged-in user.
 #     with client:
 #         client.get('/')
-#         assert session['username'] == 'thorke'
\ No newline at end of file
+#         assert session['username'] == 'thorke'
+
+def listed_titles(response):
+    return re.findall(r"movie=([^']*)'", response.get_data(as_text=True))
+
+
+def test_search_pages_every_field_by_cursor(memory_client):
+    for parameter in ('Keyword', 'Title'):
+        response = memory_client.get(f'/search?parameter={parameter}&search_parameter=the')
+        assert response.status_code == 200
+        listed = listed_titles(response)
+        assert len(listed) == 60
+        next_page = re.search(r'href="([^"]*cursor=[^"]*)"', response.get_data(as_text=True)).group(1)
+        response = memory_client.get(next_page.replace('&amp;', '&'))
+        assert response.status_code == 200
+        assert not set(listed_titles(response)) & set(listed)
+
+    assert memory_client.get('/search?parameter=Keyword&search_parameter=the&cursor=garbage').status_code == 400
+
+
+def test_genre_page_changes_with_every_genre_it_lists(memory_client):
+    url = '/gen?genre=Drama&genres=Western&genre_match=any'
+    etag = memory_client.get(url).headers['ETag']
+    drama_etag = memory_client.get('/gen?genre=Drama').headers['ETag']
+    assert memory_client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    movie = Movie("A Brand New Western", 2021)
+    movie.add_genre(Genre("Western"))
+    repo.repo_instance.add_movie(movie)
+    assert memory_client.get(url, headers={'If-None-Match': etag}).status_code == 200
+    assert memory_client.get('/gen?genre=Drama', headers={'If-None-Match': drama_etag}).status_code == 304
+
+
+@pytest.mark.parametrize('arguments', ('year_from=abc', 'rating_max=high', 'sort=bogus', 'order=up'))
+def test_listings_reject_malformed_arguments(memory_client, arguments):
+    assert memory_client.get(f'/gen?genre=Drama&{arguments}').status_code == 400
+    response = memory_client.get(f'/api/v1/movies?{arguments}')
+    assert response.status_code == 400
+    assert response.get_json()['error']
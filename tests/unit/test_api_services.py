@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import website.api.services as services
+from website.directory.memory_repository import MemoryRepository
+from website.directory.repository import MovieQuery
+from website.domainmodel.model import Movie, Genre, Actor, Director, User, make_review
+
+
+def make_movie(title, release, rating, genres):
+    movie = Movie(title, release)
+    movie.rating = rating
+    movie.runtime_minutes = 100
+    movie.description = f"About {title}."
+    movie.director = Director("James Gunn")
+    movie.add_actor(Actor("Chris Pratt"))
+    for genre in genres:
+        movie.add_genre(Genre(genre))
+    return movie
+
+
+@pytest.fixture
+def repo():
+    repo = MemoryRepository()
+    for movie in [make_movie("Delta", 2015, 5.0, ["Animation"]), make_movie("Alpha", 2014, 8.1, ["Action", "Sci-Fi"]),
+                  make_movie("Beta", 2012, 7.0, ["Sci-Fi"]), make_movie("Gamma", 2016, 6.5, ["Action"])]:
+        repo.add_movie(movie)
+        for genre in movie.genres:
+            repo.add_genre(genre)
+    return repo
+
+
+def test_movie_pages_list_documents_with_a_cursor_and_total(repo):
+    page = json.loads(services.get_movies_page(repo, MovieQuery(genres=["Sci-Fi"]), None, 1))
+    assert page['total'] == 2
+    assert page['movies'] == [{
+        'title': "Alpha", 'year': 2014, 'description': "About Alpha.", 'director': "James Gunn",
+        'actors': ["Chris Pratt"], 'genres': ["Action", "Sci-Fi"], 'runtime': 100, 'rating': 8.1, 'votes': None,
+        'metascore': None, 'image': None,
+    }]
+
+    page = json.loads(services.get_movies_page(repo, MovieQuery(genres=["Sci-Fi"]), page['next_cursor'], 1,
+                                               ['title', 'rating']))
+    assert page == {'movies': [{'title': "Beta", 'rating': 7.0}], 'next_cursor': None, 'total': 2}
+
+    with pytest.raises(services.InvalidCursorException):
+        services.get_movies_page(repo, MovieQuery(), "garbage", 1)
+
+
+def test_fields_must_be_movie_fields():
+    assert services.select_fields(None) is None
+    assert services.select_fields("title, year") == ['title', 'year']
+    with pytest.raises(services.UnknownFieldException):
+        services.select_fields("title,password")
+
+
+def test_documents_are_kept_until_the_repository_changes(repo):
+    alpha = repo.get_movie(Movie("Alpha", 2014))
+    serialised = services.get_movie_json(repo, alpha)
+    assert services.get_movie_json(repo, alpha) is serialised
+    # Sorted by the whole name, not just its first letter.
+    assert json.loads(services.get_genres_json(repo)) == {'genres': [
+        {'name': "Action", 'movies': 2}, {'name': "Animation", 'movies': 1}, {'name': "Sci-Fi", 'movies': 2}
+    ]}
+
+    repo.add_movie(make_movie("Epsilon", 2016, 6.5, ["Action"]))
+    assert services.get_movie_json(repo, alpha) is not serialised
+    assert json.loads(services.get_genres_json(repo))['genres'][0] == {'name': "Action", 'movies': 3}
+
+
+def test_reviews_are_listed_for_their_movie(repo):
+    alpha = repo.get_movie(Movie("Alpha", 2014))
+    repo.add_review(make_review("Great fun", User('dave', '123456789'), alpha, 9))
+    reviews = json.loads(services.get_reviews_json(repo, alpha))['reviews']
+    assert [(review['user'], review['text'], review['rating']) for review in reviews] == [("dave", "Great fun", 9)]
+    with pytest.raises(services.NonExistentMovieException):
+        services.get_movie(repo, "Alpha", 2015)
@@ -0,0 +1,62 @@
+import pytest
+
+from website.domainmodel.model import Movie, Genre, Actor
+
+numpy = pytest.importorskip("numpy")
+
+from website.directory.columnar_catalogue import ColumnarCatalogue
+
+
+def make_movie(title, release, rating, runtime, genres, actors=(), metascore="50", votes=1000.0):
+    movie = Movie(title, release)
+    movie.rating = rating
+    movie.runtime_minutes = runtime
+    movie.metascore = metascore
+    movie.num_of_ratings = votes
+    for genre in genres:
+        movie.add_genre(Genre(genre))
+    for actor in actors:
+        movie.add_actor(Actor(actor))
+    return movie
+
+
+@pytest.fixture
+def catalogue():
+    return ColumnarCatalogue([
+        make_movie("Alpha", 2014, 8.1, 121, ["Action", "Sci-Fi"], ["Chris Pratt"]),
+        make_movie("Beta", 2012, 7.0, 124, ["Sci-Fi"], metascore="N/A"),
+        make_movie("Gamma", 2016, 8.1, 95, ["Action"], ["Chris Pratt"], votes=10.0),
+        make_movie("Delta", 2016, 6.5, 108, ["Comedy"]),
+    ])
+
+
+def test_top_rated_keeps_catalogue_order_for_ties(catalogue):
+    assert [movie.title for movie in catalogue.top_rated(3)] == ["Alpha", "Gamma", "Beta"]
+    assert [movie.title for movie in catalogue.top_rated(1, Genre("Sci-Fi"))] == ["Alpha"]
+    assert catalogue.top_rated(5, Genre("Western")) == []
+
+
+def test_average_rating_by_genre(catalogue):
+    averages = catalogue.average_rating_by_genre()
+
+    assert averages[Genre("Action")] == pytest.approx(8.1)
+    assert averages[Genre("Sci-Fi")] == pytest.approx(7.55)
+    assert averages[Genre("Comedy")] == pytest.approx(6.5)
+
+
+def test_histograms(catalogue):
+    assert catalogue.release_year_histogram() == {2012: 1, 2014: 1, 2016: 2}
+    assert catalogue.release_year_histogram(Genre("Action")) == {2014: 1, 2016: 1}
+    assert catalogue.runtime_histogram(30) == {90: 2, 120: 2}
+
+
+def test_in_ranges_combines_filters(catalogue):
+    titles = lambda movies: [movie.title for movie in movies]
+
+    assert titles(catalogue.in_ranges(rating=(7.0, None))) == ["Alpha", "Beta", "Gamma"]
+    assert titles(catalogue.in_ranges(release=(2015, 2016), runtime=(None, 100))) == ["Gamma"]
+    assert titles(catalogue.in_ranges(metascore=(0, 100))) == ["Alpha", "Gamma", "Delta"]
+    assert titles(catalogue.in_ranges(Genre("Action"), votes=(100, None))) == ["Alpha"]
+    assert titles(catalogue.in_ranges(actor=Actor("Chris Pratt"), rating=(8, 9))) == ["Alpha", "Gamma"]
+    with pytest.raises(ValueError):
+        catalogue.in_ranges(title=(None, None))
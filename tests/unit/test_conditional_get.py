@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask, session
+
+from website.conditional_get import conditional_page, templates_digest
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'testing'
+    app.page_version = 1600000000000000
+    app.renders = 0
+
+    @app.route('/page')
+    def page():
+        def render():
+            app.renders += 1
+            return "<p>page</p>"
+        return conditional_page(app.page_version, render)
+
+    @app.route('/login')
+    def login():
+        session['username'] = 'thorke'
+        return ''
+
+    return app
+
+
+def test_matching_etag_gets_not_modified_without_rendering(app):
+    client = app.test_client()
+    response = client.get('/page')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and not etag.startswith('W/')
+    assert response.headers['Last-Modified'] == 'Sun, 13 Sep 2020 12:26:40 GMT'
+
+    response = client.get('/page', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert app.renders == 1
+
+    app.page_version += 1
+    assert client.get('/page', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_if_modified_since_is_only_honoured_for_anonymous_visitors(app):
+    client = app.test_client()
+    last_modified = client.get('/page').headers['Last-Modified']
+    assert client.get('/page', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    anonymous_etag = client.get('/page').headers['ETag']
+    client.get('/login')
+    response = client.get('/page', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != anonymous_etag
+
+
+def test_templates_digest_changes_with_any_template(tmp_path):
+    (tmp_path / 'movies').mkdir()
+    (tmp_path / 'movies' / 'page.html').write_text("<p>{{ title }}</p>")
+    before = templates_digest(str(tmp_path))
+    assert templates_digest(str(tmp_path)) == before
+    (tmp_path / 'movies' / 'page.html').write_text("<h1>{{ title }}</h1>")
+    assert templates_digest(str(tmp_path)) != before
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from website.directory.filter_index import MovieFilterIndex
+from website.directory.repository import MovieQuery, encode_cursor, decode_cursor, movie_query_from_args
+from website.domainmodel.model import Movie, Genre, Actor, Director
+
+
+def make_movie(title, release, rating, runtime, genres, director, actors=(), votes=None):
+    movie = Movie(title, release)
+    movie.rating = rating
+    movie.runtime_minutes = runtime
+    if votes is not None:
+        movie.num_of_ratings = votes
+    movie.director = Director(director)
+    for genre in genres:
+        movie.add_genre(Genre(genre))
+    for actor in actors:
+        movie.add_actor(Actor(actor))
+    return movie
+
+
+@pytest.fixture
+def index():
+    return MovieFilterIndex([
+        make_movie("Alpha", 2014, 8.1, 121, ["Action", "Sci-Fi"], "James Gunn", ["Chris Pratt"], 757074.0),
+        make_movie("Beta", 2012, 7.0, 124, ["Sci-Fi"], "Ridley Scott", votes=485820.0),
+        make_movie("Gamma", 2016, 8.1, 95, ["Action"], "James Gunn", ["Chris Pratt"]),
+        make_movie("Delta", 2016, 6.5, 108, ["Comedy", "Action"], "Ridley Scott", votes=10.0),
+    ])
+
+
+def titles(movies):
+    return [movie.title for movie in movies]
+
+
+def test_genres_match_any_or_all(index):
+    assert titles(index.matching(MovieQuery(genres=["Sci-Fi", "Comedy"]))) == ["Alpha", "Beta", "Delta"]
+    assert titles(index.matching(MovieQuery(genres=["Action", "Sci-Fi"], match_all_genres=True))) == ["Alpha"]
+    assert index.matching(MovieQuery(genres=["Western"])) == []
+
+
+def test_ranges_and_people_combine(index):
+    query = MovieQuery(year=(2015, None), rating=(7, 9), director="James Gunn", actor="Chris Pratt")
+    assert titles(index.matching(query)) == ["Gamma"]
+    assert index.count(MovieQuery(runtime=(100, 130))) == 3
+
+
+def test_movies_without_a_value_never_match_its_range_and_sort_last(index):
+    assert titles(index.matching(MovieQuery(votes=(None, None), sort='votes'))) == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert titles(index.matching(MovieQuery(votes=(0, None)))) == ["Alpha", "Beta", "Delta"]
+    assert titles(index.matching(MovieQuery(sort='votes', descending=False))) == ["Delta", "Beta", "Alpha", "Gamma"]
+
+
+def test_sort_orders_and_ties(index):
+    # Equal ratings keep the order the movies were added in, whichever way the rating is sorted.
+    assert titles(index.matching(MovieQuery())) == ["Alpha", "Gamma", "Beta", "Delta"]
+    assert titles(index.matching(MovieQuery(sort='rating', descending=False))) == ["Delta", "Beta", "Alpha", "Gamma"]
+    assert titles(index.matching(MovieQuery(sort='title'))) == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert titles(index.matching(MovieQuery(sort='year'))) == ["Gamma", "Delta", "Alpha", "Beta"]
+
+
+def test_pages_and_text_matches(index):
+    assert titles(index.matching(MovieQuery(), offset=1, limit=2)) == ["Gamma", "Beta"]
+    assert index.matching(MovieQuery(), offset=10, limit=2) == []
+    found = [Movie("Delta", 2016), Movie("Beta", 2012)]
+    assert titles(index.matching(MovieQuery(), found=found)) == ["Beta", "Delta"]
+
+
+def test_query_rejects_unknown_sort_keys():
+    with pytest.raises(ValueError):
+        MovieQuery(sort='director')
+
+
+def walk_pages(index, query, limit, found=None):
+    pages, after = [], None
+    while True:
+        movies, after = index.page(query, limit, after, found)
+        pages.append(titles(movies))
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize('sort', MovieQuery.SORT_KEYS)
+@pytest.mark.parametrize('descending', [False, True])
+def test_keyset_pages_follow_the_listing_order(index, sort, descending):
+    # Only a text search sorts by relevance; an empty one matches every movie.
+    query = MovieQuery(sort=sort, descending=descending, text='' if sort == 'relevance' else None)
+    expected = titles(index.matching(query))
+    for limit in (1, 2, 3, 4):
+        pages = walk_pages(index, query, limit)
+        assert [title for page in pages for title in page] == expected
+        assert all(len(page) == limit for page in pages[:-1])
+
+
+@pytest.mark.parametrize('sort', MovieQuery.SORT_KEYS)
+def test_keyset_pages_of_few_matches_follow_the_listing_order(sort):
+    rng = random.Random(235)
+    movies = [make_movie(f"Movie {rng.randrange(50)}", 2000 + n, rng.choice([6.5, 7.0, 8.1]), rng.randrange(90, 95),
+                         ["Drama"], "Director", votes=rng.choice([None, 10.0, 20.0])) for n in range(200)]
+    index = MovieFilterIndex(movies)
+    # Few enough matches to be sorted directly rather than read off the index.
+    found = movies[::20]
+    for descending in (False, True):
+        query = MovieQuery(sort=sort, descending=descending, text='' if sort == 'relevance' else None)
+        pages = walk_pages(index, query, 3, found)
+        assert [title for page in pages for title in page] == titles(index.matching(query, found=found))
+
+
+def test_cursors_resume_after_their_movie_and_reject_other_orders():
+    query = MovieQuery(sort='votes')
+    assert decode_cursor(query, encode_cursor(query, 10.0, 3)) == (10.0, 3)
+    assert decode_cursor(query, encode_cursor(query, None, 2)) == (None, 2)
+    assert decode_cursor(query, None) is None
+    for cursor in ("not a cursor", encode_cursor(MovieQuery(sort='votes', descending=False), 10.0, 3),
+                   encode_cursor(query, "10", 3)):
+        with pytest.raises(ValueError):
+            decode_cursor(query, cursor)
+
+
+def test_listing_arguments_build_queries_and_reject_bad_numbers():
+    query = movie_query_from_args(MultiDict([('genres', 'Drama'), ('genres', 'Sci-Fi'), ('year_from', '2010'),
+                                             ('rating_min', ' 7.5 '), ('votes_max', ''), ('order', 'asc')]),
+                                  genres=["Action"], sort='year')
+    assert query.genres == ["Action", "Drama", "Sci-Fi"] and not query.match_all_genres
+    assert query.ranges == {'year': (2010, None), 'rating': (7.5, None)}
+    assert (query.sort, query.descending) == ('year', False)
+
+    for name, value in (('year_from', 'abc'), ('runtime_max', '1.5'), ('rating_min', 'nan'), ('order', 'up'),
+                        ('sort', 'bogus')):
+        with pytest.raises(ValueError):
+            movie_query_from_args(MultiDict([(name, value)]))
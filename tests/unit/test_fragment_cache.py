@@ -0,0 +1,87 @@
+import pytest
+
+from website import fragment_cache
+from website.directory import repository
+from website.fragment_cache import MemoryFragmentCache, DiskFragmentCache, create_fragment_cache
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def make_cache(request, tmp_path):
+    def make(max_entries=2, ttl=60.0, clock=None):
+        clock = clock or Clock()
+        if request.param == 'memory':
+            return MemoryFragmentCache(max_entries, ttl, clock)
+        return DiskFragmentCache(str(tmp_path / 'fragments'), max_entries, ttl, clock)
+    return make
+
+
+def test_fetch_renders_once_until_cleared(make_cache):
+    cache = make_cache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"<p>render {len(renders)}</p>"
+
+    assert cache.fetch('home', render) == "<p>render 1</p>"
+    assert cache.fetch('home', render) == "<p>render 1</p>"
+    cache.clear()
+    assert cache.get('home') is None
+    assert cache.fetch('home', render) == "<p>render 2</p>"
+
+
+def test_least_recently_used_fragment_is_evicted(make_cache):
+    clock = Clock()
+    cache = make_cache(clock=clock)
+    cache.fetch('a', lambda: "a")
+    clock.now += 1
+    cache.fetch('b', lambda: "b")
+    clock.now += 1
+    assert cache.get('a') == "a"
+    clock.now += 1
+    cache.fetch('c', lambda: "c")
+    assert cache.get('b') is None
+    assert cache.get('a') == "a"
+    assert cache.get('c') == "c"
+
+
+def test_fragments_expire_after_ttl(make_cache):
+    clock = Clock()
+    cache = make_cache(ttl=60.0, clock=clock)
+    cache.fetch('home', lambda: "old")
+    clock.now += 59
+    assert cache.get('home') == "old"
+    clock.now += 1
+    assert cache.get('home') is None
+    assert cache.fetch('home', lambda: "new") == "new"
+
+
+def test_fragment_rendered_during_a_clear_is_not_stored(make_cache):
+    cache = make_cache()
+
+    def render():
+        cache.clear()
+        return "stale"
+
+    assert cache.fetch('home', render) == "stale"
+    assert cache.get('home') is None
+
+
+def test_repository_changes_invalidate_the_configured_cache(monkeypatch):
+    cache = create_fragment_cache({'FRAGMENT_CACHE': 'memory'})
+    monkeypatch.setattr(fragment_cache, 'cache_instance', cache)
+    monkeypatch.setattr(repository, 'change_listeners', [fragment_cache.invalidate])
+
+    assert fragment_cache.cached('home', lambda: "before") == "before"
+    assert fragment_cache.cached('home', lambda: "after") == "before"
+    repository.notify_change()
+    assert fragment_cache.cached('home', lambda: "after") == "after"
+    assert create_fragment_cache({'FRAGMENT_CACHE': 'none'}) is None
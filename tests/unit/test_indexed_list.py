@@ -0,0 +1,82 @@
+import pickle
+
+import pytest
+
+from website.domainmodel.indexed_list import IndexedList
+from website.domainmodel.model import Movie, Actor, Genre, User, make_review
+
+
+class AlwaysIndexedList(IndexedList):
+    INDEX_THRESHOLD = 0
+
+
+@pytest.mark.parametrize('list_class', [IndexedList, AlwaysIndexedList])
+def test_membership_follows_the_mutating_methods(list_class):
+    items = list_class([1, 2, 2])
+
+    items.remove(2)
+    assert 2 in items
+    items.remove(2)
+    assert 2 not in items
+
+    items[0] = 5
+    items[1:] = [7, 8]
+    assert items == [5, 7, 8]
+    assert 1 not in items and 7 in items
+
+    del items[1:]
+    items += [9]
+    assert items.pop() == 9
+    assert items == [5]
+    assert 7 not in items and 9 not in items
+
+    items.clear()
+    assert 5 not in items
+
+
+def test_unhashable_items_are_not_members():
+    assert [] not in AlwaysIndexedList([1])
+
+
+def test_short_lists_are_not_indexed():
+    items = IndexedList(range(IndexedList.INDEX_THRESHOLD))
+    assert items._counts is None
+
+    items.append('last')
+    assert items._counts is not None
+    assert 'last' in items and 0 in items and 'other' not in items
+
+
+def test_pickles_with_its_index():
+    items = pickle.loads(pickle.dumps(AlwaysIndexedList([Genre("Action")])))
+
+    assert type(items) is AlwaysIndexedList
+    assert Genre("Action") in items
+
+
+def test_model_collections_stay_unique_and_ordered():
+    movie = Movie("Moana", 2016)
+    for name in ["Dwayne Johnson", "Auli'i Cravalho", "Dwayne Johnson"]:
+        movie.add_actor(Actor(name))
+    user = User("Dbowie", "pw12345")
+    review = make_review("Great", user, movie, 8)
+    user.add_review(review)
+    movie.add_review(review)
+
+    assert movie.actors == [Actor("Dwayne Johnson"), Actor("Auli'i Cravalho")]
+    assert user.reviews == [review]
+    assert movie.reviews == [review]
+
+
+def test_reviews_are_members_by_identity_across_pickling():
+    movie = Movie("Moana", 2016)
+    user = User("Dbowie", "pw12345")
+    make_review("Great", user, movie, 8)
+
+    movie, user = pickle.loads(pickle.dumps((movie, user)))
+    review = make_review("Great", user, movie, 8)
+    user.add_review(review)
+    movie.add_review(review)
+
+    assert len(movie.reviews) == 2 and movie.reviews[1] is review
+    assert len(user.reviews) == 2 and user.reviews[1] is review
@@ -0,0 +1,41 @@
+import os
+
+from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
+from website.domainmodel.model import Movie, Actor, Director, Genre
+
+data_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'Data1000Movies.csv')
+
+
+def test_reader_loads_every_entity_once():
+    reader = MovieFileCSVReader(data_path)
+    reader.read_csv_file()
+
+    assert len(reader.dataset_of_movies) == 1000
+    assert len(reader.dataset_of_actors) == 1985
+    assert len(reader.dataset_of_directors) == 644
+    assert len(reader.dataset_of_genres) == 20
+
+
+def test_reader_shares_interned_entities_between_movies():
+    reader = MovieFileCSVReader(data_path)
+    reader.read_csv_file()
+    movies = [movie for movie in reader.dataset_of_movies if Actor("Matt Damon") in movie.actors]
+
+    assert len(movies) == 10
+    matt_damons = {id(actor) for movie in movies for actor in movie.actors if actor == Actor("Matt Damon")}
+    assert len(matt_damons) == 1
+    actions = {id(genre) for movie in reader.dataset_of_movies for genre in movie.genres if genre == Genre("Action")}
+    assert len(actions) == 1
+
+
+def test_reader_sets_movie_attributes():
+    reader = MovieFileCSVReader(data_path)
+    reader.read_csv_file()
+    movie = next(movie for movie in reader.dataset_of_movies if movie == Movie("Guardians of the Galaxy", 2014))
+
+    assert movie.director == Director("James Gunn")
+    assert movie.rating == 8.1
+    assert movie.runtime_minutes == 121
+    assert movie.num_of_ratings == 757074.0
+    assert movie.metascore == "76"
+    assert [genre.genre_name for genre in movie.genres] == ["Action", "Adventure", "Sci-Fi"]
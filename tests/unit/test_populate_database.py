@@ -1,18 +1,28 @@
+import csv
+import os
+import shutil
+
 from sqlalchemy import select, inspect
-from website.directory.orm import metadata
+from sqlalchemy.orm import sessionmaker
+
+from website.directory import database_repository, full_text_search
+from website.directory.orm import metadata, SCHEMA_VERSION
 
 
 def test_database_populate_inspect_table_names(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    assert inspector.get_table_names() == ['actors', 'directors','genres','movie_actors','movie_genres','movies','reviews','users']
+    search_tables = ['movie_search', 'movie_search_config', 'movie_search_content', 'movie_search_data',
+                     'movie_search_docsize', 'movie_search_idx']
+    assert inspector.get_table_names() == sorted(
+        ['actors', 'change_versions', 'data_sources', 'directors','genres','movie_actors','movie_genres','movies','reviews','users'] + search_tables)
 
 def test_database_populate_select_all_genres(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    name_of_genres_table = inspector.get_table_names()[2]
+    name_of_genres_table = 'genres'
 
     with database_engine.connect() as connection:
         # query for records in table tags
@@ -50,7 +60,7 @@ def test_database_populate_select_all_directors(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    name_of_directors_table = inspector.get_table_names()[1]
+    name_of_directors_table = 'directors'
 
     with database_engine.connect() as connection:
         # query for records in table users
@@ -68,7 +78,7 @@ def test_database_populate_select_all_actors(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    name_of_actors_table = inspector.get_table_names()[0]
+    name_of_actors_table = 'actors'
 
     with database_engine.connect() as connection:
         # query for records in table users
@@ -87,7 +97,7 @@ def test_database_populate_select_all_users(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    name_of_users_table = inspector.get_table_names()[7]
+    name_of_users_table = 'users'
 
     with database_engine.connect() as connection:
         # query for records in table users
@@ -104,7 +114,7 @@ def test_database_populate_select_all_movies(database_engine):
 
     # Get table information
     inspector = inspect(database_engine)
-    name_of_movies_table = inspector.get_table_names()[5]
+    name_of_movies_table = 'movies'
 
     with database_engine.connect() as connection:
         # query for records in table articles
@@ -131,3 +141,173 @@ def test_database_populate_select_all_movies(database_engine):
         assert a1 != None
         assert a2 != None
 
+
+
+def test_database_populate_links_movies_to_genres_actors_and_directors(database_engine):
+
+    with database_engine.connect() as connection:
+        guardians = connection.execute(
+            "SELECT movies.id, directors.name FROM movies JOIN directors ON directors.id = movies.director "
+            "WHERE movies.title = 'Guardians of the Galaxy'"
+        ).fetchone()
+        assert guardians['name'] == 'James Gunn'
+
+        genre_names = [row[0] for row in connection.execute(
+            "SELECT genres.name FROM genres JOIN movie_genres ON genres.id = movie_genres.genre_id "
+            "WHERE movie_genres.movie_id = ? ORDER BY genres.name", guardians['id']
+        )]
+        assert genre_names == ['Action', 'Adventure', 'Sci-Fi']
+
+        actor_names = [row[0] for row in connection.execute(
+            "SELECT actors.full_name FROM actors JOIN movie_actors ON actors.id = movie_actors.actor_id "
+            "WHERE movie_actors.movie_id = ?", guardians['id']
+        )]
+        assert 'Chris Pratt' in actor_names
+
+
+def test_database_populate_fills_the_search_table(database_engine):
+
+    with database_engine.connect() as connection:
+        assert connection.execute("SELECT count(*) FROM movie_search").scalar() == 1000
+        # The triggers dropped for the load are back in place.
+        triggers = connection.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger'").scalar()
+        assert triggers == 5
+
+
+def test_search_index_replaces_a_word_tokenized_table(database_engine):
+    with database_engine.begin() as connection:
+        full_text_search.drop_search_triggers(connection)
+        connection.execute("DROP TABLE movie_search")
+        connection.execute("CREATE VIRTUAL TABLE movie_search USING fts5(title, description, actors, directors)")
+
+    full_text_search.create_search_index(database_engine)
+
+    with database_engine.connect() as connection:
+        assert 'trigram' in connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'movie_search'").scalar()
+        assert connection.execute("SELECT count(*) FROM movie_search").scalar() == 1000
+        assert connection.execute(
+            "SELECT count(*) FROM movie_search WHERE movie_search MATCH 'title : \"ark\"'").scalar() > 0
+
+
+TEST_DATA_PATH = os.path.join('tests', 'data')
+
+
+def copy_test_data(source_path, target_path):
+    for name in ('Data1000Movies.csv', 'users.csv'):
+        shutil.copy(os.path.join(source_path, name), os.path.join(target_path, name))
+
+
+def rewrite_movies(data_path, change_rows):
+    file_name = os.path.join(data_path, 'Data1000Movies.csv')
+    with open(file_name, encoding='utf-8-sig', newline='') as movie_file:
+        reader = csv.DictReader(movie_file)
+        field_names = reader.fieldnames
+        rows = change_rows(list(reader))
+    with open(file_name, 'w', encoding='utf-8', newline='') as movie_file:
+        writer = csv.DictWriter(movie_file, field_names)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_database_sync_loads_once_and_applies_movie_file_changes(tmp_path):
+    copy_test_data(TEST_DATA_PATH, str(tmp_path))
+    engine = database_repository.create_database_engine(
+        {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'sync.db')}
+    )
+    session_factory = sessionmaker(bind=engine)
+
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'populated'
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'current'
+    with engine.connect() as connection:
+        stamp = database_repository.read_source_stamp(connection, 'Data1000Movies.csv')
+        assert stamp['schema_version'] == SCHEMA_VERSION
+        guardians_id = connection.execute(
+            "SELECT id FROM movies WHERE title = 'Guardians of the Galaxy'").scalar()
+
+    def change_rows(rows):
+        rows = [row for row in rows if row['Title'] != 'Prometheus']
+        rows[0]['Rating'] = '9.5'
+        rows[0]['Genre'] = 'Action,Western'
+        added = dict(rows[-1], Title='A Brand New Movie', Actors='New Actor, Chris Pratt', Director='New Director')
+        return rows + [added]
+    rewrite_movies(str(tmp_path), change_rows)
+
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'synced'
+    with engine.connect() as connection:
+        assert connection.execute("SELECT count(*) FROM movies").scalar() == 1000
+        assert connection.execute("SELECT count(*) FROM movies WHERE title = 'Prometheus'").scalar() == 0
+        guardians = connection.execute(
+            "SELECT id, rating FROM movies WHERE title = 'Guardians of the Galaxy'").fetchone()
+        # A changed movie keeps its id, so its reviews stay with it.
+        assert tuple(guardians) == (guardians_id, 9.5)
+        genre_names = [row[0] for row in connection.execute(
+            "SELECT genres.name FROM genres JOIN movie_genres ON genres.id = movie_genres.genre_id "
+            "WHERE movie_genres.movie_id = ? ORDER BY genres.name", guardians_id
+        )]
+        assert genre_names == ['Action', 'Western']
+        assert connection.execute("SELECT count(*) FROM actors WHERE full_name = 'Chris Pratt'").scalar() == 1
+        new_movie = connection.execute(
+            "SELECT rowid FROM movie_search WHERE movie_search MATCH 'directors : \"new director\"'"
+        ).scalar()
+        assert new_movie is not None
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'current'
+    engine.dispose()
+
+
+def add_review(connection):
+    user_id = connection.execute("SELECT id FROM users WHERE user_name = 'thorke'").scalar()
+    movie_id = connection.execute("SELECT id FROM movies WHERE title = 'Prometheus'").scalar()
+    connection.execute("INSERT INTO reviews (user_id, movie_id, rating, comment) VALUES (?, ?, 8, 'Seen it')",
+                       user_id, movie_id)
+
+
+def test_database_sync_upgrades_an_older_schema_in_place(tmp_path):
+    copy_test_data(TEST_DATA_PATH, str(tmp_path))
+    engine = database_repository.create_database_engine(
+        {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'sync.db')}
+    )
+    session_factory = sessionmaker(bind=engine)
+    database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv')
+    with engine.begin() as connection:
+        add_review(connection)
+        connection.execute("UPDATE data_sources SET schema_version = ?", SCHEMA_VERSION - 1)
+
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'synced'
+    with engine.connect() as connection:
+        assert connection.execute("SELECT count(*) FROM movies").scalar() == 1000
+        assert connection.execute("SELECT count(*) FROM reviews").scalar() == 1
+        assert database_repository.read_source_stamp(connection, 'Data1000Movies.csv')['schema_version'] == \
+            SCHEMA_VERSION
+    engine.dispose()
+
+
+def test_database_sync_keeps_the_users_and_reviews_of_an_unstamped_database(tmp_path):
+    copy_test_data(TEST_DATA_PATH, str(tmp_path))
+    engine = database_repository.create_database_engine(
+        {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'sync.db')}
+    )
+    session_factory = sessionmaker(bind=engine)
+    database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv')
+    # Take the database back to the shape it had before stamps, versions, indexes and the search table.
+    with engine.begin() as connection:
+        add_review(connection)
+        users = connection.execute("SELECT count(*) FROM users").scalar()
+        full_text_search.drop_search_triggers(connection)
+        connection.execute("DROP TABLE movie_search")
+        connection.execute("DROP TABLE data_sources")
+        connection.execute("DROP TABLE change_versions")
+        indexes = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'")
+        for name in [row[0] for row in indexes]:
+            connection.execute("DROP INDEX " + name)
+
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'synced'
+    with engine.connect() as connection:
+        assert connection.execute("SELECT count(*) FROM users").scalar() == users > 0
+        assert connection.execute("SELECT count(*) FROM reviews").scalar() == 1
+        assert connection.execute("SELECT count(*) FROM movie_search").scalar() == 1000
+        indexes = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'ix_movies_title_release', 'ix_movies_title_lower'} <= indexes
+        assert connection.execute("SELECT count(*) FROM change_versions").scalar() == 2
+    assert database_repository.sync_database(session_factory, str(tmp_path), 'Data1000Movies.csv') == 'current'
+    engine.dispose()
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from website.domainmodel.model import Movie
+from website.posters import (
+    PosterCache, PosterFetchError, FixturePosterFetcher, TMDBPosterFetcher, FixtureServer, backfill, TMDB_IMAGE_URL
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    path = tmp_path / 'posters.csv'
+    path.write_text("Title,Year,Poster\nThe Dark Knight,2008,/qJ2tW6WMUDux911r6m7haRef0WH.jpg\nSplit,2016,\n",
+                    encoding='utf-8')
+    return FixturePosterFetcher(str(path))
+
+
+def test_cache_keeps_posters_and_misses_across_instances(tmp_path):
+    path = str(tmp_path / 'cache' / 'posters.json')
+    cache = PosterCache(path)
+    cache.put("The Dark Knight", 2008, TMDB_IMAGE_URL + "/dark.jpg")
+    cache.put("Split", 2016, None)
+    cache.save()
+
+    cache = PosterCache(path)
+    assert len(cache) == 2
+    assert cache.get("The Dark Knight", 2008) == TMDB_IMAGE_URL + "/dark.jpg"
+    assert cache.get("Split", 2016) is None and not cache.needs_lookup("Split", 2016)
+    assert cache.get("Sing", 2016) is None and cache.needs_lookup("Sing", 2016)
+
+
+def test_misses_are_looked_up_again_once_expired(tmp_path):
+    clock = Clock()
+    cache = PosterCache(str(tmp_path / 'posters.json'), negative_ttl=60, clock=clock)
+    cache.put("Split", 2016, None)
+    cache.put("The Dark Knight", 2008, TMDB_IMAGE_URL + "/dark.jpg")
+    clock.now += 60
+    assert cache.needs_lookup("Split", 2016)
+    assert not cache.needs_lookup("The Dark Knight", 2008)
+
+
+def test_backfill_looks_up_only_uncached_movies_and_skips_failures(tmp_path, fixtures):
+    cache = PosterCache(str(tmp_path / 'posters.json'))
+    cache.put("Sing", 2016, TMDB_IMAGE_URL + "/sing.jpg")
+    calls = []
+
+    def fetcher(title, year):
+        calls.append(title)
+        if title == "Moana":
+            raise PosterFetchError("timed out")
+        return fixtures(title, year)
+
+    movies = [Movie("The Dark Knight", 2008), Movie("Split", 2016), Movie("Sing", 2016), Movie("Moana", 2016)]
+    assert backfill(cache, fetcher, movies) == {'found': 1, 'missing': 1, 'failed': 1, 'cached': 1}
+    assert calls == ["The Dark Knight", "Split", "Moana"]
+    assert PosterCache(cache.path).get("The Dark Knight", 2008) == TMDB_IMAGE_URL + "/qJ2tW6WMUDux911r6m7haRef0WH.jpg"
+
+    calls.clear()
+    backfill(cache, fetcher, movies)
+    assert calls == ["Moana"]
+
+
+def test_tmdb_fetcher_reads_search_results_from_a_fixture_server(fixtures):
+    server = FixtureServer(fixtures)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        fetcher = TMDBPosterFetcher('testing', server.url)
+        assert fetcher("The Dark Knight", 2008) == TMDB_IMAGE_URL + "/qJ2tW6WMUDux911r6m7haRef0WH.jpg"
+        assert fetcher("Split", 2016) is None
+        assert fetcher("Sing", 2016) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with pytest.raises(PosterFetchError):
+        fetcher("The Dark Knight", 2008)
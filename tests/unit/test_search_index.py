@@ -0,0 +1,41 @@
+from website.directory.search_index import SubstringIndex
+
+
+def make_index():
+    index = SubstringIndex()
+    index.add("guardians", ["Guardians of the Galaxy"])
+    index.add("prometheus", ["Prometheus"])
+    index.add("split", ["Split", "James McAvoy"])
+    index.add("no keys", [])
+    return index
+
+
+def test_search_matches_case_insensitive_substrings():
+    index = make_index()
+
+    assert index.search("GALAXY") == ["guardians"]
+    assert index.search("mcavoy") == ["split"]
+    assert index.search("the") == ["guardians", "prometheus"]
+
+
+def test_search_with_short_queries_scans_keys():
+    index = make_index()
+
+    assert index.search("pl") == ["split"]
+    assert index.search("") == ["guardians", "prometheus", "split", "no keys"]
+
+
+def test_search_does_not_match_across_keys():
+    index = make_index()
+
+    assert index.search("splitjames") == []
+    assert index.search("t j") == []
+
+
+def test_search_returns_items_in_insertion_order_once():
+    index = SubstringIndex()
+    index.add("first", ["Matt Damon", "Matt Smith"])
+    index.add("second", ["Matthew McConaughey"])
+
+    assert index.search("matt") == ["first", "second"]
+    assert index.search("nothing") == []
@@ -7,6 +7,7 @@ from wtforms.validators import DataRequired, Length, ValidationError
 import website.directory.repository as repo
 import website.directory.memory_repository as mem
 import website.Home.services as services
+from website import fragment_cache
 from website.domainmodel.model import Genre
 import website.movie_genre.movie_genre
 import requests
@@ -18,9 +19,6 @@ home_blueprint = Blueprint(
 
 @home_blueprint.route('/', methods=['GET', 'POST'])
 def home():
-    ten_movies = services.get_ten_movies(repo.repo_instance)
-    genres = services.get_genres(repo.repo_instance)
-    movies_genres = {}
     search = MovieSearchForm()
     if request.method == 'POST':
         parameter = search.select.data
@@ -28,24 +26,26 @@ def home():
         return redirect(
             url_for('all_movies_bp.movies_by_search', parameter=parameter, search_parameter=search_parameter))
 
-    genre_url = []
-    for genre in genres:
-        try:
-            movies_genres[genre] = services.get_10_movies_genre(repo.repo_instance, genre)
-            genre_url.append(url_for('all_movies_bp.movies_by_genre', genre=genre))
-        except:
-            pass
+    # The listings are the same for every visitor; only the search form around them is rendered per request.
+    listings = fragment_cache.cached('home/listings' + request.script_root, render_listings)
 
     return render_template(
         'home/home.html',
-        ten_movies=ten_movies,
-        genres=genres,
-        movies_genres=movies_genres,
-        genre_url=genre_url,
+        listings=listings,
         form=search
     )
 
 
+def render_listings():
+    ten_movies, movies_genres = services.get_home_page_movies(repo.repo_instance)
+
+    return render_template(
+        'home/listings.html',
+        ten_movies=ten_movies,
+        movies_genres=movies_genres
+    )
+
+
 @home_blueprint.route('/results')
 def search_results(search):
     results = []
@@ -62,7 +62,8 @@ def movies_by_genre():
 class MovieSearchForm(Form):
     choices = [('Title'),
                ('Actor'),
-               ('Director')]
+               ('Director'),
+               ('Keyword')]
     select = SelectField('Search movies:', choices=choices)
     search = StringField('')
 
@@ -28,6 +28,11 @@ def get_10_movies_genre(repo: AbstractRepository, genre):
     return movies
 
 
+def get_home_page_movies(repo: AbstractRepository):
+    ten_movies, movies_genres = repo.get_home_page_movies()
+    return ten_movies, movies_genres
+
+
 def get_movie(repo: AbstractRepository, movie):
     if movie is None:
         raise NonExistentMovieException
@@ -35,6 +40,10 @@ def get_movie(repo: AbstractRepository, movie):
     return movie
 
 
+def get_version(repo: AbstractRepository, movie: Movie = None):
+    return repo.get_version(movie)
+
+
 def add_review(movie: Movie, comment_text: str, rating: int, username: str, repo: AbstractRepository):
     # Check that the movie exists.
     movie = repo.get_movie(movie)
@@ -4,15 +4,15 @@ import os
 
 from flask import Flask, session
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
 
 
 import website.directory.repository as repo
+from website import fragment_cache, posters
+from website.conditional_get import templates_digest
 from website.directory import database_repository
-from website.directory.memory_repository import MemoryRepository, populate
-from website.directory.orm import metadata, map_model_to_tables
+from website.directory.memory_repository import load_repository
+from website.directory.orm import map_model_to_tables
 
 def create_app(test_config=None):
     """Construct the core application."""
@@ -30,38 +30,46 @@ def create_app(test_config=None):
 
     # Create the MemoryRepository implementation for a memory-based repository.
     if app.config['REPOSITORY'] == 'memory':
-        repo.repo_instance = MemoryRepository()
-        populate(data_path, repo.repo_instance)
+        # Warm-start from the on-disk snapshot when one is configured and still matches the CSV.
+        repo.repo_instance = load_repository(os.path.join(data_path, "Data1000Movies.csv"),
+                                             app.config.get('MEMORY_SNAPSHOT_PATH'))
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
-        database_uri = app.config['SQLALCHEMY_DATABASE_URI']
-        database_echo = app.config['SQLALCHEMY_ECHO']
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=database_echo)
-
-        if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
-            print("REPOPULATING DATABASE")
-            # For testing, or first-time use of the web application, reinitialise the database.
-            clear_mappers()
-            metadata.create_all(database_engine)  # Conditionally create database tables.
-            for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
-                database_engine.execute(table.delete())
-
-            # Generate mappings that map domain model classes to the database tables.
-            map_model_to_tables()
-            session_factory = sessionmaker(bind=database_engine)
-            database_repository.populate(session_factory, data_path, "Data1000Movies.csv")
-
-        else:
-            # Solely generate mappings that map domain model classes to the database tables.
-            map_model_to_tables()
+        database_engine = database_repository.create_database_engine(app.config)
+
+        # Create, upgrade or incrementally update the database so it matches the schema and the movie file. A
+        # database already loaded from an unchanged movie file is left as it is.
+        clear_mappers()
+        session_factory = sessionmaker(bind=database_engine)
+        status = database_repository.sync_database(session_factory, data_path, "Data1000Movies.csv")
+        app.logger.info("Database %s", status)
+        if app.config['TESTING'] == 'True':
+            # For testing, start from the users in users.csv and no reviews.
+            database_repository.reset_users(session_factory, data_path)
+
+        # Generate mappings that map domain model classes to the database tables.
+        map_model_to_tables()
 
         # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
         repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
 
+    # Posters come from the local cache filled by `flask posters backfill`, so no page waits on a lookup.
+    if app.config.get('POSTER_CACHE_PATH'):
+        repo.repo_instance.set_posters(posters.create_poster_cache(app.config).get)
+    app.cli.add_command(posters.posters_cli)
+
+    # Mixed into every page ETag, so a changed template changes them all.
+    app.config.setdefault('ETAG_SALT', templates_digest(os.path.join(app.root_path, app.template_folder)))
+
+    # Cache rendered fragments until the repository changes. Fragments kept on disk may predate this start.
+    fragment_cache.cache_instance = fragment_cache.create_fragment_cache(app.config)
+    fragment_cache.invalidate()
+    if fragment_cache.invalidate not in repo.change_listeners:
+        repo.change_listeners.append(fragment_cache.invalidate)
+
     # Build the application - these steps require an application context.
     with app.app_context():
         # Register blueprints.
@@ -77,6 +85,9 @@ def create_app(test_config=None):
         from .authentication import authentication
         app.register_blueprint(authentication.authentication_blueprint)
 
+        from .api import api
+        app.register_blueprint(api.api_blueprint)
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
@@ -0,0 +1,98 @@
+from flask import Blueprint, current_app, request, abort, jsonify
+from werkzeug.exceptions import HTTPException
+
+import website.directory.repository as repo
+import website.api.services as services
+from website.conditional_get import conditional_page
+
+api_blueprint = Blueprint(
+    'api_bp', __name__, url_prefix='/api/v1')
+
+# The search_field values a listing accepts, as MovieQuery text fields; None searches every field.
+SEARCH_FIELDS = {None: None, 'keyword': None, 'title': 'title', 'actor': 'actors', 'director': 'directors'}
+
+
+@api_blueprint.route('/movies', methods=['GET'])
+def movies():
+    """ Lists the movies matching the same filter and sort arguments as the HTML listings, a page at a time.
+
+    search and search_field restrict the listing to a search, and fields picks the movie fields returned.
+    """
+    return listing(request.args.get('search'), request.args.get('search_field'), 'rating')
+
+
+@api_blueprint.route('/search', methods=['GET'])
+def search():
+    """ Lists the movies found by searching field (title, actor, director or keyword) for q. """
+    return listing(request.args.get('q', ''), request.args.get('field'), 'added')
+
+
+@api_blueprint.route('/movies/<int:year>/<path:title>', methods=['GET'])
+def movie(year, title):
+    a_movie = find_movie(title, year)
+    fields = selected_fields()
+    return conditional_page(repo.repo_instance.get_version(a_movie), lambda: json_response(
+        services.get_movie_json(repo.repo_instance, a_movie, fields)
+    ))
+
+
+@api_blueprint.route('/reviews/<int:year>/<path:title>', methods=['GET'])
+def reviews(year, title):
+    a_movie = find_movie(title, year)
+    return conditional_page(repo.repo_instance.get_version(a_movie), lambda: json_response(
+        services.get_reviews_json(repo.repo_instance, a_movie)
+    ))
+
+
+@api_blueprint.route('/genres', methods=['GET'])
+def genres():
+    return conditional_page(repo.repo_instance.get_version(), lambda: json_response(
+        services.get_genres_json(repo.repo_instance)
+    ))
+
+
+@api_blueprint.errorhandler(HTTPException)
+def http_error(error):
+    response = jsonify(error=error.description)
+    response.status_code = error.code
+    return response
+
+
+def listing(search, search_field, sort):
+    if search_field not in SEARCH_FIELDS:
+        abort(400, f"search field must be one of {', '.join(field for field in SEARCH_FIELDS if field)}")
+    try:
+        query = repo.movie_query_from_args(request.args, text=search, text_field=SEARCH_FIELDS[search_field],
+                                           sort=sort)
+    except ValueError as error:
+        abort(400, str(error))
+    limit = min(max(request.args.get('limit', services.DEFAULT_PAGE_SIZE, type=int), 1), services.MAX_PAGE_SIZE)
+    fields = selected_fields()
+
+    def render():
+        try:
+            return json_response(services.get_movies_page(
+                repo.repo_instance, query, request.args.get('cursor') or None, limit, fields
+            ))
+        except services.InvalidCursorException:
+            abort(400, "invalid cursor")
+
+    return conditional_page(repo.repo_instance.get_version(), render)
+
+
+def find_movie(title, year):
+    try:
+        return services.get_movie(repo.repo_instance, title, year)
+    except services.NonExistentMovieException:
+        abort(404, "no such movie")
+
+
+def selected_fields():
+    try:
+        return services.select_fields(request.args.get('fields'))
+    except services.UnknownFieldException as unknown:
+        abort(400, f"unknown fields: {unknown}")
+
+
+def json_response(body: bytes):
+    return current_app.response_class(body, mimetype='application/json')
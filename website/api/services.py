@@ -0,0 +1,172 @@
+import json
+import threading
+import weakref
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; without it responses are encoded with the json module, which is several times slower.
+    orjson = None
+
+from website.directory.repository import AbstractRepository, MovieQuery
+from website.domainmodel.model import Movie
+
+# The fields of a movie document, in the order they are serialised.
+MOVIE_FIELDS = ('title', 'year', 'description', 'director', 'actors', 'genres', 'runtime', 'rating', 'votes',
+                'metascore', 'image')
+
+# Movies returned per page when a request doesn't say, and the most it may ask for.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class NonExistentMovieException(Exception):
+    pass
+
+
+class UnknownFieldException(Exception):
+    pass
+
+
+class InvalidCursorException(Exception):
+    pass
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def movie_document(movie: Movie) -> dict:
+    return {
+        'title': movie.title,
+        'year': movie.release,
+        'description': getattr(movie, '_description', None),
+        'director': movie.director.director_full_name if movie.director is not None else None,
+        'actors': [actor.actor_full_name for actor in movie.actors],
+        'genres': [genre.genre_name for genre in movie.genres],
+        'runtime': getattr(movie, '_runtime_minutes', None),
+        'rating': movie.rating,
+        'votes': getattr(movie, '_num_of_ratings', None),
+        'metascore': getattr(movie, '_metascore', None),
+        'image': getattr(movie, '_image', None),
+    }
+
+
+def review_document(review) -> dict:
+    timestamp = getattr(review, 'timestamp', None)
+    return {
+        'user': review.user.user_name if review.user is not None else None,
+        'text': review.review_text,
+        'rating': review.rating,
+        'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else None,
+    }
+
+
+class MovieDocuments:
+    """ Each movie's document and its serialised JSON, built once and kept until the repository's version moves on.
+
+    Movies are keyed by title and release year, since a database repository returns new Movie objects on every
+    request. Genre movie counts are kept the same way.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._documents = dict()
+        self._genres = None
+        self._lock = threading.Lock()
+
+    def check_version(self, version: int):
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._documents = dict()
+                self._genres = None
+
+    def get(self, movie: Movie):
+        """ Returns the (document, JSON bytes) pair for movie. """
+        key = (movie.title, movie.release)
+        entry = self._documents.get(key)
+        if entry is None:
+            document = movie_document(movie)
+            entry = self._documents[key] = (document, dumps(document))
+        return entry
+
+    def genres(self, repo: AbstractRepository):
+        if self._genres is None:
+            self._genres = dumps([
+                {'name': genre.genre_name, 'movies': repo.count_movies_matching(MovieQuery(genres=[genre.genre_name]))}
+                for genre in sorted(repo.get_genres(), key=lambda genre: genre.genre_name)
+            ])
+        return self._genres
+
+
+# The documents of each repository, dropped along with it.
+_documents = weakref.WeakKeyDictionary()
+_documents_lock = threading.Lock()
+
+
+def documents_for(repo: AbstractRepository) -> MovieDocuments:
+    """ Returns repo's documents, current as of its version. """
+    with _documents_lock:
+        documents = _documents.get(repo)
+        if documents is None:
+            documents = _documents[repo] = MovieDocuments()
+    documents.check_version(repo.get_version())
+    return documents
+
+
+def select_fields(fields: str):
+    """ Returns the movie fields named in a comma-separated list, or None for every field. """
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in MOVIE_FIELDS]
+    if unknown:
+        raise UnknownFieldException(', '.join(unknown))
+    return selected
+
+
+def movies_json(documents: MovieDocuments, movies, fields=None) -> bytes:
+    """ Returns a JSON array of the movies' documents, cut down to fields when given. """
+    if fields is None:
+        # Every field: the serialised documents can be joined as they are.
+        return b'[' + b','.join(documents.get(movie)[1] for movie in movies) + b']'
+    return dumps([{field: documents.get(movie)[0][field] for field in fields} for movie in movies])
+
+
+def get_movies_page(repo: AbstractRepository, query: MovieQuery, cursor: str, limit: int, fields=None) -> bytes:
+    """ Returns a page of the movies matching query as a JSON object with the movies, the cursor of the next page
+    and the number of matching movies.
+    """
+    documents = documents_for(repo)
+    try:
+        movies, next_cursor = repo.get_movies_after(query, limit, cursor)
+    except ValueError:
+        raise InvalidCursorException
+    return (b'{"movies":' + movies_json(documents, movies, fields) + b',"next_cursor":' + dumps(next_cursor)
+            + b',"total":' + dumps(repo.count_movies_matching(query)) + b'}')
+
+
+def get_movie(repo: AbstractRepository, title: str, year: int) -> Movie:
+    movie = repo.get_movie(Movie(title, year))
+    if movie is None:
+        raise NonExistentMovieException
+    return movie
+
+
+def get_movie_json(repo: AbstractRepository, movie: Movie, fields=None) -> bytes:
+    document, serialised = documents_for(repo).get(movie)
+    if fields is None:
+        return serialised
+    return dumps({field: document[field] for field in fields})
+
+
+def get_reviews_json(repo: AbstractRepository, movie: Movie) -> bytes:
+    return dumps({'reviews': [review_document(review) for review in repo.get_review_for_movie(movie)]})
+
+
+def get_genres_json(repo: AbstractRepository) -> bytes:
+    return b'{"genres":' + documents_for(repo).genres(repo) + b'}'
@@ -0,0 +1,59 @@
+import hashlib
+import os
+from datetime import timezone
+
+from flask import current_app, make_response, request, session
+
+from website.directory.repository import version_time
+
+
+def templates_digest(template_folder: str) -> str:
+    """ Returns a digest of every template under template_folder, so a change to any of them changes the ETags. """
+    digest = hashlib.sha256()
+    for directory, subdirectories, file_names in sorted(os.walk(template_folder)):
+        subdirectories.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(directory, file_name)
+            digest.update(os.path.relpath(path, template_folder).encode('utf-8'))
+            with open(path, 'rb') as template_file:
+                digest.update(hashlib.sha256(template_file.read()).digest())
+    return digest.hexdigest()
+
+
+def page_etag(version: int) -> str:
+    """ Returns the strong ETag of this request's page when the data it shows is at version.
+
+    Pages greet the logged-in user, so the user is part of the tag along with the templates.
+    """
+    validator = '{}\0{}\0{}'.format(version, session.get('username', ''), current_app.config.get('ETAG_SALT', ''))
+    return hashlib.sha256(validator.encode('utf-8')).hexdigest()[:32]
+
+
+def conditional_page(version: int, render):
+    """ Returns 304 Not Modified if the client already has this page at version, and otherwise the response
+    render() returns. Either way the response carries the page's ETag and Last-Modified time.
+
+    If-None-Match takes precedence. If-Modified-Since is only honoured for visitors who are not logged in, since
+    the time alone doesn't tell whose page the client has.
+    """
+    etag = page_etag(version)
+    last_modified = version_time(version).replace(microsecond=0)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        modified_since = request.if_modified_since
+        if modified_since is not None and modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+        not_modified = modified_since is not None and 'username' not in session and last_modified <= modified_since
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Revalidate every time, and keep shared caches from handing one user's page to another.
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
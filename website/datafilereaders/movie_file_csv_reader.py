@@ -1,84 +1,65 @@
 import csv
 import os
-import urllib.parse
-
-import requests
 
 from website.domainmodel.model import Movie, Actor, Genre, Director, User
 
 
+class MovieCatalogue:
+    """ The movies, actors, directors and genres parsed from one movie file, shared by every repository loader. """
+
+    def __init__(self, movies, actors, directors, genres):
+        self.movies = list(movies)
+        self.actors = list(actors)
+        self.directors = list(directors)
+        self.genres = list(genres)
+
+
 class MovieFileCSVReader:
     def __init__(self, file_name: str):
         self.__file_name = file_name
-        self.__dataset_of_movies = set()
-        self.__dataset_of_actors = set()
-        self.__dataset_of_directors = set()
-        self.__dataset_of_genres = set()
+        # Entities are interned by their normalised key, so each row is resolved with dict lookups.
+        self.__dataset_of_movies = dict()
+        self.__dataset_of_actors = dict()
+        self.__dataset_of_directors = dict()
+        self.__dataset_of_genres = dict()
         self.__dataset_of_users = set()
 
-    def movie_read_csv_file(self):
-        with open(os.path.join(self.__file_name), mode='r', encoding='utf-8-sig') as csvfile:
-            movie_file_reader = csv.DictReader(csvfile)
-            index = 0
-            for row in movie_file_reader:
-                title = row['Title']
-                release_year = int(row['Year'])
-                movie = Movie(title, release_year)
-                # url = imdb_from_title(title, release_year)
-                # movie.image = str(url)
-                if movie not in self.__dataset_of_movies:
-                    self.__dataset_of_movies.add(movie)
-                actors = row['Actors'].split(",")
-                for actor in actors:
-                    a_actor = Actor(actor)
-                    for s_actor in self.__dataset_of_actors:
-                        if a_actor == s_actor:
-                            movie.add_actor(s_actor)
-                metascore = row['Metascore']
-                movie.metascore = str(metascore)
-                num_of_ratings = row['Votes']
-                movie.num_of_ratings = float(num_of_ratings)
-                director = row["Director"]
-                director1 = Director(director)
-                for directors in self.__dataset_of_directors:
-                    if director1 == directors:
-                        movie.director = directors
-                description = row["Description"]
-                movie.description = description
-                rating = row["Rating"]
-
-                runtime = row["Runtime (Minutes)"]
-
-                movie.runtime_minutes = int(runtime)
-                movie.rating = float(rating)
-                genres = row["Genre"].split(",")
-                for genre in genres:
-                    a_genre = Genre(genre)
-                    for sgenre in self.__dataset_of_genres:
-                        if sgenre == a_genre:
-                            movie.add_genre(sgenre)
-                index += 1
     def read_csv_file(self):
         with open(os.path.join(self.__file_name), mode='r', encoding='utf-8-sig') as csvfile:
             movie_file_reader = csv.DictReader(csvfile)
-            index = 0
             for row in movie_file_reader:
-                actors = row['Actors'].split(",")
-                for actor in actors:
-                    a_actor = Actor(actor)
-                    if a_actor not in self.__dataset_of_actors:
-                        self.__dataset_of_actors.add(a_actor)
-                director = row["Director"]
-                director1 = Director(director)
-                if director1 not in self.__dataset_of_directors:
-                    self.__dataset_of_directors.add(director1)
-                genres = row["Genre"].split(",")
-                for genre in genres:
-                    a_genre = Genre(genre)
-                    if a_genre not in self.__dataset_of_genres:
-                        self.__dataset_of_genres.add(a_genre)
-                index += 1
-        self.movie_read_csv_file()
+                self.__read_movie_row(row)
+        return self.catalogue
+
+    def __read_movie_row(self, row):
+        title = row['Title']
+        release_year = int(row['Year'])
+        movie = Movie(title, release_year)
+        key = (movie.title, movie.release)
+        if key in self.__dataset_of_movies:
+            return
+        self.__dataset_of_movies[key] = movie
+
+        for actor in row['Actors'].split(","):
+            movie.add_actor(self.__intern(self.__dataset_of_actors, actor, Actor))
+        movie.director = self.__intern(self.__dataset_of_directors, row["Director"], Director)
+        for genre in row["Genre"].split(","):
+            movie.add_genre(self.__intern(self.__dataset_of_genres, genre, Genre))
+
+        movie.metascore = str(row['Metascore'])
+        movie.num_of_ratings = float(row['Votes'])
+        movie.description = row["Description"]
+        movie.runtime_minutes = int(row["Runtime (Minutes)"])
+        movie.rating = float(row["Rating"])
+
+    @staticmethod
+    def __intern(dataset, name, entity_class):
+        key = name.strip()
+        entity = dataset.get(key)
+        if entity is None:
+            entity = entity_class(name)
+            dataset[key] = entity
+        return entity
 
     def read_csv_file_users(self):
         with open(os.path.join(self.__file_name), mode='r', encoding='utf-8-sig') as csvfile:
@@ -103,9 +84,14 @@ class MovieFileCSVReader:
                 index += 1
 
 
+    @property
+    def catalogue(self) -> MovieCatalogue:
+        return MovieCatalogue(self.__dataset_of_movies.values(), self.__dataset_of_actors.values(),
+                              self.__dataset_of_directors.values(), self.__dataset_of_genres.values())
+
     @property
     def dataset_of_movies(self):
-        return self.__dataset_of_movies
+        return self.__dataset_of_movies.values()
 
     @property
     def dataset_of_users(self):
@@ -113,30 +99,17 @@ class MovieFileCSVReader:
 
     @property
     def dataset_of_actors(self):
-        return self.__dataset_of_actors
+        return self.__dataset_of_actors.values()
 
     @property
     def dataset_of_directors(self):
-        return self.__dataset_of_directors
+        return self.__dataset_of_directors.values()
 
     @property
     def dataset_of_genres(self):
-        return self.__dataset_of_genres
-
-
-def imdb_from_title(title, year):
-    pattern = 'https://api.themoviedb.org/3/search/movie?api_key=67cfd6550d69776df1bbefcd79c38b6e&language=en-US&'
-    encoded_title = urllib.parse.quote(title)
+        return self.__dataset_of_genres.values()
 
-    url = pattern.format(query=encoded_title, year=year)
-    url = pattern + "query=" + encoded_title + "&year=" + str(year)
-    r = requests.get(url)
-    res = r.json()
-    try:
-        movie_id = res['results'][0]['poster_path']
-        image_url = 'https://image.tmdb.org/t/p/w500' + str(movie_id)
-        return image_url
-    except:
-        return "No image"
 
+def read_catalogue(file_name: str) -> MovieCatalogue:
+    return MovieFileCSVReader(file_name).read_csv_file()
 
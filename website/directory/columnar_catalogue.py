@@ -0,0 +1,137 @@
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional. Without it the memory repository has no columnar catalogue and its analytics are disabled.
+    numpy = None
+
+
+def columns_available() -> bool:
+    return numpy is not None
+
+
+class ColumnarCatalogue:
+    """ A column per numeric movie field and CSR membership matrices for genres and actors, for vectorised queries.
+
+    Row i of every column is the i-th movie the catalogue was built from, and results come back in that order
+    unless a query sorts them. Missing values are NaN for the float columns and 0 for runtime and release year.
+    Genre and actor membership are stored as CSR matrices with one row per genre or actor: the movie rows of
+    entry i are indices[indptr[i]:indptr[i + 1]], in ascending order. The catalogue is a snapshot; it does not
+    see movies added or changed after it was built.
+    """
+
+    def __init__(self, movies):
+        self.movies = list(movies)
+        self.rating = numpy.array([movie.rating for movie in self.movies], dtype=numpy.float64)
+        self.votes = numpy.array([_number(movie, '_num_of_ratings') for movie in self.movies], dtype=numpy.float64)
+        self.metascore = numpy.array([_number(movie, '_metascore') for movie in self.movies], dtype=numpy.float64)
+        self.runtime = numpy.array([getattr(movie, '_runtime_minutes', 0) or 0 for movie in self.movies],
+                                   dtype=numpy.int32)
+        self.release = numpy.array([movie.release or 0 for movie in self.movies], dtype=numpy.int32)
+        self.genres, self.genre_indptr, self.genre_indices = _membership(self.movies, lambda movie: movie.genres)
+        self.actors, self.actor_indptr, self.actor_indices = _membership(self.movies, lambda movie: movie.actors)
+        self._genre_positions = {genre: i for i, genre in enumerate(self.genres)}
+        self._actor_positions = {actor: i for i, actor in enumerate(self.actors)}
+
+    def __len__(self):
+        return len(self.movies)
+
+    def genre_rows(self, genre):
+        """ Returns the movie rows in genre, or None for every row when genre is None. """
+        if genre is None:
+            return None
+        return _member_rows(self._genre_positions, self.genre_indptr, self.genre_indices, genre)
+
+    def actor_rows(self, actor):
+        return _member_rows(self._actor_positions, self.actor_indptr, self.actor_indices, actor)
+
+    def top_rated(self, k: int, genre=None) -> list:
+        """ Returns the k highest-rated movies, in genre if one is given. Ties keep catalogue order. """
+        rows = self.genre_rows(genre)
+        if rows is None:
+            rows = numpy.arange(len(self.movies))
+        ratings = self.rating[rows]
+        if 0 < k < len(rows):
+            # Partition down to the movies rated at least the k-th highest before sorting.
+            threshold = numpy.partition(ratings, len(rows) - k)[len(rows) - k]
+            keep = ratings >= threshold
+            rows, ratings = rows[keep], ratings[keep]
+        order = numpy.lexsort((rows, -ratings))[:max(k, 0)]
+        return [self.movies[row] for row in rows[order]]
+
+    def average_rating_by_genre(self) -> dict:
+        """ Returns each genre's mean movie rating. """
+        counts = numpy.diff(self.genre_indptr)
+        totals = numpy.zeros(len(self.genres))
+        numpy.add.at(totals, numpy.repeat(numpy.arange(len(self.genres)), counts), self.rating[self.genre_indices])
+        return {genre: float(totals[i] / counts[i]) for i, genre in enumerate(self.genres) if counts[i] > 0}
+
+    def release_year_histogram(self, genre=None) -> dict:
+        """ Returns the number of movies per release year, in genre if one is given. """
+        rows = self.genre_rows(genre)
+        years = self.release if rows is None else self.release[rows]
+        values, counts = numpy.unique(years[years > 0], return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def runtime_histogram(self, bin_minutes: int = 10, genre=None) -> dict:
+        """ Returns the number of movies per runtime bin, keyed by the first minute of the bin. """
+        rows = self.genre_rows(genre)
+        runtimes = self.runtime if rows is None else self.runtime[rows]
+        values, counts = numpy.unique(runtimes[runtimes > 0] // bin_minutes * bin_minutes, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def in_ranges(self, genre=None, actor=None, **ranges) -> list:
+        """ Returns the movies whose fields fall in the given ranges, and in genre and with actor if given, in
+        catalogue order.
+
+        Each keyword names a column (rating, votes, metascore, runtime or release) and gives an inclusive
+        (low, high) range, where either bound may be None to leave that side open. Movies missing a value for a
+        filtered column are left out.
+        """
+        mask = numpy.ones(len(self.movies), dtype=bool)
+        for rows in (self.genre_rows(genre), self.actor_rows(actor) if actor is not None else None):
+            if rows is not None:
+                member = numpy.zeros(len(self.movies), dtype=bool)
+                member[rows] = True
+                mask &= member
+        for name, (low, high) in ranges.items():
+            if name not in ('rating', 'votes', 'metascore', 'runtime', 'release'):
+                raise ValueError(f"no column named {name}")
+            column = getattr(self, name)
+            if column.dtype.kind == 'f':
+                mask &= ~numpy.isnan(column)
+            else:
+                mask &= column > 0
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        return [self.movies[row] for row in numpy.flatnonzero(mask)]
+
+
+def _number(movie, attribute):
+    try:
+        return float(getattr(movie, attribute))
+    except (AttributeError, TypeError, ValueError):
+        return numpy.nan
+
+
+def _membership(movies, members_of):
+    """ Builds a CSR matrix with a row per distinct member of the movies, listing the movie rows it belongs to. """
+    member_rows = dict()
+    for row, movie in enumerate(movies):
+        for member in members_of(movie):
+            member_rows.setdefault(member, []).append(row)
+    members = list(member_rows)
+    indptr = numpy.zeros(len(members) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(rows) for rows in member_rows.values()], out=indptr[1:])
+    indices = numpy.fromiter(
+        (row for rows in member_rows.values() for row in rows), dtype=numpy.int64, count=int(indptr[-1])
+    )
+    return members, indptr, indices
+
+
+def _member_rows(positions, indptr, indices, member):
+    i = positions.get(member)
+    if i is None:
+        return numpy.empty(0, dtype=numpy.int64)
+    return indices[indptr[i]:indptr[i + 1]]
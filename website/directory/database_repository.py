@@ -2,19 +2,33 @@ import csv
 import os
 
 from datetime import date
+from itertools import chain
 from typing import List
 
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, select, func, null, union_all, create_engine, event, text, column, Integer, Float
+from sqlalchemy import bindparam, and_, or_, union, cast
+from sqlalchemy import pool
 from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from werkzeug.security import generate_password_hash
 
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, joinedload, selectinload
 from flask import _app_ctx_stack
 
-from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
+from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader, MovieCatalogue, read_catalogue
 from website.domainmodel.model import User, Movie, Genre, Review, Actor, Director
-from website.directory.repository import AbstractRepository
+from website.directory.repository import AbstractRepository, MovieQuery, genre_preview_size
+from website.directory.repository import encode_cursor, decode_cursor, notify_change, next_version
+from website.directory.sources import source_fingerprint, source_matches
+from website.directory.orm import movies, movie_genres, genres, movie_actors, actors, directors, data_sources
+from website.directory.orm import change_versions
+from website.directory.orm import users as users_table, reviews as reviews_table
+from website.directory.orm import metadata, create_missing_indexes, SCHEMA_VERSION
+from website.directory.full_text_search import (
+    has_search_index, match_expression, create_search_triggers, drop_search_triggers, rebuild_search_index,
+    create_search_index
+)
 
 
 class SessionContextManager:
@@ -53,6 +67,11 @@ class SqlAlchemyRepository(AbstractRepository):
 
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        self._full_text_search = None
+        engine = session_factory.kw.get('bind')
+        if engine is not None:
+            with engine.connect() as connection:
+                self._full_text_search = has_search_index(connection)
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -78,7 +97,10 @@ class SqlAlchemyRepository(AbstractRepository):
     def add_movie(self, movie: Movie):
         with self._session_cm as scm:
             scm.session.add(movie)
+            scm.session.flush()
+            record_change(scm.session, [_movie_scope(movie)] + [_genre_scope(genre) for genre in movie.genres])
             scm.commit()
+        notify_change()
 
     def add_genre(self, genre: Genre):
         with self._session_cm as scm:
@@ -93,24 +115,27 @@ class SqlAlchemyRepository(AbstractRepository):
     def get_movie(self, id: Movie) -> Movie:
         movie = None
         try:
-            movie = self._session_cm.session.query(Movie).filter(Movie._title == id.title).one()
+            movie = self._session_cm.session.query(Movie).filter(
+                Movie._title == id.title, Movie.release == id.release
+            ).one()
         except NoResultFound:
             pass
         return movie
 
     def get_movie_by_title(self, title) -> Movie:
-        movie = None
-        try:
-            movie = self._session_cm.session.query(Movie).filter(Movie._title.ilike(title)).one()
-        except NoResultFound:
-            pass
-        return movie
+        # A case-insensitive title match, served by ix_movies_title_lower, that prefers the first movie added under
+        # the title.
+        return self._session_cm.session.query(Movie).filter(
+            func.lower(movies.c.title) == func.lower(title)
+        ).order_by(movies.c.id).first()
 
     def add_review(self, review:Review):
         super().add_review(review)
         with self._session_cm as scm:
             scm.session.add(review)
+            record_change(scm.session, [_movie_scope(review.movie)])
             scm.commit()
+        notify_change()
 
     def get_director(self, director: str):
         director_id = None
@@ -126,34 +151,43 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.commit()
 
     def get_10_movies_genre(self, genre) -> list:
-        movie_list = []
-        a_list = []
-        row = self._session_cm.session.execute('SELECT id FROM genres WHERE name = :genre_name',{'genre_name':genre.genre_name}).fetchone()
-        if row is None:
-            movie_list = list()
-        else:
-            genre_id = row[0]
-            if genre.genre_name == "Western" or genre.genre_name == "Musical":
-                movie_list = self._session_cm.session.execute(
-                    'SELECT movie_id FROM movie_genres WHERE genre_id = :genre_id ORDER BY genre_id ASC LIMIT 5',
-                    {'genre_id': genre_id}
-                ).fetchall()
-            else:
-                movie_list = self._session_cm.session.execute(
-                    'SELECT movie_id FROM movie_genres WHERE genre_id = :genre_id ORDER BY genre_id ASC LIMIT 10',
-                    {'genre_id':genre_id}
-                ).fetchall()
-        yet_another_list = self.movie_getter_helper(movie_list)
-        return yet_another_list
+        return self._movie_query().filter(
+            movies.c.id.in_(self._genre_movie_ids(genre))
+        ).order_by(movies.c.rating.desc(), movies.c.id).limit(genre_preview_size(genre)).all()
 
     def get_10_movies(self):
-        a_list = []
-        movie_list = self._session_cm.session.execute(
-            'SELECT title FROM movies ORDER BY rating DESC LIMIT 10'
-        ).fetchall()
-        for movie in movie_list:
-            a_list.extend(self._session_cm.session.query(Movie).filter(Movie._title == movie[0] ))
-        return a_list
+        return self._movie_query().order_by(movies.c.rating.desc(), movies.c.id).limit(10).all()
+
+    def get_home_page_movies(self):
+        by_rating = (movies.c.rating.desc(), movies.c.id)
+        # Rank every movie within each of its genres, and overall under a NULL genre, in one pass.
+        ranked = union_all(
+            select([
+                movie_genres.c.genre_id.label('genre_id'),
+                movies.c.id.label('movie_id'),
+                func.row_number().over(partition_by=movie_genres.c.genre_id, order_by=by_rating).label('position'),
+            ]).select_from(movie_genres.join(movies, movies.c.id == movie_genres.c.movie_id)),
+            select([
+                null().label('genre_id'),
+                movies.c.id.label('movie_id'),
+                func.row_number().over(order_by=by_rating).label('position'),
+            ]),
+        ).alias('ranked')
+        rows = self._movie_query().add_columns(ranked.c.genre_id).join(
+            ranked, movies.c.id == ranked.c.movie_id
+        ).filter(ranked.c.position <= 10).order_by(ranked.c.genre_id, ranked.c.position).all()
+
+        genres_by_id = {genre.id: genre for genre in self.get_genres()}
+        ten_movies = []
+        movies_genres = {genre: [] for genre in genres_by_id.values()}
+        for movie, genre_id in rows:
+            if genre_id is None:
+                ten_movies.append(movie)
+                continue
+            genre_movies = movies_genres[genres_by_id[genre_id]]
+            if len(genre_movies) < genre_preview_size(genres_by_id[genre_id]):
+                genre_movies.append(movie)
+        return ten_movies, movies_genres
 
     def get_genres(self):
         genres = []
@@ -164,66 +198,128 @@ class SqlAlchemyRepository(AbstractRepository):
         return genres
 
     def get_movies_by_title(self, title: str) -> List[Movie]:
-        movies = []
-        title = "%" + title + "%"
-        try:
-            movies.extend(self._session_cm.session.query(Movie).filter(Movie._title.ilike(title)).all())
-        except NoResultFound:
-            pass
-        return movies
+        return self._search('title', title)
 
     def get_number_of_movies(self):
         number_of_movies = self._session_cm.session.query(Movie).count()
         return number_of_movies
 
     def get_movies_by_director(self, director: str):
-        movie_list = []
-        row = self._session_cm.session.execute('SELECT name FROM directors WHERE name LIKE :director_name',{'director_name':"%"+director+"%"}).fetchone()
-        if row is None:
-            movie_list = list()
-        else:
-            director_id = row[0]
-            a_list = self._session_cm.session.execute(
-                'SELECT director FROM movies'
-            ).fetchall()
-            movie_list = self._session_cm.session.execute(
-                'SELECT id FROM movies WHERE director = :director_id ORDER BY id ASC',
-                {'director_id':director_id}
-            ).fetchall()
-        yet_another_list = self.movie_getter_helper(movie_list)
-        return yet_another_list
+        return self._search('directors', director)
 
     def get_movies_by_actor(self, actor: str):
-        movie_list = []
-        a_list = []
-        print(actor)
-        row = self._session_cm.session.execute('SELECT id FROM actors WHERE full_name LIKE :actor_name',{"actor_name":"%"+actor+"%"}).fetchone()
-        if row is None:
-            movie_list = list()
-        else:
-            actor_id = row[0]
-            print("here",actor_id)
-            movie_list = self._session_cm.session.execute(
-                'SELECT movie_id FROM movie_actors WHERE actor_id = :actor_id ORDER BY movie_id ASC',
-                {'actor_id':actor_id}
-            ).fetchall()
-        yet_another_list = self.movie_getter_helper(movie_list)
-        return yet_another_list
+        return self._search('actors', actor)
+
+    def search_movies(self, keywords: str):
+        return self._search(None, keywords)
 
     def get_all_movies_genre(self, genre) -> List[Movie]:
-        movie_list = []
-        a_list = []
-        row = self._session_cm.session.execute('SELECT id FROM genres WHERE name = :genre_name',{'genre_name':genre.genre_name}).fetchone()
-        if row is None:
-            movie_list = list()
+        return self._movie_query().filter(
+            movies.c.id.in_(self._genre_movie_ids(genre))
+        ).order_by(movies.c.id).all()
+
+    def get_movies_matching(self, query: MovieQuery, offset: int = 0, limit: int = None) -> List[Movie]:
+        return [movie for movie, value in self._ordered_query(query).offset(offset).limit(limit).all()]
+
+    def get_movies_after(self, query: MovieQuery, limit: int, cursor: str = None):
+        # A movie's position is its id. One extra movie is fetched to tell whether another page follows.
+        found = self._ordered_query(query, decode_cursor(query, cursor)).limit(limit + 1).all()
+        page = [movie for movie, value in found[:limit]]
+        if len(found) <= limit:
+            return page, None
+        last, value = found[limit - 1]
+        return page, encode_cursor(query, value, last._id)
+
+    def _ordered_query(self, query: MovieQuery, after=None):
+        # (movie, sort value) rows for the movies matching query in its order, after the (value, id) pair after when
+        # one is given. A relevance order sorts by the rank of the search results, which are joined in for it.
+        if query.sort == 'relevance':
+            ranked = self._ranked_search(query.text_field, query.text)
+            conditions = self._query_conditions(query, text=False)
+            sort_column = ranked.c.score
+            movie_query = self._movie_query().join(ranked, movies.c.id == ranked.c.movie_id)
+        else:
+            conditions = self._query_conditions(query)
+            sort_column = QUERY_COLUMNS[query.sort]
+            movie_query = self._movie_query()
+        if after is not None:
+            conditions.append(_after_condition(query, sort_column, *after))
+        return movie_query.add_columns(sort_column).filter(*conditions).order_by(*_query_order(query, sort_column))
+
+    def count_movies_matching(self, query: MovieQuery) -> int:
+        count = select([func.count(movies.c.id)])
+        for condition in self._query_conditions(query):
+            count = count.where(condition)
+        return self._session_cm.session.execute(count).scalar()
+
+    def _query_conditions(self, query: MovieQuery, text: bool = True):
+        # With text false, the search is left out, for callers that join the search results instead.
+        conditions = []
+        if query.genres and query.match_all_genres:
+            conditions += [movies.c.id.in_(self._genre_movie_ids(Genre(name))) for name in query.genres]
+        elif query.genres:
+            conditions.append(movies.c.id.in_(select([movie_genres.c.movie_id]).select_from(
+                movie_genres.join(genres, genres.c.id == movie_genres.c.genre_id)
+            ).where(genres.c.name.in_(query.genres))))
+        for name, (low, high) in query.ranges.items():
+            if low is not None:
+                conditions.append(QUERY_COLUMNS[name] >= low)
+            if high is not None:
+                conditions.append(QUERY_COLUMNS[name] <= high)
+        if query.director is not None:
+            conditions.append(movies.c.director.in_(select([directors.c.id]).where(directors.c.name == query.director)))
+        if query.actor is not None:
+            conditions.append(movies.c.id.in_(_actor_movie_ids(actors.c.full_name == query.actor)))
+        if text and query.text is not None:
+            conditions.append(movies.c.id.in_(self._text_movie_ids(query.text, query.text_field)))
+        return conditions
+
+    def _text_movie_ids(self, search: str, field: str):
+        # The ids of the movies the search methods would return for search, as a subquery.
+        if self._full_text_search is None:
+            self._full_text_search = has_search_index(self._session_cm.session.connection())
+        match = match_expression(search, field)
+        if self._full_text_search and match is not None:
+            return text('SELECT rowid AS movie_id FROM movie_search WHERE movie_search MATCH :match').bindparams(
+                match=match
+            ).columns(column('movie_id', Integer))
+        return _like_movie_ids(search, field)
+
+    def set_posters(self, posters):
+        with self._session_cm as scm:
+            changed = []
+            for movie_id, title, release, image in scm.session.execute(
+                select([movies.c.id, movies.c.title, movies.c.release, movies.c.image_hyperlink])
+            ).fetchall():
+                poster = posters(title, release)
+                if poster is not None and poster != image:
+                    changed.append({'movie_id': movie_id, 'poster': poster})
+            if changed:
+                scm.session.execute(
+                    movies.update().where(movies.c.id == bindparam('movie_id')).values(
+                        image_hyperlink=bindparam('poster')
+                    ), changed
+                )
+                # Like a sync of the movie file, new posters move every version on.
+                reset_versions(scm.session)
+                scm.commit()
+        if changed:
+            notify_change()
+        return len(changed)
+
+    def get_version(self, movie: Movie = None, genre: Genre = None):
+        if movie is not None:
+            scope = _movie_scope(movie)
+        elif genre is not None:
+            scope = _genre_scope(genre)
         else:
-            genre_id = row[0]
-            movie_list = self._session_cm.session.execute(
-                'SELECT movie_id FROM movie_genres WHERE genre_id = :genre_id ORDER BY genre_id ASC',
-                {'genre_id':genre_id}
-            ).fetchall()
-        yet_another_list = self.movie_getter_helper(movie_list)
-        return yet_another_list
+            scope = ALL_SCOPE
+        versions = dict(self._session_cm.session.execute(
+            select([change_versions.c.scope, change_versions.c.version]).where(
+                change_versions.c.scope.in_([scope, LOADED_SCOPE])
+            )
+        ).fetchall())
+        return versions.get(scope, versions.get(LOADED_SCOPE, 0))
 
     def get_reviews(self):
         reviews_list = []
@@ -241,18 +337,161 @@ class SqlAlchemyRepository(AbstractRepository):
             pass
         return reviews_list
 
-    def movie_getter_helper(self, movie_list):
-        a_list = []
-        for movie in movie_list:
-            a_list.extend(self._session_cm.session.execute(
-                        'SELECT title FROM movies WHERE id = :movie_id',
-                        {'movie_id':movie[0]}
-                    ).fetchall())
-        yet_another_list = []
-        for title in a_list:
-            movies = self._session_cm.session.query(Movie).filter(Movie._title == title[0]).all()
-            yet_another_list.append(movies[0])
-        return yet_another_list
+    def _movie_query(self):
+        # Load each listed movie's director, actors and genres up front rather than one lazy query per movie.
+        return self._session_cm.session.query(Movie).options(
+            joinedload('_director'),
+            selectinload('_actors'),
+            selectinload('_genres'),
+        )
+
+    def _search(self, field, search: str):
+        ranked = self._ranked_search(field, search)
+        return self._movie_query().join(ranked, movies.c.id == ranked.c.movie_id).order_by(
+            ranked.c.score, movies.c.id
+        ).all()
+
+    def _ranked_search(self, field, search: str):
+        # Substring search of the FTS5 table, as (movie_id, score) rows where score is the match's rank, lower for
+        # better matches. When the table does not exist or the search is too short, the same fields are searched
+        # with LIKE and every score is NULL, which leaves the movies in the order they were added.
+        if self._full_text_search is None:
+            self._full_text_search = has_search_index(self._session_cm.session.connection())
+        match = match_expression(search, field)
+        if not self._full_text_search or match is None:
+            return select([movies.c.id.label('movie_id'), cast(null(), Float).label('score')]).where(
+                movies.c.id.in_(_like_movie_ids(search, field))
+            ).alias('ranked')
+        return text(
+            'SELECT rowid AS movie_id, rank AS score FROM movie_search WHERE movie_search MATCH :match'
+        ).bindparams(match=match).columns(column('movie_id', Integer), column('score', Float)).alias('ranked')
+
+    def _genre_movie_ids(self, genre):
+        return select([movie_genres.c.movie_id]).select_from(
+            movie_genres.join(genres, genres.c.id == movie_genres.c.genre_id)
+        ).where(genres.c.name == genre.genre_name)
+
+
+# The movies columns MovieQuery sorts and filters on.
+QUERY_COLUMNS = {
+    'rating': movies.c.rating,
+    'votes': movies.c.num_of_ratings,
+    'year': movies.c.release,
+    'runtime': movies.c.runtime,
+    'title': movies.c.title,
+    'added': movies.c.id,
+}
+
+
+def _query_order(query: MovieQuery, sort_column):
+    # Movies without a value sort last either way, then ties go in the order the movies were added.
+    return sort_column.is_(None), sort_column.desc() if query.descending else sort_column.asc(), movies.c.id
+
+
+def _after_condition(query: MovieQuery, sort_column, value, movie_id: int):
+    # True for the movies _query_order puts after the movie with id movie_id and sort value value.
+    if value is None:
+        return and_(sort_column.is_(None), movies.c.id > movie_id)
+    beyond = sort_column < value if query.descending else sort_column > value
+    return or_(sort_column.is_(None), beyond, and_(sort_column == value, movies.c.id > movie_id))
+
+
+# The change_versions scopes of everything, and of the data as a whole as it was loaded.
+ALL_SCOPE = 'all'
+LOADED_SCOPE = 'loaded'
+
+
+def _movie_scope(movie: Movie):
+    return 'movie:{}'.format(getattr(movie, '_id', None))
+
+
+def _genre_scope(genre: Genre):
+    return 'genre:' + genre.genre_name
+
+
+def record_change(connection, scopes):
+    """ Moves scopes, and the 'all' scope, on to a new version. connection may also be a session. """
+    version = next_version(connection.execute(select([func.max(change_versions.c.version)])).scalar() or 0)
+    for scope in [ALL_SCOPE] + list(scopes):
+        updated = connection.execute(
+            change_versions.update().where(change_versions.c.scope == scope).values(version=version)
+        )
+        if updated.rowcount == 0:
+            connection.execute(change_versions.insert().values(scope=scope, version=version))
+
+
+def reset_versions(connection):
+    """ Moves every scope on to one new version, for data that was just loaded or reset. """
+    version = next_version(connection.execute(select([func.max(change_versions.c.version)])).scalar() or 0)
+    connection.execute(change_versions.delete())
+    connection.execute(change_versions.insert(), [
+        {'scope': LOADED_SCOPE, 'version': version}, {'scope': ALL_SCOPE, 'version': version}
+    ])
+
+
+def _actor_movie_ids(actor_condition):
+    return select([movie_actors.c.movie_id]).select_from(
+        movie_actors.join(actors, actors.c.id == movie_actors.c.actor_id)
+    ).where(actor_condition)
+
+
+def _like_movie_ids(search: str, field: str = None):
+    # The ids of the movies with search in field, or in any of the search table's columns without one.
+    pattern = "%" + search + "%"
+    movie_ids = []
+    if field is None:
+        movie_ids.append(select([movies.c.id]).where(
+            or_(movies.c.title.ilike(pattern), movies.c.description.ilike(pattern))
+        ))
+    elif field == 'title':
+        movie_ids.append(select([movies.c.id]).where(movies.c.title.ilike(pattern)))
+    if field in (None, 'actors'):
+        movie_ids.append(_actor_movie_ids(actors.c.full_name.ilike(pattern)))
+    if field in (None, 'directors'):
+        movie_ids.append(select([movies.c.id]).where(movies.c.director.in_(
+            select([directors.c.id]).where(directors.c.name.ilike(pattern))
+        )))
+    return union(*movie_ids) if len(movie_ids) > 1 else movie_ids[0]
+
+
+def create_database_engine(config) -> Engine:
+    """ Creates the engine for config['SQLALCHEMY_DATABASE_URI'] using the pool and SQLite settings in config. """
+    database_uri = config['SQLALCHEMY_DATABASE_URI']
+    url = make_url(database_uri)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    in_memory = is_sqlite and url.database in (None, '', ':memory:')
+
+    pool_class = getattr(pool, config.get('SQLALCHEMY_POOL_CLASS', 'QueuePool'))
+    if in_memory:
+        # Every connection to sqlite:// opens a new, empty database, so they must all share one.
+        pool_class = pool.StaticPool
+    options = {
+        'echo': config.get('SQLALCHEMY_ECHO', False),
+        'poolclass': pool_class,
+        'pool_pre_ping': config.get('SQLALCHEMY_POOL_PRE_PING', True),
+    }
+    if pool_class is pool.QueuePool:
+        options['pool_size'] = config.get('SQLALCHEMY_POOL_SIZE', 5)
+        options['max_overflow'] = config.get('SQLALCHEMY_MAX_OVERFLOW', 10)
+    if is_sqlite:
+        options['connect_args'] = {'check_same_thread': False}
+
+    engine = create_engine(database_uri, **options)
+    if is_sqlite:
+        pragmas = ['PRAGMA synchronous = ' + config.get('SQLITE_SYNCHRONOUS', 'NORMAL')]
+        if not in_memory:
+            pragmas.append('PRAGMA journal_mode = ' + config.get('SQLITE_JOURNAL_MODE', 'WAL'))
+            pragmas.append('PRAGMA mmap_size = ' + str(int(config.get('SQLITE_MMAP_SIZE', 0))))
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return engine
+
 
 def generic_generator(filename, post_process=None):
     with open(filename) as infile:
@@ -271,21 +510,316 @@ def generic_generator(filename, post_process=None):
             yield row
 
 
-def populate(session_factory, data_path, data_filename):
-    filename = os.path.join(data_path, data_filename)
-    movie_file_reader = MovieFileCSVReader(filename)
-    movie_file_reader.read_csv_file()
+# Rows per executemany call when bulk loading; bounds the memory held by one batch of parameters.
+BULK_INSERT_BATCH_SIZE = 50000
 
-    session = session_factory()
-    for director in movie_file_reader.dataset_of_directors:
-        session.add(director)
-    for movie in movie_file_reader.dataset_of_movies:
-        session.add(movie)
-    filename = os.path.join(data_path, "users.csv")
-    users_file_reader = MovieFileCSVReader(filename)
-    users_file_reader.read_csv_file_users()
+# Durability is traded for speed while loading. The pragmas are set back once the load's transaction commits.
+BULK_LOAD_PRAGMAS = {'synchronous': 'OFF', 'cache_size': '-262144', 'temp_store': 'MEMORY'}
 
-    for user in users_file_reader.dataset_of_users:
-        session.add(user)
 
-    session.commit()
+def _next_id(connection, table):
+    return (connection.execute(select([func.max(table.c.id)])).scalar() or 0) + 1
+
+
+def _insert_in_batches(connection, table, columns, rows):
+    """ Inserts rows, tuples of values for columns, with one executemany per batch. """
+    compiled = table.insert().compile(dialect=connection.dialect, column_keys=columns)
+    cursor = None
+    if compiled.positional:
+        # Run the compiled statement straight through the DBAPI cursor, so Core does not process each row's
+        # parameters on the way.
+        cursor = connection.connection.cursor()
+        positions = [columns.index(key) for key in compiled.positiontup]
+        if positions == list(range(len(columns))):
+            execute_batch = lambda batch: cursor.executemany(str(compiled), batch)
+        else:
+            execute_batch = lambda batch: cursor.executemany(
+                str(compiled), [tuple(row[position] for position in positions) for row in batch]
+            )
+    else:
+        execute_batch = lambda batch: connection.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+
+    try:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BULK_INSERT_BATCH_SIZE:
+                execute_batch(batch)
+                batch = []
+        if batch:
+            execute_batch(batch)
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+
+def _assign_ids(connection, table, name_column, names):
+    """ Returns a dict of each distinct name's id in table, and the dict of names not in it yet.
+
+    Names already in table keep their ids; new ones are given the next free ids.
+    """
+    ids = {name: id for id, name in connection.execute(select([table.c.id, name_column]))}
+    new_ids = dict()
+    next_id = _next_id(connection, table)
+    for name in names:
+        if name not in ids:
+            ids[name] = new_ids[name] = next_id
+            next_id += 1
+    return ids, new_ids
+
+
+def _insert_names(connection, catalogue: MovieCatalogue):
+    """ Inserts the genres, actors and directors of catalogue that are not stored yet and returns the name to id
+    dicts for all three. """
+    # Movies built by hand may refer to people and genres the catalogue does not list, so those are named too.
+    genre_ids, new_genre_ids = _assign_ids(connection, genres, genres.c.name, chain(
+        (genre.genre_name for genre in catalogue.genres),
+        (genre.genre_name for movie in catalogue.movies for genre in movie.genres),
+    ))
+    actor_ids, new_actor_ids = _assign_ids(connection, actors, actors.c.full_name, chain(
+        (actor.actor_full_name for actor in catalogue.actors),
+        (actor.actor_full_name for movie in catalogue.movies for actor in movie.actors),
+    ))
+    director_ids, new_director_ids = _assign_ids(connection, directors, directors.c.name, chain(
+        (director.director_full_name for director in catalogue.directors),
+        (movie.director.director_full_name for movie in catalogue.movies if movie.director is not None),
+    ))
+    _insert_in_batches(connection, genres, ['id', 'name'], ((id, name) for name, id in new_genre_ids.items()))
+    _insert_in_batches(connection, actors, ['id', 'full_name'], ((id, name) for name, id in new_actor_ids.items()))
+    _insert_in_batches(connection, directors, ['id', 'name'],
+                       ((id, name) for name, id in new_director_ids.items()))
+    return genre_ids, actor_ids, director_ids
+
+
+def _insert_associations(connection, genre_ids, actor_ids, numbered_movies):
+    """ Inserts the genre and actor rows of numbered_movies, a list of (movie id, movie) pairs. """
+    _insert_in_batches(connection, movie_genres, ['movie_id', 'genre_id'], (
+        (movie_id, genre_ids[genre.genre_name]) for movie_id, movie in numbered_movies for genre in movie.genres
+    ))
+    _insert_in_batches(connection, movie_actors, ['movie_id', 'actor_id'], (
+        (movie_id, actor_ids[actor.actor_full_name]) for movie_id, movie in numbered_movies for actor in movie.actors
+    ))
+
+
+# The movies columns a data file sets, in the order _movie_values gives them.
+MOVIE_FILE_COLUMNS = ['description', 'director', 'runtime', 'rating', 'metascore', 'num_of_ratings']
+
+
+def _movie_values(movie: Movie, director_ids):
+    return (
+        movie.description,
+        director_ids[movie.director.director_full_name] if movie.director is not None else None,
+        movie.runtime_minutes,
+        movie.rating,
+        getattr(movie, '_metascore', None),
+        getattr(movie, '_num_of_ratings', None),
+    )
+
+
+def bulk_load(connection, catalogue: MovieCatalogue, users=(), rebuild_search=True):
+    """ Inserts a catalogue's movies, and users, with one executemany per table.
+
+    Ids are assigned here rather than by the database, so association rows can be built without reading
+    anything back. With rebuild_search, the search table triggers are dropped for the load and the search table
+    rebuilt once after; otherwise the triggers index each movie as it is inserted.
+    """
+    search_index = rebuild_search and has_search_index(connection)
+    if search_index:
+        drop_search_triggers(connection)
+
+    genre_ids, actor_ids, director_ids = _insert_names(connection, catalogue)
+
+    numbered_movies = list(enumerate(catalogue.movies, _next_id(connection, movies)))
+    _insert_in_batches(connection, movies, ['id', 'title', 'release'] + MOVIE_FILE_COLUMNS + ['image_hyperlink'], (
+        (movie_id, movie.title, movie.release) + _movie_values(movie, director_ids) + (getattr(movie, '_image', None),)
+        for movie_id, movie in numbered_movies
+    ))
+    _insert_associations(connection, genre_ids, actor_ids, numbered_movies)
+    _insert_in_batches(connection, users_table, ['user_name', 'password'], (
+        (user.user_name, user.password) for user in users
+    ))
+
+    if search_index:
+        rebuild_search_index(connection)
+        create_search_triggers(connection)
+
+
+def _stored_movies(connection):
+    """ Returns a dict from each stored movie's (title, release) to its id and _movie_signature. """
+    genre_names = dict()
+    for movie_id, name in connection.execute(
+        select([movie_genres.c.movie_id, genres.c.name]).select_from(
+            movie_genres.join(genres, genres.c.id == movie_genres.c.genre_id)
+        ).order_by(movie_genres.c.id)
+    ):
+        genre_names.setdefault(movie_id, []).append(name)
+    actor_names = dict()
+    for movie_id, name in connection.execute(
+        select([movie_actors.c.movie_id, actors.c.full_name]).select_from(
+            movie_actors.join(actors, actors.c.id == movie_actors.c.actor_id)
+        ).order_by(movie_actors.c.id)
+    ):
+        actor_names.setdefault(movie_id, []).append(name)
+
+    stored = dict()
+    for row in connection.execute(
+        select([movies.c.id, movies.c.title, movies.c.release, directors.c.name.label('director_name')]
+               + [movies.c[name] for name in MOVIE_FILE_COLUMNS if name != 'director']).select_from(
+            movies.outerjoin(directors, directors.c.id == movies.c.director)
+        )
+    ):
+        signature = (
+            row['description'], row['director_name'], row['runtime'], row['rating'], row['metascore'],
+            row['num_of_ratings'], tuple(genre_names.get(row['id'], ())), tuple(actor_names.get(row['id'], ()))
+        )
+        stored[(row['title'], row['release'])] = (row['id'], signature)
+    return stored
+
+
+def _movie_signature(movie: Movie):
+    """ The data file's values for movie, with the director, genres and actors by name. """
+    director_names = {movie.director.director_full_name: movie.director.director_full_name} if movie.director else {}
+    return _movie_values(movie, director_names) + (
+        tuple(genre.genre_name for genre in movie.genres), tuple(actor.actor_full_name for actor in movie.actors)
+    )
+
+
+def _delete_where_in(connection, table, column, ids):
+    # Chunked, so no statement has more parameters than SQLite allows.
+    for start in range(0, len(ids), 500):
+        connection.execute(table.delete().where(column.in_(ids[start:start + 500])))
+
+
+def sync_catalogue(connection, catalogue: MovieCatalogue):
+    """ Makes the stored movies match catalogue, writing only the movies that were added, changed or removed.
+
+    Movies are matched on title and release year. Changed movies keep their ids, so their reviews stay with them;
+    the reviews of removed movies are deleted along with them. Returns the numbers of movies added, changed and
+    removed.
+    """
+    stored = _stored_movies(connection)
+    added = []
+    changed = []
+    for movie in catalogue.movies:
+        entry = stored.pop((movie.title, movie.release), None)
+        if entry is None:
+            added.append(movie)
+        elif entry[1] != _movie_signature(movie):
+            changed.append((entry[0], movie))
+    removed_ids = [movie_id for movie_id, signature in stored.values()]
+
+    for table, column in ((reviews_table, reviews_table.c.movie_id), (movie_genres, movie_genres.c.movie_id),
+                          (movie_actors, movie_actors.c.movie_id), (movies, movies.c.id)):
+        _delete_where_in(connection, table, column, removed_ids)
+
+    if changed:
+        genre_ids, actor_ids, director_ids = _insert_names(
+            connection, MovieCatalogue((movie for movie_id, movie in changed), (), (), ())
+        )
+        connection.execute(
+            movies.update().where(movies.c.id == bindparam('movie_id')).values(
+                {name: bindparam(name) for name in MOVIE_FILE_COLUMNS}
+            ),
+            [dict(zip(MOVIE_FILE_COLUMNS, _movie_values(movie, director_ids)), movie_id=movie_id)
+             for movie_id, movie in changed]
+        )
+        changed_ids = [movie_id for movie_id, movie in changed]
+        _delete_where_in(connection, movie_genres, movie_genres.c.movie_id, changed_ids)
+        _delete_where_in(connection, movie_actors, movie_actors.c.movie_id, changed_ids)
+        _insert_associations(connection, genre_ids, actor_ids, changed)
+
+    if added:
+        bulk_load(connection, MovieCatalogue(added, (), (), ()), rebuild_search=False)
+
+    return len(added), len(changed), len(removed_ids)
+
+
+def read_source_stamp(connection, name):
+    """ Returns the schema version and fingerprint name was loaded with, or None if it has not been loaded. """
+    row = connection.execute(select([data_sources]).where(data_sources.c.name == name)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def write_source_stamp(connection, name, source_path):
+    connection.execute(data_sources.delete().where(data_sources.c.name == name))
+    connection.execute(data_sources.insert().values(
+        name=name, schema_version=SCHEMA_VERSION, **source_fingerprint(source_path)
+    ))
+
+
+def read_users(data_path):
+    users_file_reader = MovieFileCSVReader(os.path.join(data_path, "users.csv"))
+    users_file_reader.read_csv_file_users()
+    return users_file_reader.dataset_of_users
+
+
+def populate(session_factory, data_path, data_filename, catalogue: MovieCatalogue = None):
+    source_path = os.path.join(data_path, data_filename)
+    if catalogue is None:
+        catalogue = read_catalogue(source_path)
+    users = read_users(data_path)
+
+    engine = session_factory.kw['bind']
+    with engine.connect() as connection:
+        is_sqlite = connection.dialect.name == 'sqlite'
+        previous_pragmas = dict()
+        if is_sqlite:
+            for pragma, value in BULK_LOAD_PRAGMAS.items():
+                previous_pragmas[pragma] = connection.execute('PRAGMA ' + pragma).scalar()
+                connection.execute('PRAGMA {} = {}'.format(pragma, value))
+        try:
+            with connection.begin():
+                bulk_load(connection, catalogue, users)
+                write_source_stamp(connection, data_filename, source_path)
+                reset_versions(connection)
+        finally:
+            for pragma, value in previous_pragmas.items():
+                connection.execute('PRAGMA {} = {}'.format(pragma, value))
+
+
+def sync_database(session_factory, data_path, data_filename) -> str:
+    """ Brings the database in line with the current schema and the movie file, loading as little as it can.
+
+    A database without a movies table is created and populated from scratch. Any other database keeps its users
+    and reviews: the tables, indexes and search table it lacks are added in place, and unless it is stamped with
+    the current schema version and a movie file that still matches, the differences from the movie file are
+    applied with sync_catalogue. Returns 'populated', 'synced' or 'current'.
+    """
+    engine = session_factory.kw['bind']
+    source_path = os.path.join(data_path, data_filename)
+    if not engine.has_table(movies.name):
+        metadata.drop_all(engine)
+        metadata.create_all(engine)
+        populate(session_factory, data_path, data_filename)
+        return 'populated'
+
+    stamp = None
+    if engine.has_table(data_sources.name):
+        with engine.connect() as connection:
+            stamp = read_source_stamp(connection, data_filename)
+
+    # Bring the existing database's tables, indexes and search table up to date. The search table goes first, so
+    # it is filled from the movies already stored rather than created empty along with the other tables.
+    create_search_index(engine)
+    metadata.create_all(engine)
+    create_missing_indexes(engine)
+    if stamp is not None and stamp['schema_version'] == SCHEMA_VERSION and source_matches(stamp, source_path):
+        return 'current'
+    catalogue = read_catalogue(source_path)
+    with engine.begin() as connection:
+        sync_catalogue(connection, catalogue)
+        write_source_stamp(connection, data_filename, source_path)
+        reset_versions(connection)
+    return 'synced'
+
+
+def reset_users(session_factory, data_path):
+    """ Replaces the users and reviews with the users in users.csv, for a fresh start without reloading movies. """
+    engine = session_factory.kw['bind']
+    with engine.begin() as connection:
+        connection.execute(reviews_table.delete())
+        connection.execute(users_table.delete())
+        _insert_in_batches(connection, users_table, ['user_name', 'password'], (
+            (user.user_name, user.password) for user in read_users(data_path)
+        ))
+        reset_versions(connection)
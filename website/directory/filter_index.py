@@ -0,0 +1,165 @@
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from itertools import dropwhile, islice
+from operator import and_, or_
+
+# The value each sortable or ranged field takes for a movie; None when the movie has no value for it.
+FIELD_VALUES = {
+    'rating': lambda movie: movie.rating,
+    'votes': lambda movie: getattr(movie, '_num_of_ratings', None),
+    'year': lambda movie: movie.release,
+    'runtime': lambda movie: getattr(movie, '_runtime_minutes', None),
+    'title': lambda movie: movie.title,
+}
+
+
+class MovieFilterIndex:
+    """ Per-field sorted indexes and posting lists over a list of movies, for answering MovieQuery listings.
+
+    Movies are numbered by their position in the list. Every filter becomes a bitmap, a Python int with bit i set
+    when movie i passes it, and filters combine by intersecting (or, for any-of genres, uniting) the bitmaps.
+    Genre bitmaps are built with the index; the others come from a posting list or a range of a sorted index.
+    Matches are read off in the order of the sort field's index, so a page stops as soon as it is full, unless
+    there are few enough of them to sort directly. Sorting by 'added' orders by row, and so does sorting by
+    'relevance': the memory repository's searches don't rank their matches, they return them in row order.
+    """
+
+    def __init__(self, movies):
+        self.movies = list(movies)
+        self._size = len(self.movies)
+        self._rows = {movie: row for row, movie in enumerate(self.movies)}
+        self._fields = {name: _SortedField([value_of(movie) for movie in self.movies])
+                        for name, value_of in FIELD_VALUES.items()}
+        self._fields['added'] = _SortedField(range(self._size))
+        self._fields['relevance'] = self._fields['added']
+        genre_rows = dict()
+        self._actor_rows = dict()
+        self._director_rows = dict()
+        for row, movie in enumerate(self.movies):
+            for genre in movie.genres:
+                genre_rows.setdefault(genre.genre_name, []).append(row)
+            for actor in movie.actors:
+                self._actor_rows.setdefault(actor.actor_full_name, []).append(row)
+            if movie.director is not None:
+                self._director_rows.setdefault(movie.director.director_full_name, []).append(row)
+        self._genre_bitmaps = {name: self._bitmap(rows) for name, rows in genre_rows.items()}
+
+    def matching(self, query, offset: int = 0, limit: int = None, found=None) -> list:
+        """ Returns the movies matching query, in its order, from offset on and at most limit of them.
+
+        found, when given, is the movies a text search returned; only those can match.
+        """
+        end = None if limit is None else offset + limit
+        return [self.movies[row] for row in islice(self._ordered_matches(query, found), offset, end)]
+
+    def page(self, query, limit: int, after=None, found=None):
+        """ Returns the next limit movies matching query after the (value, row) pair after, in its order, and the
+        (value, row) pair of the last of them, or None when no movies match beyond them.
+        """
+        rows = list(islice(self._ordered_matches(query, found, after), limit + 1))
+        if len(rows) <= limit:
+            return [self.movies[row] for row in rows], None
+        last = rows[limit - 1]
+        return [self.movies[row] for row in rows[:limit]], (self._fields[query.sort].values_by_row[last], last)
+
+    def _ordered_matches(self, query, found, after=None):
+        bitmap = self._match(query, found)
+        field = self._fields[query.sort]
+        if bin(bitmap).count('1') * 16 < self._size:
+            # Few matches: sorting them beats walking the whole index.
+            rows = field.sort(self._bitmap_rows(bitmap), query.descending)
+            if after is None:
+                return iter(rows)
+            return dropwhile(lambda row: not field.comes_after(row, after, query.descending), rows)
+        bits = bitmap.to_bytes((self._size + 7) // 8, 'little')
+        return (row for row in field.ordered_rows(query.descending, after) if bits[row >> 3] >> (row & 7) & 1)
+
+    def count(self, query, found=None) -> int:
+        return bin(self._match(query, found)).count('1')
+
+    def _match(self, query, found):
+        bitmap = (1 << self._size) - 1
+        if query.genres:
+            genre_bitmaps = [self._genre_bitmaps.get(name, 0) for name in query.genres]
+            bitmap &= reduce(and_ if query.match_all_genres else or_, genre_bitmaps)
+        for name, (low, high) in query.ranges.items():
+            bitmap &= self._bitmap(self._fields[name].rows_between(low, high))
+        if query.director is not None:
+            bitmap &= self._bitmap(self._director_rows.get(query.director, ()))
+        if query.actor is not None:
+            bitmap &= self._bitmap(self._actor_rows.get(query.actor, ()))
+        if found is not None:
+            bitmap &= self._bitmap(self._rows[movie] for movie in found if movie in self._rows)
+        return bitmap
+
+    def _bitmap(self, rows) -> int:
+        bits = bytearray((self._size + 7) // 8)
+        for row in rows:
+            bits[row >> 3] |= 1 << (row & 7)
+        return int.from_bytes(bits, 'little')
+
+    def _bitmap_rows(self, bitmap) -> list:
+        bits = bitmap.to_bytes((self._size + 7) // 8, 'little')
+        return [offset * 8 + bit for offset, byte in enumerate(bits) if byte for bit in range(8) if byte >> bit & 1]
+
+
+class _SortedField:
+    """ The rows that have a value for one field, sorted by value and then row, and the rows that don't. """
+
+    def __init__(self, values_by_row):
+        self.values_by_row = list(values_by_row)
+        present = sorted((value, row) for row, value in enumerate(self.values_by_row) if value is not None)
+        self.values = [value for value, row in present]
+        self.rows = [row for value, row in present]
+        self.missing = [row for row, value in enumerate(self.values_by_row) if value is None]
+
+    def rows_between(self, low, high) -> list:
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect_right(self.values, high)
+        return self.rows[start:end]
+
+    def ordered_rows(self, descending: bool, after=None):
+        """ Yields the rows in order, starting after the (value, row) pair after when one is given. """
+        if after is not None and after[0] is None:
+            yield from self.missing[bisect_right(self.missing, after[1]):]
+            return
+        if after is not None:
+            # Rows with the same value as after come in row order, so the ones still to come follow its row.
+            start = bisect_left(self.values, after[0])
+            end = bisect_right(self.values, after[0], start)
+            tied = self.rows[bisect_right(self.rows, after[1], start, end):end]
+        if not descending:
+            if after is None:
+                yield from self.rows
+            else:
+                yield from tied
+                yield from self.rows[end:]
+        else:
+            # Highest values first, but rows with equal values still in row order.
+            if after is None:
+                end = len(self.values)
+            else:
+                yield from tied
+                end = start
+            while end > 0:
+                start = bisect_left(self.values, self.values[end - 1], 0, end)
+                yield from self.rows[start:end]
+                end = start
+        yield from self.missing
+
+    def sort(self, rows, descending: bool) -> list:
+        """ Puts rows, given in row order, in the order ordered_rows would give them. """
+        values = self.values_by_row
+        present = sorted((row for row in rows if values[row] is not None), key=values.__getitem__,
+                         reverse=descending)
+        return present + [row for row in rows if values[row] is None]
+
+    def comes_after(self, row, after, descending: bool) -> bool:
+        """ Whether row comes after the (value, row) pair after in the order ordered_rows gives. """
+        value, after_row = after
+        own = self.values_by_row[row]
+        if own is None or value is None:
+            return own is None and (value is not None or row > after_row)
+        if own == value:
+            return row > after_row
+        return own < value if descending else own > value
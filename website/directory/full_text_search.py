@@ -0,0 +1,147 @@
+import sqlite3
+
+from sqlalchemy import DDL, event, text
+
+from website.directory.orm import metadata
+
+# An SQLite FTS5 index over each movie's title, description, actor names and director name. The rowid of
+# every row is the id of its movie. Triggers on movies and movie_actors keep it in step with the tables.
+# The trigram tokenizer answers case-insensitive substring queries, as the memory repository's SubstringIndex
+# does; it needs SQLite 3.34 or later, and without it the search methods fall back to LIKE.
+SEARCH_TABLE = 'movie_search'
+SEARCH_COLUMNS = ('title', 'description', 'actors', 'directors')
+TRIGRAM_SQLITE_VERSION = (3, 34, 0)
+
+CREATE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movie_search "
+    "USING fts5(title, description, actors, directors, tokenize = 'trigram')"
+)
+
+# Joins the actor names of a movie; searches never contain it, so a match can't straddle two actors.
+SEPARATOR = '\x1f'
+
+_ACTOR_NAMES = (
+    "coalesce((SELECT group_concat(actors.full_name, char(31)) FROM actors "
+    "JOIN movie_actors ON actors.id = movie_actors.actor_id WHERE movie_actors.movie_id = {movie_id}), '')"
+)
+_DIRECTOR_NAME = "coalesce((SELECT directors.name FROM directors WHERE directors.id = {director_id}), '')"
+
+SEARCH_TRIGGERS = {
+    'movie_search_movie_insert': (
+        "CREATE TRIGGER IF NOT EXISTS movie_search_movie_insert AFTER INSERT ON movies BEGIN "
+        "INSERT INTO movie_search (rowid, title, description, actors, directors) "
+        "VALUES (new.id, new.title, new.description, " + _ACTOR_NAMES.format(movie_id='new.id') + ", "
+        + _DIRECTOR_NAME.format(director_id='new.director') + "); END"
+    ),
+    'movie_search_movie_update': (
+        "CREATE TRIGGER IF NOT EXISTS movie_search_movie_update AFTER UPDATE ON movies BEGIN "
+        "UPDATE movie_search SET title = new.title, description = new.description, directors = "
+        + _DIRECTOR_NAME.format(director_id='new.director') + " WHERE rowid = new.id; END"
+    ),
+    'movie_search_movie_delete': (
+        "CREATE TRIGGER IF NOT EXISTS movie_search_movie_delete AFTER DELETE ON movies BEGIN "
+        "DELETE FROM movie_search WHERE rowid = old.id; END"
+    ),
+    'movie_search_actor_insert': (
+        "CREATE TRIGGER IF NOT EXISTS movie_search_actor_insert AFTER INSERT ON movie_actors BEGIN "
+        "UPDATE movie_search SET actors = " + _ACTOR_NAMES.format(movie_id='new.movie_id')
+        + " WHERE rowid = new.movie_id; END"
+    ),
+    'movie_search_actor_delete': (
+        "CREATE TRIGGER IF NOT EXISTS movie_search_actor_delete AFTER DELETE ON movie_actors BEGIN "
+        "UPDATE movie_search SET actors = " + _ACTOR_NAMES.format(movie_id='old.movie_id')
+        + " WHERE rowid = old.movie_id; END"
+    ),
+}
+
+REBUILD_SEARCH_TABLE = (
+    "INSERT INTO movie_search (rowid, title, description, actors, directors) "
+    "SELECT movies.id, movies.title, movies.description, " + _ACTOR_NAMES.format(movie_id='movies.id') + ", "
+    + _DIRECTOR_NAME.format(director_id='movies.director') + " FROM movies"
+)
+
+
+def _is_sqlite(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def supports_search_index(connection) -> bool:
+    return _is_sqlite(connection) and sqlite3.sqlite_version_info >= TRIGRAM_SQLITE_VERSION
+
+
+def _can_create_search_index(ddl, target, bind, **kw):
+    return supports_search_index(bind)
+
+
+def create_search_triggers(connection):
+    for trigger in SEARCH_TRIGGERS.values():
+        connection.execute(text(trigger))
+
+
+def drop_search_triggers(connection):
+    for name in SEARCH_TRIGGERS:
+        connection.execute(text('DROP TRIGGER IF EXISTS ' + name))
+
+
+def rebuild_search_index(connection):
+    """ Refills the search table from the movies, actors and directors tables. """
+    connection.execute(text('DELETE FROM movie_search'))
+    connection.execute(text(REBUILD_SEARCH_TABLE))
+
+
+def has_search_index(connection) -> bool:
+    if not _is_sqlite(connection):
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), name=SEARCH_TABLE
+    ).scalar() is not None
+
+
+def _search_table_sql(connection):
+    return connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), name=SEARCH_TABLE
+    ).scalar()
+
+
+def create_search_index(engine):
+    """ Adds the search table and its triggers to an existing SQLite database, filling it if it is new.
+
+    A search table made with another tokenizer is replaced, triggers included.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        if not supports_search_index(connection):
+            return
+        table_sql = _search_table_sql(connection)
+        if table_sql is not None and 'trigram' not in table_sql:
+            drop_search_triggers(connection)
+            connection.execute(text('DROP TABLE movie_search'))
+            table_sql = None
+        connection.execute(text(CREATE_SEARCH_TABLE))
+        create_search_triggers(connection)
+        if table_sql is None:
+            rebuild_search_index(connection)
+
+
+def match_expression(search: str, column: str = None):
+    """ Turns free text into an FTS5 query matching it as a case-insensitive substring of column, or of any column
+    without one.
+
+    The search is quoted as a single string, so quotes and FTS5 operators in it are never interpreted. Returns
+    None when it is shorter than a trigram, which the search table can't answer.
+    """
+    search = search.replace(SEPARATOR, '')
+    if len(search) < 3:
+        return None
+    phrase = '"' + search.replace('"', '""') + '"'
+    if column is None:
+        return phrase
+    return '{' + column + '} : ' + phrase
+
+
+# Create the search table and its triggers along with the other tables, and drop them with the tables.
+event.listen(metadata, 'after_create', DDL(CREATE_SEARCH_TABLE).execute_if(callable_=_can_create_search_index))
+for _trigger in SEARCH_TRIGGERS.values():
+    event.listen(metadata, 'after_create', DDL(_trigger).execute_if(callable_=_can_create_search_index))
+event.listen(metadata, 'before_drop', DDL('DROP TABLE IF EXISTS movie_search').execute_if(dialect='sqlite'))
@@ -1,87 +1,144 @@
 import csv
 import os
-import urllib.parse
+import pickle
 from bisect import bisect_left
 from datetime import date, datetime
 from typing import List
 
-import requests
 from flask import request
 from werkzeug.security import generate_password_hash
 
-from website.datafilereaders.movie_file_csv_reader import MovieFileCSVReader
-from website.directory.repository import AbstractRepository, RepositoryException
+from website.datafilereaders.movie_file_csv_reader import MovieCatalogue, read_catalogue
+from website.directory.repository import AbstractRepository, RepositoryException, MovieQuery, genre_preview_size
+from website.directory.repository import encode_cursor, decode_cursor, notify_change, next_version
+from website.directory.columnar_catalogue import ColumnarCatalogue, columns_available
+from website.directory.filter_index import MovieFilterIndex
+from website.directory.rating_index import RatingIndex
+from website.directory.search_index import SubstringIndex
+from website.directory.sources import source_fingerprint, source_matches
+from website.domainmodel.indexed_list import IndexedList
 from website.domainmodel.model import Movie, User, Review, Actor, Director, Genre, make_review
 from website.datafilereaders import movie_file_csv_reader
 
+# Bump whenever the pickled layout of MemoryRepository or the domain model changes.
+SNAPSHOT_VERSION = 11
+
 
 class MemoryRepository(AbstractRepository):
     # Articles ordered by date, not id. id is assumed unique.
 
     def __init__(self):
         self._movies = list()
+        # Lookup indexes, maintained by add_movie and add_user.
         self._movies_index = dict()
-        self._genre = list()
+        self._titles_index = dict()
+        # Trigram indexes over lowercased titles and names, used by the search methods.
+        self._title_search = SubstringIndex()
+        self._actor_search = SubstringIndex()
+        self._director_search = SubstringIndex()
+        self._keyword_search = SubstringIndex()
+        # Movies in rating order, overall and per genre, for the home page listings.
+        self._ratings = RatingIndex()
+        # Columnar copy of the movies for the analytics methods, built by populate and again after movies are added.
+        self._columns = None
+        # Sorted field indexes and posting lists for get_movies_matching, built on first use like the columns.
+        self._filter_index = None
         self._users = list()
+        self._users_index = dict()
         self._reviews = list()
-        self._actors = list()
-        self._directors = list()
+        # Reviews per movie and per user, each kept in timestamp order.
+        self._reviews_by_movie = dict()
+        self._reviews_by_user = dict()
+        # Genres, actors and directors in the order added, with hashed membership for the add methods' checks.
+        self._genre = IndexedList()
+        self._actors = IndexedList()
+        self._directors = IndexedList()
+        # The repository's version, and the versions of the movies and genres that changed since it was created.
+        self._created_version = next_version(0)
+        self._version = self._created_version
+        self._movie_versions = dict()
+        self._genre_versions = dict()
+
+    def save_snapshot(self, snapshot_path: str, source_path: str):
+        """ Pickles the repository to snapshot_path, stamped with the fingerprint of the CSV it was built from. """
+        header = {'version': SNAPSHOT_VERSION, 'source': source_fingerprint(source_path)}
+        temporary_path = snapshot_path + '.tmp'
+        with open(temporary_path, 'wb') as snapshot_file:
+            pickle.dump(header, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(self, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, snapshot_path)
+
+    @classmethod
+    def load_snapshot(cls, snapshot_path: str, source_path: str):
+        """ Returns the repository stored at snapshot_path.
+
+        Returns None if there is no usable snapshot, or if it was written by another snapshot version or from a
+        different source file.
+        """
+        try:
+            with open(snapshot_path, 'rb') as snapshot_file:
+                header = pickle.load(snapshot_file)
+                if header.get('version') != SNAPSHOT_VERSION:
+                    return None
+                if not source_matches(header.get('source'), source_path):
+                    return None
+                repo = pickle.load(snapshot_file)
+        except (OSError, EOFError, AttributeError, ImportError, pickle.UnpicklingError):
+            return None
+        if type(repo) is not cls:
+            return None
+        return repo
 
     def add_user(self, user: User):
         self._users.append(user)
+        self._users_index.setdefault(user.user_name, user)
 
     def get_user(self, username) -> str:
-        return next((user for user in self._users if user.user_name == username), None)
+        return self._users_index.get(username)
 
     def add_movie(self, movie: Movie):
-        if type(movie) is Movie and movie not in self._movies:
+        if type(movie) is Movie and (movie.title, movie.release) not in self._movies_index:
             self._movies.append(movie)
+            self._movies_index[(movie.title, movie.release)] = movie
+            self._titles_index.setdefault(movie.title, movie)
+            self._title_search.add(movie, [movie.title])
+            self._actor_search.add(movie, [actor.actor_full_name for actor in movie.actors])
+            if movie.director is not None:
+                self._director_search.add(movie, [movie.director.director_full_name])
+            # Keywords cover the fields the database's search table does.
+            self._keyword_search.add(movie, [movie.title, getattr(movie, '_description', None)]
+                                     + [actor.actor_full_name for actor in movie.actors]
+                                     + ([movie.director.director_full_name] if movie.director is not None else []))
+            self._ratings.add(movie)
+            self._columns = None
+            self._filter_index = None
+            self._record_change(movie, movie.genres)
+            notify_change()
 
     def get_movies_by_director(self, director: str):
-        movie_list = []
-        director = director.lower()
-        for movie in self._movies:
-            if movie.director is not None:
-                if director in movie.director.director_full_name.lower():
-                    movie_list.append(movie)
-        return movie_list
+        return self._director_search.search(director)
 
     def get_movies_by_actor(self, actor: str):
-        movie_list = []
-        actor = actor.lower()
-        for movie in self._movies:
-            for actors in movie.actors:
-                if actor in actors.actor_full_name.lower():
-                    movie_list.append(movie)
-        return movie_list
+        return self._actor_search.search(actor)
 
     def get_movies_by_title(self, title: str):
-        movie_list = []
-        title = title.lower()
-        for movie in self._movies:
-            movie_title = str(movie.title)
-            movie_titles = movie_title.lower()
-            if title in movie_titles:
-                movie_list.append(movie)
-        return movie_list
+        return self._title_search.search(title)
 
-    def get_movie(self, id: Movie) -> Movie:
-        movie = None
-
-        try:
-            for i in self._movies:
-                if i == id:
-                    movie = i;
-        except KeyError:
-            pass  # Ignore exception and return None.
+    def search_movies(self, keywords: str):
+        return self._keyword_search.search(keywords)
 
-        return movie
+    def get_movie(self, id: Movie) -> Movie:
+        if type(id) is not Movie:
+            return None
+        return self._movies_index.get((id.title, id.release))
 
     def get_number_of_movies(self):
         return len(self._movies)
 
     def sort_movies_by_release(self):
         self._movies.sort(key=lambda x: x.release, reverse=True)
+        # The filter index numbers movies by position, which has just changed.
+        self._filter_index = None
 
     def get_first_movie(self):
         movie = None
@@ -97,35 +154,52 @@ class MemoryRepository(AbstractRepository):
         return movie
 
     def get_movie_by_title(self, title):
-        for movie in self._movies:
-            if movie.title == title:
-                return movie
+        return self._titles_index.get(title)
 
     def get_review_for_movie(self, movie: Movie):
-        list_of_reviews = []
-        for review in self._reviews:
-            if movie == review.movie:
-                list_of_reviews.append(review)
-        return list_of_reviews
+        return list(self._reviews_by_movie.get(movie, ()))
+
+    def get_reviews_for_user(self, user: User):
+        return list(self._reviews_by_user.get(user, ()))
 
     def add_review(self, comment: Review):
         super().add_review(comment)
         self._reviews.append(comment)
+        insert_in_timestamp_order(self._reviews_by_movie.setdefault(comment.movie, []), comment)
+        insert_in_timestamp_order(self._reviews_by_user.setdefault(comment.user, []), comment)
+        self._record_change(comment.movie)
+        notify_change()
 
     def get_reviews(self):
         return self._reviews
 
+    def get_version(self, movie: Movie = None, genre: Genre = None):
+        if movie is not None:
+            return self._movie_versions.get(movie, self._created_version)
+        if genre is not None:
+            return self._genre_versions.get(genre, self._created_version)
+        return self._version
+
+    def _record_change(self, movie: Movie, genres=()):
+        self._version = next_version(self._version)
+        self._movie_versions[movie] = self._version
+        for genre in genres:
+            self._genre_versions[genre] = self._version
+
+    def set_posters(self, posters):
+        changed = 0
+        for movie in self._movies:
+            poster = posters(movie.title, movie.release)
+            if poster is not None and poster != getattr(movie, '_image', None):
+                movie.image = poster
+                self._record_change(movie, movie.genres)
+                changed += 1
+        if changed:
+            notify_change()
+        return changed
+
     def get_10_movies(self):
-        a_list = []
-        count = 0
-        a_sort = sorted(self._movies, key=lambda x: x.rating, reverse=True)
-        for i in a_sort:
-            if count < 10:
-                a_list.append(i)
-            else:
-                break
-            count += 1
-        return a_list
+        return self._ratings.top(10)
 
     def get_genres(self):
         return self._genre
@@ -153,79 +227,128 @@ class MemoryRepository(AbstractRepository):
     def get_10_movies_genre(self, genre):
         if type(genre) is not Genre:
             return
-        a_list = []
-        count = 0
-        for movie in self._movies:
-            if genre in movie.genres:
-                a_list.append(movie)
-            if genre == Genre("Western") and len(a_list) == 5:
-                break
-            if genre == Genre("Musical") and len(a_list) == 5:
-                break
-            if len(a_list) == 10:
-                break
-        return a_list
+        return self._ratings.top(genre_preview_size(genre), genre)
+
+    def get_home_page_movies(self):
+        movies_genres = {genre: self.get_10_movies_genre(genre) for genre in self._genre}
+        return self.get_10_movies(), movies_genres
 
     def get_all_movies_genre(self, genre):
         if type(genre) is not Genre:
             return
-        a_list = []
-        count = 0
-        for movie in self._movies:
-            if genre in movie.genres:
-                a_list.append(movie)
-        return a_list
-
-
-def load_movies(data_path: str, repo: MemoryRepository):
-    tags = dict()
-    movie_file_reader = MovieFileCSVReader(data_path)
-    movie_file_reader.read_csv_file()
-    for data_row in movie_file_reader.dataset_of_movies:
-        repo.add_movie(data_row)
-
-
-def load_genres(data_path: str, repo: MemoryRepository):
-    movie_file_reader = MovieFileCSVReader(data_path)
-    movie_file_reader.read_csv_file()
-    for genre in movie_file_reader.dataset_of_genres:
+        return self._ratings.movies_in_genre(genre)
+
+    def get_movies_matching(self, query: MovieQuery, offset: int = 0, limit: int = None):
+        return self._movie_filter().matching(query, offset, limit, self._text_matches(query))
+
+    def get_movies_after(self, query: MovieQuery, limit: int, cursor: str = None):
+        # A movie's position is its row in the filter index.
+        movies, last = self._movie_filter().page(query, limit, decode_cursor(query, cursor), self._text_matches(query))
+        return movies, None if last is None else encode_cursor(query, *last)
+
+    def count_movies_matching(self, query: MovieQuery):
+        return self._movie_filter().count(query, self._text_matches(query))
+
+    def _movie_filter(self):
+        if self._filter_index is None:
+            self._filter_index = MovieFilterIndex(self._movies)
+        return self._filter_index
+
+    def _text_matches(self, query: MovieQuery):
+        if query.text is None:
+            return None
+        search = {'title': self._title_search, 'actors': self._actor_search,
+                  'directors': self._director_search}.get(query.text_field, self._keyword_search)
+        return search.search(query.text)
+
+    def build_columns(self):
+        """ Builds the columnar catalogue now rather than on the first analytics query. Needs NumPy. """
+        if not columns_available():
+            raise RepositoryException('The columnar catalogue needs NumPy')
+        if self._columns is None:
+            self._columns = ColumnarCatalogue(self._movies)
+        return self._columns
+
+    def get_top_rated_movies(self, k: int, genre: Genre = None):
+        return self.build_columns().top_rated(k, genre)
+
+    def get_average_rating_by_genre(self):
+        return self.build_columns().average_rating_by_genre()
+
+    def get_release_year_histogram(self, genre: Genre = None):
+        return self.build_columns().release_year_histogram(genre)
+
+    def get_runtime_histogram(self, bin_minutes: int = 10, genre: Genre = None):
+        return self.build_columns().runtime_histogram(bin_minutes, genre)
+
+    def get_movies_in_ranges(self, genre: Genre = None, actor: Actor = None, **ranges):
+        """ Returns the movies within every given (low, high) range of rating, votes, metascore, runtime and
+        release, and in genre and with actor if given. """
+        return self.build_columns().in_ranges(genre, actor, **ranges)
+
+
+def insert_in_timestamp_order(reviews: List[Review], review: Review):
+    # Reviews almost always arrive in time order, so walking back from the end is O(1) in practice.
+    position = len(reviews)
+    if isinstance(review.timestamp, datetime):
+        while position > 0 and isinstance(reviews[position - 1].timestamp, datetime) \
+                and reviews[position - 1].timestamp > review.timestamp:
+            position -= 1
+    reviews.insert(position, review)
+
+
+def load_movies(data_path: str, repo: MemoryRepository, catalogue: MovieCatalogue = None):
+    if catalogue is None:
+        catalogue = read_catalogue(data_path)
+    for movie in catalogue.movies:
+        repo.add_movie(movie)
+
+
+def load_genres(data_path: str, repo: MemoryRepository, catalogue: MovieCatalogue = None):
+    if catalogue is None:
+        catalogue = read_catalogue(data_path)
+    for genre in catalogue.genres:
         repo.add_genre(genre)
 
 
-def load_actors(data_path: str, repo: MemoryRepository):
-    movie_file_reader = MovieFileCSVReader(data_path)
-    movie_file_reader.read_csv_file()
-    for act in movie_file_reader.dataset_of_actors:
-        repo.add_actors(act)
+def load_actors(data_path: str, repo: MemoryRepository, catalogue: MovieCatalogue = None):
+    if catalogue is None:
+        catalogue = read_catalogue(data_path)
+    for actor in catalogue.actors:
+        repo.add_actors(actor)
 
 
-def load_directors(data_path: str, repo: MemoryRepository):
-    movie_file_reader = MovieFileCSVReader(data_path)
-    movie_file_reader.read_csv_file()
-    for dict in movie_file_reader.dataset_of_directors:
-        repo.add_director(dict)
+def load_directors(data_path: str, repo: MemoryRepository, catalogue: MovieCatalogue = None):
+    if catalogue is None:
+        catalogue = read_catalogue(data_path)
+    for director in catalogue.directors:
+        repo.add_director(director)
 
 
 def populate(data_path: str, repo: MemoryRepository):
-    # Load articles and tags into the repository.
-    load_movies(data_path, repo)
+    # Parse the movie file once and load every entity from the same catalogue.
+    catalogue = read_catalogue(data_path)
+
+    load_movies(data_path, repo, catalogue)
 
-    load_genres(data_path, repo)
+    load_genres(data_path, repo, catalogue)
 
-    load_actors(data_path, repo)
+    load_actors(data_path, repo, catalogue)
 
-    load_directors(data_path, repo)
+    load_directors(data_path, repo, catalogue)
 
+    if columns_available():
+        repo.build_columns()
 
-def imdb_from_title(title, year):
-    pattern = 'https://api.themoviedb.org/3/search/movie?api_key=67cfd6550d69776df1bbefcd79c38b6e&language=en-US&'
-    encoded_title = urllib.parse.quote(title)
 
-    url = pattern.format(query=encoded_title, year=year)
-    url = pattern + "query=" + encoded_title + "&year=" + str(year)
-    r = requests.get(url)
-    res = r.json()
-    movie_id = res['results'][0]['poster_path']
-    print(movie_id)
-    image_url = 'https://image.tmdb.org/t/p/w500'+str(movie_id)
-    return image_url
+def load_repository(data_path: str, snapshot_path: str = None) -> MemoryRepository:
+    """ Loads the repository from its snapshot when it is still current, otherwise populates and re-snapshots it. """
+    if snapshot_path is not None:
+        repo = MemoryRepository.load_snapshot(snapshot_path, data_path)
+        if repo is not None:
+            return repo
+    repo = MemoryRepository()
+    populate(data_path, repo)
+    if snapshot_path is not None:
+        repo.save_snapshot(snapshot_path, data_path)
+    return repo
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Table, MetaData, Column, Integer, String, Date, DateTime,
-    ForeignKey, Float
+    ForeignKey, Float, Index, BigInteger, inspect, func, text
 )
 from sqlalchemy.orm import mapper, relationship
 
@@ -8,6 +8,9 @@ from website.domainmodel import model
 
 metadata = MetaData()
 
+# Bumped whenever the tables change, so sync_database upgrades a database created for an older schema.
+SCHEMA_VERSION = 2
+
 users = Table(
     'users', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -71,6 +74,66 @@ directors = Table(
     Column('name', String(255), nullable=False),
 )
 
+# One row per data file loaded into the database: the schema version it was loaded under and the file's fingerprint.
+data_sources = Table(
+    'data_sources', metadata,
+    Column('name', String(255), primary_key=True),
+    Column('schema_version', Integer, nullable=False),
+    Column('size', Integer, nullable=False),
+    Column('mtime_ns', Integer, nullable=False),
+    Column('sha256', String(64), nullable=False)
+)
+
+# The version of each scope that changed since the data was loaded: 'all', 'movie:<movie id>' or 'genre:<name>'.
+# Scopes without a row are at the version of the 'loaded' row, written whenever the data is loaded or reset.
+change_versions = Table(
+    'change_versions', metadata,
+    Column('scope', String(255), primary_key=True),
+    Column('version', BigInteger, nullable=False)
+)
+
+# Secondary indexes for the repository's lookups. Each association table is indexed from both sides, so the
+# indexes cover genre/actor listings as well as loading a movie's genres/actors.
+Index('ix_movies_title_release', movies.c.title, movies.c.release, unique=True)
+Index('ix_movies_title_lower', func.lower(movies.c.title))
+Index('ix_movies_rating', movies.c.rating.desc(), movies.c.id)
+Index('ix_movies_director', movies.c.director)
+Index('ix_movie_genres_genre_movie', movie_genres.c.genre_id, movie_genres.c.movie_id)
+Index('ix_movie_genres_movie_genre', movie_genres.c.movie_id, movie_genres.c.genre_id)
+Index('ix_movie_actors_actor_movie', movie_actors.c.actor_id, movie_actors.c.movie_id)
+Index('ix_movie_actors_movie_actor', movie_actors.c.movie_id, movie_actors.c.actor_id)
+Index('ix_reviews_movie_id', reviews.c.movie_id)
+Index('ix_reviews_user_id', reviews.c.user_id)
+Index('ix_genres_name', genres.c.name)
+Index('ix_actors_full_name', actors.c.full_name)
+Index('ix_directors_name', directors.c.name)
+
+
+def create_missing_indexes(engine):
+    """ Adds any index declared above that an existing database doesn't have yet.
+
+    metadata.create_all only creates indexes together with their tables, so databases created before an index
+    was declared are upgraded with this.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = _index_names(engine, inspector, table.name)
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+
+
+def _index_names(engine, inspector, table_name):
+    if engine.dialect.name == 'sqlite':
+        # The inspector skips SQLite's expression indexes, such as ix_movies_title_lower.
+        rows = engine.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+                              table=table_name)
+        return {name for name, in rows}
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
 
 def map_model_to_tables():
     mapper(model.User, users, properties={
@@ -84,7 +147,8 @@ def map_model_to_tables():
         '_title': movies.c.title,
         'release': movies.c.release,
         '_description': movies.c.description,
-        '_Director__director_full_name': relationship(model.Director, backref="_director"),
+        '_director_id': movies.c.director,
+        '_director': relationship(model.Director, backref="_director_movies"),
         '_runtime_minutes': movies.c.runtime,
         '_rating': movies.c.rating,
         '_metascore': movies.c.metascore,
@@ -0,0 +1,52 @@
+class RatingIndex:
+    """ Movies in descending rating order, overall and per genre, for the top-rated listings.
+
+    Adding a movie appends it to its buckets. A bucket is only re-sorted on the next read after a movie arrived out
+    of order, so populating stays linear and reads of an unchanged bucket are O(k). Ties keep the order in which
+    the movies were added. A movie's rating is taken when it is added.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._all = _RankedBucket()
+        self._genres = dict()
+        self._genre_movies = dict()
+
+    def add(self, movie):
+        entry = (-movie.rating, self._count, movie)
+        self._count += 1
+        self._all.add(entry)
+        for genre in movie.genres:
+            bucket = self._genres.get(genre)
+            if bucket is None:
+                bucket = self._genres[genre] = _RankedBucket()
+            bucket.add(entry)
+            self._genre_movies.setdefault(genre, []).append(movie)
+
+    def top(self, n: int, genre=None) -> list:
+        bucket = self._all if genre is None else self._genres.get(genre)
+        if bucket is None:
+            return []
+        return bucket.top(n)
+
+    def movies_in_genre(self, genre) -> list:
+        """ Returns every movie in genre, in the order the movies were added. """
+        return list(self._genre_movies.get(genre, ()))
+
+
+class _RankedBucket:
+
+    def __init__(self):
+        self.entries = []
+        self.is_sorted = True
+
+    def add(self, entry):
+        if self.entries and entry < self.entries[-1]:
+            self.is_sorted = False
+        self.entries.append(entry)
+
+    def top(self, n: int) -> list:
+        if not self.is_sorted:
+            self.entries.sort()
+            self.is_sorted = True
+        return [movie for _, _, movie in self.entries[:n]]
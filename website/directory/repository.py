@@ -1,11 +1,18 @@
 import abc
+import base64
+import json
+import math
+import time
 from typing import List
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 
 from website.domainmodel.model import User, Review, Movie, Genre
 
 repo_instance = None
 
+# Called with no arguments whenever a repository adds a movie or a review, for instance to drop cached pages.
+change_listeners = []
+
 
 class RepositoryException(Exception):
 
@@ -13,6 +20,170 @@ class RepositoryException(Exception):
         pass
 
 
+def notify_change():
+    for listener in change_listeners:
+        listener()
+
+
+def next_version(last: int) -> int:
+    """ Returns the version that follows last: the current time in microseconds since the epoch, or last + 1 if
+    the clock has not moved past last.
+
+    Being times, versions survive the repository being reloaded without being reused, and double as the time
+    the change was made.
+    """
+    return max(last + 1, time.time_ns() // 1000)
+
+
+def version_time(version: int) -> datetime:
+    return datetime.fromtimestamp(version / 1000000, timezone.utc)
+
+
+def genre_preview_size(genre: Genre) -> int:
+    """ Number of top-rated movies shown for a genre on the home page. """
+    if genre.genre_name == "Western" or genre.genre_name == "Musical":
+        return 5
+    return 10
+
+
+class MovieQuery:
+    """ Filters and an order for a movie listing, answered by AbstractRepository.get_movies_matching.
+
+    genres are Genre names; a movie matches when it has any of them, or all of them with match_all_genres. Each
+    range is an inclusive (low, high) pair in which either bound may be None; year filters on the release year and
+    votes on the number of ratings. director and actor are full names. text restricts the movies to those found
+    by a search of text_field ('title', 'actors' or 'directors', or None for every field), like the search
+    methods. Movies missing a ranged value never match that range, and sort after the movies that have one.
+    Ties are broken by the order in which movies were added, which is also what sort='added' orders by.
+    sort='relevance' needs text, and lists the best matches first, in the order the search methods return them.
+    """
+
+    SORT_KEYS = ('rating', 'votes', 'year', 'runtime', 'title', 'added', 'relevance')
+
+    def __init__(self, genres=(), match_all_genres: bool = False, year=None, rating=None, runtime=None,
+                 votes=None, director: str = None, actor: str = None, text: str = None, text_field: str = None,
+                 sort: str = 'rating', descending: bool = None):
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"cannot sort movies by {sort}")
+        if sort == 'relevance' and text is None:
+            raise ValueError("only a text search can be sorted by relevance")
+        self.genres = [genre.strip() for genre in genres if genre and genre.strip()]
+        self.match_all_genres = match_all_genres
+        self.ranges = {name: bounds for name, bounds in
+                       (('year', year), ('rating', rating), ('runtime', runtime), ('votes', votes))
+                       if bounds is not None and bounds != (None, None)}
+        self.director = director
+        self.actor = actor
+        self.text = text
+        self.text_field = text_field
+        self.sort = sort
+        # Numbers sort highest first, and titles, the catalogue and search results in their natural order, unless
+        # told otherwise.
+        self.descending = sort not in ('title', 'added', 'relevance') if descending is None else descending
+
+
+def encode_cursor(query: MovieQuery, value, position: int) -> str:
+    """ Returns the cursor that resumes query after the movie with sort value value at position.
+
+    position is where the repository keeps the movie, which breaks ties between equal values.
+    """
+    state = json.dumps([query.sort, query.descending, value, position], separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode()).decode().rstrip('=')
+
+
+def decode_cursor(query: MovieQuery, cursor: str):
+    """ Returns the (value, position) pair cursor resumes after, or None when there is no cursor.
+
+    Raises ValueError when cursor is malformed or was made for a different order than query's.
+    """
+    if cursor is None:
+        return None
+    try:
+        sort, descending, value, position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise ValueError(f"malformed cursor {cursor}")
+    value_types = (str,) if sort == 'title' else (int, float)
+    if (sort, descending) != (query.sort, query.descending) or type(position) is not int or not (
+            value is None or isinstance(value, value_types) and type(value) is not bool):
+        raise ValueError(f"cursor {cursor} does not belong to this listing")
+    return value, position
+
+
+# The listing arguments that bound each MovieQuery range, and the type of their values.
+RANGE_ARGUMENTS = {
+    'year': ('year_from', 'year_to', int),
+    'rating': ('rating_min', 'rating_max', float),
+    'runtime': ('runtime_min', 'runtime_max', int),
+    'votes': ('votes_min', 'votes_max', float),
+}
+
+
+def movie_query_from_args(args, genres=(), match_all_genres: bool = None, sort: str = 'rating', **fixed) -> MovieQuery:
+    """ Builds a MovieQuery from listing arguments, such as a request's, on top of the filters the caller fixes.
+
+    args is a MultiDict, and sort is the order used when it does not name one. Empty arguments are left out. Raises
+    ValueError when an argument is not a number where one is needed, or names an unknown order.
+    """
+    genres = list(genres) + args.getlist('genres')
+    if match_all_genres is None or 'genre_match' in args:
+        match_all_genres = args.get('genre_match') == 'all'
+    order = args.get('order')
+    if order not in (None, 'asc', 'desc'):
+        raise ValueError(f"order must be asc or desc, not {order}")
+    ranges = {name: (_number_argument(args, low, kind), _number_argument(args, high, kind))
+              for name, (low, high, kind) in RANGE_ARGUMENTS.items()}
+    return MovieQuery(
+        genres=genres,
+        match_all_genres=match_all_genres,
+        director=args.get('director') or None,
+        actor=args.get('actor') or None,
+        sort=args.get('sort', sort),
+        descending={'asc': False, 'desc': True}.get(order),
+        **ranges,
+        **fixed
+    )
+
+
+def _number_argument(args, name: str, kind):
+    value = args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        number = kind(value)
+    except ValueError:
+        number = None
+    if number is None or not math.isfinite(number):
+        raise ValueError(f"{name} must be a number, not {value}")
+    return number
+
+
+class MovieStream:
+    """ Iterates over up to limit movies matching query after cursor, getting batch_size movies at a time from the
+    repository, so only one batch is held at once.
+
+    Once iteration is over, next_cursor is the cursor for the movies after the last one, or None if there are none.
+    """
+
+    def __init__(self, repository, query: MovieQuery, limit: int, cursor: str = None, batch_size: int = 20):
+        self._repository = repository
+        self.query = query
+        self.limit = limit
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.next_cursor = None
+
+    def __iter__(self):
+        remaining = self.limit
+        cursor = self.cursor
+        while remaining > 0:
+            movies, cursor = self._repository.get_movies_after(self.query, min(self.batch_size, remaining), cursor)
+            yield from movies
+            remaining -= len(movies)
+            if cursor is None:
+                break
+        self.next_cursor = cursor
+
+
 class AbstractRepository(abc.ABC):
 
     @abc.abstractmethod
@@ -35,6 +206,11 @@ class AbstractRepository(abc.ABC):
     def get_movies_by_title(self, title) -> str:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def search_movies(self, keywords: str):
+        """ Returns the movies whose title, description, actors or director match keywords. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movies_by_director(self, title: str):
         raise NotImplementedError
@@ -51,6 +227,57 @@ class AbstractRepository(abc.ABC):
     def get_all_movies_genre(self, genre) -> Genre:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_movies_matching(self, query: MovieQuery, offset: int = 0, limit: int = None) -> List[Movie]:
+        """ Returns the movies matching query in its order, skipping the first offset and at most limit of them. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_movies_after(self, query: MovieQuery, limit: int, cursor: str = None):
+        """ Returns the next limit movies matching query after cursor, in its order, and the cursor for the
+        page after them, which is None on the last page. Without a cursor the first page is returned.
+
+        Cursors come from encode_cursor and mark the last movie returned rather than a count of movies, so a page
+        costs the same however deep it is, and movies added or removed in between do not shift later pages.
+        Raises ValueError for a cursor that is malformed or made for another order.
+        """
+        raise NotImplementedError
+
+    def iter_movies_after(self, query: MovieQuery, limit: int, cursor: str = None, batch_size: int = 20):
+        """ Returns a MovieStream over the movies get_movies_after(query, limit, cursor) would return. """
+        # Reject a bad cursor here rather than part way through a streamed response.
+        decode_cursor(query, cursor)
+        return MovieStream(self, query, limit, cursor, batch_size)
+
+    @abc.abstractmethod
+    def count_movies_matching(self, query: MovieQuery) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_version(self, movie: Movie = None, genre: Genre = None) -> int:
+        """ Returns the version of movie, of the movies in genre, or with neither of everything in the repository.
+
+        A movie's version goes up when it is added or reviewed, a genre's when a movie in it is added, and the
+        repository's on every change. Versions come from next_version, so version_time gives when the change was
+        made. Reloading or resetting the data moves every version on.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_posters(self, posters) -> int:
+        """ Sets the image of each movie to its poster URL, from posters(title, release) which returns the URL or
+        None. Movies posters has no URL for keep their image. Returns the number of movies changed.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_home_page_movies(self):
+        """ Returns the 10 top-rated movies, and a dict mapping each genre to its top-rated movies.
+
+        Each genre's list is as long as genre_preview_size(genre) allows, like get_10_movies_genre.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movie_by_title(self, title) -> str:
         raise NotImplementedError
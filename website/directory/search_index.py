@@ -0,0 +1,61 @@
+from array import array
+
+
+class SubstringIndex:
+    """ A trigram inverted index answering case-insensitive substring queries over the text keys of each item.
+
+    Items are numbered in the order they are added and results are returned in that order. Queries shorter than
+    a trigram can't use the postings, so they fall back to scanning the precomputed lowercase keys.
+    """
+
+    GRAM_SIZE = 3
+    # Joins the keys of an item; queries never contain it, so a match can't straddle two keys.
+    SEPARATOR = '\x00'
+
+    def __init__(self):
+        self._items = []
+        self._texts = []
+        self._postings = dict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item, keys):
+        keys = tuple(key.lower() for key in keys if key)
+        item_id = len(self._items)
+        self._items.append(item)
+        self._texts.append(self.SEPARATOR.join(keys))
+        for key in keys:
+            for gram in self.__grams(key):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = array('I', (item_id,))
+                elif posting[-1] != item_id:
+                    # Item ids only grow, so every posting list stays sorted and duplicate-free.
+                    posting.append(item_id)
+
+    def search(self, query: str) -> list:
+        query = query.lower().replace(self.SEPARATOR, '')
+        if len(query) < self.GRAM_SIZE:
+            return [item for item, text in zip(self._items, self._texts) if query in text]
+
+        postings = []
+        for gram in self.__grams(query):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if len(candidates) <= 32 or len(posting) > 8 * len(candidates):
+                # Verifying the remaining candidates is cheaper than intersecting with a long posting list.
+                break
+            candidates.intersection_update(posting)
+
+        return [self._items[item_id] for item_id in sorted(candidates) if query in self._texts[item_id]]
+
+    @classmethod
+    def __grams(cls, text: str):
+        return {text[i:i + cls.GRAM_SIZE] for i in range(len(text) - cls.GRAM_SIZE + 1)}
@@ -0,0 +1,30 @@
+import hashlib
+import os
+
+# Fingerprints of the movie file a repository was built from, so a memory snapshot or a database can tell whether
+# the file has changed since.
+
+
+def source_fingerprint(source_path: str):
+    stat = os.stat(source_path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': file_sha256(source_path)}
+
+
+def source_matches(fingerprint, source_path: str) -> bool:
+    if not fingerprint:
+        return False
+    stat = os.stat(source_path)
+    if stat.st_size != fingerprint['size']:
+        return False
+    if stat.st_mtime_ns == fingerprint['mtime_ns']:
+        return True
+    # The file was touched since the fingerprint was taken, so only trust it if the contents are unchanged.
+    return file_sha256(source_path) == fingerprint['sha256']
+
+
+def file_sha256(file_name: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
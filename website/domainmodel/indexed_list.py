@@ -0,0 +1,112 @@
+class IndexedList(list):
+    """ A list that also counts its items in a dict once it is long enough, so membership tests are hash lookups
+    instead of scans.
+
+    Up to INDEX_THRESHOLD items it is searched like a list and has no dict, which keeps the many short lists (an
+    actor's colleagues, say) as small as plain ones. Reads, equality with plain lists and the mutating list methods
+    behave as for list. Items must be hashable, and must not change their hash while they are in the list.
+    """
+    __slots__ = ('_counts',)
+
+    INDEX_THRESHOLD = 8
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self._counts = None
+        self._index_if_long()
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def _index_if_long(self):
+        if self._counts is None and len(self) > self.INDEX_THRESHOLD:
+            self._counts = dict()
+            for item in self:
+                self._count(item)
+
+    def _count(self, item):
+        self._counts[item] = self._counts.get(item, 0) + 1
+
+    def _uncount(self, item):
+        remaining = self._counts[item] - 1
+        if remaining == 0:
+            del self._counts[item]
+        else:
+            self._counts[item] = remaining
+
+    def __contains__(self, item):
+        if self._counts is None:
+            return super().__contains__(item)
+        try:
+            return item in self._counts
+        except TypeError:
+            # An unhashable item cannot be in the list.
+            return False
+
+    def append(self, item):
+        super().append(item)
+        if self._counts is None:
+            self._index_if_long()
+        else:
+            self._count(item)
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        if self._counts is None:
+            self._index_if_long()
+        else:
+            for item in items:
+                self._count(item)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, times):
+        super().__imul__(times)
+        self._counts = None
+        self._index_if_long()
+        return self
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        if self._counts is None:
+            self._index_if_long()
+        else:
+            self._count(item)
+
+    def remove(self, item):
+        super().remove(item)
+        if self._counts is not None:
+            self._uncount(item)
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        if self._counts is not None:
+            self._uncount(item)
+        return item
+
+    def clear(self):
+        super().clear()
+        self._counts = None
+
+    def __setitem__(self, index, value):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        if isinstance(index, slice):
+            value = list(value)
+        super().__setitem__(index, value)
+        if self._counts is None:
+            self._index_if_long()
+            return
+        for item in removed:
+            self._uncount(item)
+        for item in (value if isinstance(index, slice) else [value]):
+            self._count(item)
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        if self._counts is not None:
+            for item in removed:
+                self._uncount(item)
@@ -1,7 +1,25 @@
 from datetime import datetime
+from functools import total_ordering
 
+from website.domainmodel.indexed_list import IndexedList
 
 
+def _review_ids(owner) -> set:
+    """ The ids of a movie's or user's reviews, so add_review can check membership by identity with a set lookup.
+
+    The set isn't pickled, since ids don't outlive the process. It is rebuilt whenever its size no longer matches the
+    reviews list, which the mappers load, and append to through backrefs, without going through add_review.
+    """
+    ids = owner.__dict__.get('_review_ids')
+    if ids is None or len(ids) != len(owner._reviews):
+        ids = owner.__dict__['_review_ids'] = {id(review) for review in owner._reviews}
+    return ids
+
+
+def _without_review_ids(state: dict) -> dict:
+    state = state.copy()
+    state.pop('_review_ids', None)
+    return state
 
 
 class Genre:
@@ -56,7 +74,7 @@ class Actor:
             self.actor_full_name = None
         else:
             self.actor_full_name = actor_full_name.strip()
-        self.colleague_list = []
+        self.colleague_list = IndexedList()
 
     def __repr__(self):
         return f"<Actor {self.actor_full_name}>"
@@ -77,9 +95,12 @@ class Actor:
             return False
 
     def add_actor_colleague(self, colleague):
-        self.colleague_list.append(colleague)
-        colleague.colleague_list.append(self)
+        if colleague not in self.colleague_list:
+            self.colleague_list.append(colleague)
+        if self not in colleague.colleague_list:
+            colleague.colleague_list.append(self)
 
+@total_ordering
 class Movie:
     def __init__(self, title: str, release: int):
 
@@ -108,13 +129,27 @@ class Movie:
         return f"<Movie {self._title}, {self.release}>"
 
     def __eq__(self, other):
-        return other.title == self.title and other.release == self.release
+        if not isinstance(other, Movie):
+            return NotImplemented
+        return self._title == other._title and self.release == other.release
 
     def __lt__(self, other):
-        return self.__repr__() < other.__repr__()
+        # Ordered by title, then release year, comparing the fields directly so sorting allocates nothing.
+        if not isinstance(other, Movie):
+            return NotImplemented
+        if self._title != other._title:
+            return (self._title or "") < (other._title or "")
+        return (self.release or 0) < (other.release or 0)
 
     def __hash__(self):
-        return hash((self.title, self.release))
+        return hash((self._title, self.release))
+
+    def sort_key(self) -> tuple:
+        """ The key movies are ordered by. Pass Movie.sort_key as key= to build each movie's key once per sort. """
+        return self._title or "", self.release or 0
+
+    def __getstate__(self):
+        return _without_review_ids(self.__dict__)
 
     @property
     def actors(self):
@@ -170,8 +205,11 @@ class Movie:
 
 
     def add_review(self, review):
-        if type(review) is Review and review not in self._reviews:
-            self._reviews.append(review)
+        if type(review) is Review:
+            review_ids = _review_ids(self)
+            if id(review) not in review_ids:
+                self._reviews.append(review)
+                review_ids.add(id(review))
 
     @property
     def num_of_ratings(self):
@@ -322,6 +360,7 @@ class Review:
         self._date = value
 
 
+@total_ordering
 class User:
     def __init__(self, user_name: str, password: str):
         if type(user_name) is str:
@@ -332,7 +371,7 @@ class User:
             self._password = password
         else:
             self._password = None
-        self._watched_movies = []
+        self._watched_movies = IndexedList()
         self._reviews = []
         self._time_spent_watching_movies_minutes = 0
 
@@ -343,11 +382,14 @@ class User:
         return self._user_name == other._user_name
 
     def __lt__(self, other):
-        return self.__repr__() < other.__repr__()
+        return (self._user_name or "") < (other._user_name or "")
 
     def __hash__(self):
         return hash(self._user_name)
 
+    def __getstate__(self):
+        return _without_review_ids(self.__dict__)
+
     def watch_movie(self, movie):
         if type(movie) is Movie and movie not in self._watched_movies:
             self._watched_movies.append(movie)
@@ -356,8 +398,11 @@ class User:
             pass
 
     def add_review(self, review):
-        if type(review) is Review and review not in self._reviews:
-            self._reviews.append(review)
+        if type(review) is Review:
+            review_ids = _review_ids(self)
+            if id(review) not in review_ids:
+                self._reviews.append(review)
+                review_ids.add(id(review))
         else:
             pass
 
@@ -400,10 +445,7 @@ class User:
 
     @reviews.setter
     def reviews(self, other):
-        if type(other) is Review and other not in self._reviews:
-            self._reviews.append(other)
-        else:
-            pass
+        self.add_review(other)
 
     @property
     def time_spent_watching_movies_minutes(self):
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# The cache create_app configures, or None when caching is off.
+cache_instance = None
+
+
+class FragmentCache:
+    """ Rendered HTML fragments by key, evicted least recently used first and expired ttl seconds after rendering.
+
+    Subclasses store the fragments. clear drops every fragment, and a fragment that was being rendered while the
+    cache was cleared is returned but not stored, since it may have been rendered from the data as it was before.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, key: str, render):
+        """ Returns the fragment stored for key, or calls render to make it and stores the result. """
+        fragment = self.get(key)
+        if fragment is None:
+            generation = self._generation
+            fragment = render()
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, fragment)
+        return fragment
+
+    def get(self, key: str):
+        """ Returns the fragment stored for key, or None if there is none or it has expired. """
+        with self._lock:
+            return self._load(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._drop_all()
+
+    def _load(self, key):
+        raise NotImplementedError
+
+    def _store(self, key, fragment):
+        raise NotImplementedError
+
+    def _drop_all(self):
+        raise NotImplementedError
+
+
+class MemoryFragmentCache(FragmentCache):
+    """ Keeps the fragments in a dict in this process. """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 300.0, clock=time.monotonic):
+        super().__init__(max_entries, ttl)
+        self._clock = clock
+        # Fragments and the time they expire, least recently used first.
+        self._entries = OrderedDict()
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, fragment = entry
+        if expires <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return fragment
+
+    def _store(self, key, fragment):
+        self._entries[key] = (self._clock() + self.ttl, fragment)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _drop_all(self):
+        self._entries.clear()
+
+
+class DiskFragmentCache(FragmentCache):
+    """ Keeps each fragment in a file under directory, so processes sharing the directory share the fragments.
+
+    A file's modification time is when it was rendered and its access time when it was last used, which is set
+    explicitly rather than left to the file system.
+    """
+
+    SUFFIX = '.html'
+
+    def __init__(self, directory: str, max_entries: int = 64, ttl: float = 300.0, clock=time.time):
+        super().__init__(max_entries, ttl)
+        self.directory = directory
+        self._clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + self.SUFFIX)
+
+    def _load(self, key):
+        path = self._path(key)
+        now = self._clock()
+        try:
+            rendered = os.stat(path).st_mtime
+            if rendered + self.ttl <= now:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as fragment_file:
+                fragment = fragment_file.read()
+            os.utime(path, (now, rendered))
+        except FileNotFoundError:
+            # Never stored, or removed by another process in the meantime.
+            return None
+        return fragment
+
+    def _store(self, key, fragment):
+        path = self._path(key)
+        now = self._clock()
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as fragment_file:
+            fragment_file.write(fragment)
+        os.utime(temporary_path, (now, now))
+        os.replace(temporary_path, path)
+        paths = self._fragment_paths()
+        if len(paths) > self.max_entries:
+            paths.sort(key=_last_used)
+            for path in paths[:len(paths) - self.max_entries]:
+                _remove(path)
+
+    def _drop_all(self):
+        for path in self._fragment_paths():
+            _remove(path)
+
+    def _fragment_paths(self):
+        return [entry.path for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIX)]
+
+
+def _last_used(path):
+    try:
+        return os.stat(path).st_atime
+    except FileNotFoundError:
+        return 0
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def create_fragment_cache(config):
+    """ Returns the cache config asks for with FRAGMENT_CACHE ('memory', 'disk' or 'none'), or None for 'none'. """
+    kind = config.get('FRAGMENT_CACHE', 'memory')
+    max_entries = int(config.get('FRAGMENT_CACHE_SIZE', 64))
+    ttl = float(config.get('FRAGMENT_CACHE_TTL', 300))
+    if kind == 'memory':
+        return MemoryFragmentCache(max_entries, ttl)
+    if kind == 'disk':
+        return DiskFragmentCache(config['FRAGMENT_CACHE_DIR'], max_entries, ttl)
+    if kind == 'none':
+        return None
+    raise ValueError(f"unknown fragment cache {kind}")
+
+
+def cached(key: str, render):
+    """ Returns the fragment for key from the configured cache, rendering it with render when needed. """
+    if cache_instance is None:
+        return render()
+    return cache_instance.fetch(key, render)
+
+
+def invalidate():
+    """ Drops every cached fragment. Registered as a repository change listener by create_app. """
+    if cache_instance is not None:
+        cache_instance.clear()
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context, url_for
 from better_profanity import profanity
 from flask_wtf import FlaskForm
 from wtforms import TextAreaField, HiddenField, SubmitField
@@ -6,40 +6,114 @@ from wtforms.validators import DataRequired, Length, ValidationError
 import website.directory.repository as repo
 import website.directory.memory_repository as mem
 import website.movie_genre.services as services
+from website.conditional_get import conditional_page
 from website.domainmodel.model import Genre
 
 movies_blueprint = Blueprint(
     'all_movies_bp', __name__)
 
 
+SEARCH_FIELDS = {'Title': 'title', 'Director': 'directors', 'Actor': 'actors', 'Keyword': None}
+
+
 @movies_blueprint.route('/gen', methods=['GET'])
 def movies_by_genre():
     a_genre = request.args.get('genre')
-    a_genre = a_genre[0:len(a_genre) - 1]
-    a_genre = Genre(a_genre)
-    all_movies = services.get_all_movies_genre(repo.repo_instance, a_genre)
+    # Links from the home page end the genre with a stray quote.
+    a_genre = Genre(a_genre.rstrip("'"))
 
+    query = movie_query_from_request(genres=[a_genre.genre_name], match_all_genres=True)
 
-    return render_template(
-        'movies/all_movies.html',
-        all_movies=all_movies,
-        title=a_genre.genre_name
-    )
+    def render():
+        all_movies, total = movie_page(query)
+
+        return stream_template(
+            'movies/all_movies.html',
+            all_movies=all_movies,
+            title=a_genre.genre_name,
+            total=total,
+            pagination=CursorPagination(all_movies)
+        )
+
+    # Only the movies of the genres in the query can appear, so the page changes with their versions.
+    return conditional_page(services.get_genres_version(repo.repo_instance, query.genres), render)
 
 
 @movies_blueprint.route('/search', methods=['GET'])
 def movies_by_search():
+    return conditional_page(services.get_version(repo.repo_instance), render_search)
+
+
+def render_search():
     a_parameter = request.args.get('parameter')
     a_search = request.args.get('search_parameter')
-    if a_parameter == 'Title':
-        movies = services.get_movies_by_title(repo.repo_instance, a_search)
-    if a_parameter == 'Director':
-        movies = services.get_movies_by_director(repo.repo_instance, a_search)
-    if a_parameter == 'Actor':
-        movies = services.get_movies_by_actor(repo.repo_instance, a_search)
-
-    return render_template(
+    # Without a sort argument, the best matches come first.
+    query = movie_query_from_request(text=a_search, text_field=SEARCH_FIELDS.get(a_parameter),
+                                     sort='relevance' if a_search is not None else 'added')
+    movies, total = movie_page(query)
+
+    return stream_template(
         'movies/all_movies.html',
         all_movies=movies,
         title=a_search,
+        total=total,
+        pagination=CursorPagination(movies)
     )
+
+
+def stream_template(template_name, **context):
+    """ Returns a response that renders the template as it is sent, rather than building the whole page first.
+
+    Listings iterate over a MovieStream, so only a batch of movies and a few kilobytes of page are held at a time.
+    """
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    # Send the page in chunks of a few movies rather than one write per template fragment.
+    stream.enable_buffering(20)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+
+def movie_page(query):
+    try:
+        return services.stream_movies_after(repo.repo_instance, query, request.args.get('cursor') or None)
+    except services.InvalidCursorException:
+        abort(400)
+
+
+def movie_query_from_request(genres=(), match_all_genres=None, sort='rating', **fixed):
+    """ Builds a MovieQuery from the listing arguments of the request, on top of the filters the route fixes. """
+    try:
+        return repo.movie_query_from_args(request.args, genres, match_all_genres, sort, **fixed)
+    except ValueError:
+        abort(400)
+
+
+def page_url(**changes):
+    """ Returns the URL of this request with the given arguments replaced, or removed when given as None. """
+    args = request.args.to_dict(flat=False)
+    for name, value in changes.items():
+        args.pop(name, None)
+        if value is not None:
+            args[name] = value
+    return url_for(request.endpoint, **args)
+
+
+class CursorPagination:
+    """ The page links of a listing paged by cursor. The next page's cursor is only known once the movies have
+    been listed, so the template reads the links after its loop over them.
+    """
+
+    previous_page_url = None
+
+    def __init__(self, movies):
+        self._movies = movies
+
+    @property
+    def first_page_url(self):
+        return page_url(cursor=None) if request.args.get('cursor') else None
+
+    @property
+    def next_page_url(self):
+        next_cursor = self._movies.next_cursor
+        return page_url(cursor=next_cursor) if next_cursor else None
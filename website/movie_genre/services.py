@@ -1,5 +1,9 @@
-from website.directory.repository import AbstractRepository
-from website.domainmodel.model import Movie, Review, User
+from website.directory.repository import AbstractRepository, MovieQuery
+from website.domainmodel.model import Genre, Movie, Review, User
+
+# Movies shown per page of a listing.
+MOVIES_PER_PAGE = 60
+
 
 class NonExistentActorException(Exception):
     pass
@@ -13,6 +17,9 @@ class NonExistentGenreException(Exception):
 class NonExistentMovieException(Exception):
     pass
 
+class InvalidCursorException(Exception):
+    pass
+
 def get_movies_by_title(repo: AbstractRepository, title):
     if title is None:
         raise NonExistentMovieException
@@ -20,6 +27,13 @@ def get_movies_by_title(repo: AbstractRepository, title):
     return movies
 
 
+def search_movies(repo: AbstractRepository, keywords):
+    if keywords is None:
+        raise NonExistentMovieException
+    movies = repo.search_movies(keywords)
+    return movies
+
+
 def get_movies_by_director(repo: AbstractRepository, title):
     if title is None:
         raise NonExistentDirectorException
@@ -39,3 +53,27 @@ def get_all_movies_genre(repo: AbstractRepository, genre):
         raise NonExistentGenreException
     movies = repo.get_all_movies_genre(genre)
     return movies
+
+
+def get_version(repo: AbstractRepository, movie: Movie = None, genre=None):
+    return repo.get_version(movie, genre)
+
+
+def get_genres_version(repo: AbstractRepository, genre_names):
+    # Versions are times, so a change to any of the genres gives it a version later than all the others. Without
+    # genres, any movie can be listed.
+    if not genre_names:
+        return repo.get_version()
+    return max(repo.get_version(genre=Genre(name)) for name in genre_names)
+
+
+def stream_movies_after(repo: AbstractRepository, query: MovieQuery, cursor: str = None,
+                        page_size: int = MOVIES_PER_PAGE):
+    """ Returns a MovieStream over the page of movies matching query that follows cursor, and the number of movies
+    matching query.
+    """
+    try:
+        movies = repo.iter_movies_after(query, page_size, cursor)
+    except ValueError:
+        raise InvalidCursorException
+    return movies, repo.count_movies_matching(query)
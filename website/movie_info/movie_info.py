@@ -10,6 +10,7 @@ import website.Home.services as services
 from flask_wtf import FlaskForm
 
 from website.authentication.authentication import login_required
+from website.conditional_get import conditional_page
 
 movie_info_blueprint = Blueprint(
     'movie_info_bp', __name__)
@@ -31,11 +32,11 @@ def movie_info():
     if a_movie is None:
         movie = movie[0:len(movie) - 1]
         a_movie = services.get_movie(repo.repo_instance, movie)
-    return render_template(
+    return conditional_page(services.get_version(repo.repo_instance, a_movie), lambda: render_template(
         'movies/movie_info.html',
         movie=a_movie,
         show_comments_for_movie=movie_to_show_comments
-    )
+    ))
 
 
 @movie_info_blueprint.route('/comment', methods=['GET', 'POST'])
@@ -0,0 +1,243 @@
+import csv
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+import requests
+from flask import current_app
+from flask.cli import AppGroup
+
+import website.directory.repository as repo
+
+TMDB_API_URL = 'https://api.themoviedb.org/3'
+TMDB_IMAGE_URL = 'https://image.tmdb.org/t/p/w500'
+
+
+class PosterFetchError(Exception):
+    """ A lookup that failed for a reason that may not last, such as the network, so nothing is cached for it. """
+    pass
+
+
+class TMDBPosterFetcher:
+    """ Looks up the poster of a movie with The Movie Database's search API, returning its URL or None.
+
+    api_url can point at a stand-in for the API, such as a FixtureServer.
+    """
+
+    def __init__(self, api_key: str, api_url: str = TMDB_API_URL, image_url: str = TMDB_IMAGE_URL,
+                 timeout: float = 5.0):
+        self.api_key = api_key
+        self.api_url = api_url.rstrip('/')
+        self.image_url = image_url
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def __call__(self, title: str, year: int):
+        try:
+            response = self._session.get(self.api_url + '/search/movie', timeout=self.timeout, params={
+                'api_key': self.api_key, 'language': 'en-US', 'query': title, 'year': year
+            })
+            response.raise_for_status()
+            results = response.json().get('results') or []
+        except (requests.RequestException, ValueError) as error:
+            raise PosterFetchError(f"{title} ({year}): {error}")
+        poster_path = results[0].get('poster_path') if results else None
+        return self.image_url + poster_path if poster_path else None
+
+
+class FixturePosterFetcher:
+    """ Looks up posters in a CSV file with Title, Year and Poster columns, for tests and offline use.
+
+    Poster holds a TMDB poster path such as /abc.jpg, or is empty for a movie without one. Movies not in the file
+    have no poster either.
+    """
+
+    def __init__(self, file_name: str, image_url: str = TMDB_IMAGE_URL):
+        self.image_url = image_url
+        self.poster_paths = dict()
+        with open(file_name, mode='r', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                self.poster_paths[(row['Title'], int(row['Year']))] = row['Poster'] or None
+
+    def __call__(self, title: str, year: int):
+        poster_path = self.poster_paths.get((title, year))
+        return self.image_url + poster_path if poster_path else None
+
+
+class PosterCache:
+    """ Poster URLs by movie title and release year, kept in a JSON file so they outlast the process.
+
+    A movie known to have no poster is cached too, and is due for another lookup once negative_ttl seconds have
+    passed. Nothing here touches the network; the cache is filled by backfill.
+    """
+
+    def __init__(self, path: str, negative_ttl: float = 7 * 24 * 3600, clock=time.time):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        # (poster URL or None, time it was looked up) by (title, year).
+        self._entries = dict()
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as cache_file:
+                for entry in json.load(cache_file):
+                    self._entries[(entry['title'], entry['year'])] = (entry['poster'], entry['resolved'])
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, title: str, year: int):
+        """ Returns the cached poster URL of the movie, or None if it has none or hasn't been looked up. """
+        entry = self._entries.get((title, year))
+        return entry[0] if entry is not None else None
+
+    def needs_lookup(self, title: str, year: int) -> bool:
+        entry = self._entries.get((title, year))
+        if entry is None:
+            return True
+        poster, resolved = entry
+        return poster is None and resolved + self.negative_ttl <= self._clock()
+
+    def put(self, title: str, year: int, poster):
+        with self._lock:
+            self._entries[(title, year)] = (poster, self._clock())
+
+    def save(self):
+        """ Writes the cache to its file, replacing the old one only once the new one is complete. """
+        with self._lock:
+            entries = [{'title': title, 'year': year, 'poster': poster, 'resolved': resolved}
+                       for (title, year), (poster, resolved) in sorted(self._entries.items())]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(entries, cache_file, ensure_ascii=False, indent=0)
+        os.replace(temporary_path, self.path)
+
+
+def backfill(cache: PosterCache, fetcher, movies, delay: float = 0.0, save_every: int = 50):
+    """ Looks up the posters of the movies the cache has no answer for, or only an expired negative one.
+
+    fetcher is called with each movie's title and release year, waiting delay seconds between calls. The cache is
+    saved every save_every lookups and at the end. Returns the numbers of movies found, without a poster, whose
+    lookup failed and that were already cached.
+    """
+    counts = {'found': 0, 'missing': 0, 'failed': 0, 'cached': 0}
+    looked_up = 0
+    try:
+        for movie in movies:
+            if not cache.needs_lookup(movie.title, movie.release):
+                counts['cached'] += 1
+                continue
+            if looked_up and delay:
+                time.sleep(delay)
+            looked_up += 1
+            try:
+                poster = fetcher(movie.title, movie.release)
+            except PosterFetchError:
+                counts['failed'] += 1
+                continue
+            cache.put(movie.title, movie.release, poster)
+            counts['found' if poster else 'missing'] += 1
+            if looked_up % save_every == 0:
+                cache.save()
+    finally:
+        cache.save()
+    return counts
+
+
+def create_poster_cache(config) -> PosterCache:
+    return PosterCache(config['POSTER_CACHE_PATH'], float(config.get('POSTER_NEGATIVE_TTL', 7 * 24 * 3600)))
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """ Answers /search/movie requests the way The Movie Database does, from a FixturePosterFetcher, so a
+    TMDBPosterFetcher can be tested or used without the real API.
+    """
+
+    def __init__(self, fetcher: FixturePosterFetcher, address=('127.0.0.1', 0)):
+        super().__init__(address, FixtureRequestHandler)
+        self.fetcher = fetcher
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/search/movie':
+            self.send_error(404)
+            return
+        params = urllib.parse.parse_qs(url.query)
+        try:
+            title = params['query'][0]
+            year = int(params.get('year', ['0'])[0])
+        except (KeyError, ValueError):
+            self.send_error(422)
+            return
+        poster_paths = self.server.fetcher.poster_paths
+        results = []
+        if (title, year) in poster_paths:
+            results.append({'title': title, 'release_date': f"{year}-01-01",
+                            'poster_path': poster_paths[(title, year)]})
+        body = json.dumps({'page': 1, 'results': results, 'total_results': len(results)}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+posters_cli = AppGroup('posters', help="Look up movie posters ahead of time.")
+
+
+@posters_cli.command('backfill')
+@click.option('--fixtures', type=click.Path(exists=True, dir_okay=False),
+              help="Look posters up in this CSV file rather than with the TMDB API.")
+@click.option('--delay', type=float, default=0.25, show_default=True, help="Seconds to wait between lookups.")
+def backfill_command(fixtures, delay):
+    """ Fills the poster cache for every movie in the repository, then stores the posters in the repository. """
+    config = current_app.config
+    if fixtures:
+        fetcher = FixturePosterFetcher(fixtures)
+        delay = 0.0
+    elif config.get('TMDB_API_KEY'):
+        fetcher = TMDBPosterFetcher(config['TMDB_API_KEY'], config.get('POSTER_API_URL', TMDB_API_URL))
+    else:
+        raise click.UsageError("Set TMDB_API_KEY, or pass --fixtures to look posters up offline.")
+
+    cache = create_poster_cache(config)
+    movies = repo.repo_instance.get_movies_matching(repo.MovieQuery(sort='added'))
+    counts = backfill(cache, fetcher, movies, delay)
+    changed = repo.repo_instance.set_posters(cache.get)
+    click.echo("{found} found, {missing} without a poster, {failed} failed, {cached} already cached".format(**counts))
+    click.echo(f"{changed} movies given new posters")
+
+
+@posters_cli.command('serve-fixtures')
+@click.argument('fixtures', type=click.Path(exists=True, dir_okay=False))
+@click.option('--port', type=int, default=8235, show_default=True)
+def serve_fixtures_command(fixtures, port):
+    """ Serves the posters in a fixtures CSV file as a stand-in for the TMDB API, at the URL it prints. """
+    server = FixtureServer(FixturePosterFetcher(fixtures), ('127.0.0.1', port))
+    click.echo(f"Set POSTER_API_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()